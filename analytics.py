@@ -0,0 +1,216 @@
+"""Precomputed outcome aggregates of ``asd_data_csv.csv`` for the analytics page.
+
+Every column of the dataset has a small, fixed set of values (Social
+Responsiveness 0-10, Age 0-18, 0/1 for the flags and the Outcome), so the
+complete group-by over all 13 columns fits in one dense count array of
+11 * 19 * 2**11 cells (3.4 MB). Any filter is a slice of that array and any
+"outcome rate by column" view is a sum over the other axes. Both cost the
+same however many rows the CSV has, so no pandas group-by runs per rerun.
+
+The cube is saved to ``asd_data.cube`` together with the number of CSV
+bytes it has counted. When rows are appended to the CSV only the new bytes
+are read and added. If the CSV was rewritten instead (its header or the
+bytes before the counted offset changed), the cube is rebuilt. Build it
+ahead of time with::
+
+    python analytics.py
+"""
+
+import hashlib
+import io
+import json
+import os
+import sys
+import threading
+
+import numpy as np
+
+from dataset import DatasetError
+import prediction_table
+from schema import DATASET_FILE, FEATURE_COLUMNS, OUTCOME_COLUMN
+
+CUBE_FILE = "asd_data.cube"
+APPEND_BLOCK_BYTES = 64 * 1024 * 1024
+CHECK_BYTES = 4096  # Bytes before the counted offset re-checked to tell an append from a rewrite
+
+COLUMNS = FEATURE_COLUMNS + [OUTCOME_COLUMN]
+LABELS = {
+    "Social_Responsiveness_Scale": "Social Responsiveness",
+    "Age_Years": "Age",
+    "Speech Delay/Language Disorder": "Speech Delay",
+    "Learning disorder": "Learning Disorder",
+    "Genetic_Disorders": "Genetic Disorders",
+    "Depression": "Depression",
+    "Global developoental delay/intellectual disability": "Intellectual Disability",
+    "Social/Behavioural Issues": "Social/Behavioral Issues",
+    "Anxiety_disorder": "Anxiety Disorder",
+    "Sex": "Sex",
+    "Jaundice": "Jaundice",
+    "Family_member_with_ASD": "Family History with ASD",
+}
+SHAPE = (prediction_table.RESPONSIVENESS_VALUES, prediction_table.AGE_VALUES) + (2,) * (prediction_table.FLAG_COUNT + 1)
+OUTCOME_AXIS = len(COLUMNS) - 1
+
+
+def value_label(column, value):
+    """Display value for one value of a column; scores and ages stay numbers so charts sort them."""
+    if column == "Sex":
+        return "Male" if value == 1 else "Female"
+    if column in ("Social_Responsiveness_Scale", "Age_Years"):
+        return int(value)
+    return "Yes" if value == 1 else "No"
+
+
+def _check_digest(f, offset):
+    # Digest of the bytes just before ``offset``; they must be unchanged for the file to be an append
+    start = max(0, offset - CHECK_BYTES)
+    f.seek(start)
+    return hashlib.sha256(f.read(offset - start)).hexdigest()
+
+
+class AnalyticsCube:
+    """Dense outcome counts over every combination of the dataset's column values."""
+
+    def __init__(self, counts, offset=0, header=None, check=None):
+        self.counts = counts
+        self.offset = offset
+        self.header = header
+        self.check = check
+
+    @classmethod
+    def empty(cls):
+        return cls(np.zeros(SHAPE, dtype=np.int64))
+
+    @property
+    def n_rows(self):
+        return int(self.counts.sum())
+
+    def add_rows(self, values):
+        """Count an (n, 13) integer array of CSV rows."""
+        values = np.asarray(values)
+        if values.ndim != 2 or values.shape[1] != len(COLUMNS):
+            raise DatasetError(f"Expected rows with {len(COLUMNS)} columns, got shape {values.shape}")
+        if values.size and (values.min() < 0 or np.any(values.max(axis=0) >= np.array(SHAPE))):
+            raise DatasetError("Rows have values outside the form's range.")
+        index = np.ravel_multi_index(values.T.astype(np.intp), SHAPE)
+        self.counts += np.bincount(index, minlength=self.counts.size).reshape(SHAPE)
+
+    def select(self, filters=None):
+        """Counts restricted to ``filters``: {column: (low, high)} with inclusive bounds."""
+        index = [slice(None)] * len(COLUMNS)
+        for column, (low, high) in (filters or {}).items():
+            index[COLUMNS.index(column)] = slice(low, high + 1)
+        return self.counts[tuple(index)]
+
+    def outcome_rates(self, by, filters=None):
+        """Return (values, rows, positives) per value of input column ``by`` under ``filters``."""
+        selected = self.select(filters)
+        axis = COLUMNS.index(by)
+        first = (filters or {}).get(by, (0, None))[0]
+        others = tuple(i for i in range(len(COLUMNS)) if i not in (axis, OUTCOME_AXIS))
+        by_outcome = selected.sum(axis=others)  # (values of ``by``, outcome)
+        rows = by_outcome.sum(axis=1)
+        return np.arange(first, first + len(rows)), rows, by_outcome[:, 1]
+
+    def update_from_csv(self, csv_path):
+        """Count CSV rows appended since the last update; returns False if the file was rewritten."""
+        with open(csv_path, "rb") as f:
+            if self.header is None:
+                header = f.readline()
+                if [name.strip() for name in header.decode("utf-8").split(",")] != COLUMNS:
+                    raise DatasetError(f"{csv_path} does not have the expected columns.")
+                self.header = header.decode("utf-8")
+                self.offset = len(header)
+            else:
+                f.seek(0)
+                if f.readline().decode("utf-8", "replace") != self.header:
+                    return False
+                if _check_digest(f, self.offset) != self.check:
+                    return False
+
+            # Only whole lines are counted; a row still being written waits for the next update
+            f.seek(self.offset)
+            while True:
+                block = f.read(APPEND_BLOCK_BYTES)
+                end = block.rfind(b"\n") + 1
+                if end == 0:
+                    break
+                values = np.loadtxt(io.BytesIO(block[:end]), delimiter=",", dtype=np.int64, ndmin=2)
+                self.add_rows(values)
+                self.offset += end
+                f.seek(self.offset)
+            self.check = _check_digest(f, self.offset)
+        return True
+
+    def save(self, cube_path=CUBE_FILE):
+        meta = json.dumps({"offset": self.offset, "header": self.header, "check": self.check})
+        tmp_path = f"{cube_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, counts=self.counts, meta=np.frombuffer(meta.encode("utf-8"), dtype=np.uint8))
+        os.replace(tmp_path, cube_path)
+
+    @classmethod
+    def load(cls, cube_path=CUBE_FILE):
+        try:
+            with np.load(cube_path, allow_pickle=False) as data:
+                counts = data["counts"]
+                meta = json.loads(data["meta"].tobytes().decode("utf-8"))
+        except (OSError, KeyError, ValueError) as e:
+            raise DatasetError(f"Cannot read {cube_path}: {e}") from e
+        if counts.shape != SHAPE:
+            raise DatasetError(f"{cube_path} has shape {counts.shape}, expected {SHAPE}")
+        return cls(counts, meta["offset"], meta["header"], meta["check"])
+
+
+def build_cube(csv_path=DATASET_FILE, cube_path=CUBE_FILE):
+    """Count the whole CSV into a new cube file and return the cube."""
+    cube = AnalyticsCube.empty()
+    cube.update_from_csv(csv_path)
+    cube.save(cube_path)
+    return cube
+
+
+class LiveCube:
+    """The cube for one CSV, kept current across appends; safe to share between sessions."""
+
+    def __init__(self, csv_path=DATASET_FILE, cube_path=CUBE_FILE):
+        self.csv_path = csv_path
+        self.cube_path = cube_path
+        self._lock = threading.Lock()
+        self._stamp = None
+        try:
+            self.cube = AnalyticsCube.load(cube_path)
+        except DatasetError:
+            self.cube = None
+        self.refresh()
+
+    def refresh(self):
+        """Pick up appended rows (or a rewritten CSV); costs one ``stat`` when nothing changed."""
+        stat = os.stat(self.csv_path)
+        stamp = (stat.st_size, stat.st_mtime_ns)
+        if stamp == self._stamp:
+            return self.cube
+        with self._lock:
+            if stamp != self._stamp:
+                cube = None
+                if self.cube is not None:
+                    # Update a copy, so sessions reading the current cube never see half an update
+                    current = self.cube
+                    cube = AnalyticsCube(current.counts.copy(), current.offset, current.header, current.check)
+                    if not cube.update_from_csv(self.csv_path):
+                        cube = None
+                    elif cube.offset != current.offset:
+                        cube.save(self.cube_path)
+                if cube is None:
+                    cube = build_cube(self.csv_path, self.cube_path)
+                self.cube = cube
+                self._stamp = stamp
+        return self.cube
+
+
+if __name__ == "__main__":
+    csv_path = sys.argv[1] if len(sys.argv) > 1 else DATASET_FILE
+    cube_path = sys.argv[2] if len(sys.argv) > 2 else CUBE_FILE
+    cube = build_cube(csv_path, cube_path)
+    print(f"Wrote {cube_path}: {cube.n_rows} rows in a {'x'.join(map(str, SHAPE))} cube "
+          f"({cube.counts.nbytes} bytes)")
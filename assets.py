@@ -0,0 +1,109 @@
+"""Pre-sized, compressed image variants for the app's pages.
+
+Passing a full-size ``Image.open`` result to ``st.image`` makes Streamlit
+decode, resize and re-encode it on every rerun. Here each image is resized
+to its display width once, encoded (JPEG for opaque images, optimised PNG
+when there is transparency), written to ``ASSET_CACHE_DIR`` and kept in a
+process-wide cache. Pages then hand the bytes straight to ``st.image``, and
+because they already match the display width Streamlit serves them as-is.
+
+Variants are built on first use, or ahead of time with::
+
+    python assets.py
+"""
+
+import io
+import os
+import threading
+
+from PIL import Image
+
+ASSET_CACHE_DIR = '.asset_cache'
+JPEG_QUALITY = 82
+
+# Images shown on the Home pages (the app's and pages/2_Home.py) and the width each is displayed at
+HOME_IMAGES = [
+    ("asd_child.jpg", 300),
+    ("causes-of-autism.png", 400),
+    ("autism.png", 500),
+    ("childrenautism2023.png", 500),
+    ("licensed-image.jpg", 400),
+    ("causes-of-autism.png", 350),
+    ("autism.png", 400),
+    ("Strategies.jpeg", 400),
+    ("autism-stats-1.jpg", 350),
+    ("autism-stats-2.png", 350),
+    ("World.png", 600),
+    ("Worlds.png", 600),
+]
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def _has_alpha(img):
+    return img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info)
+
+
+def encode_variant(path, width):
+    """Resize ``path`` to ``width`` pixels wide and return (bytes, format)."""
+    with Image.open(path) as img:
+        img.load()
+        if img.width > width:
+            height = round(img.height * width / img.width)
+            img = img.resize((width, height), Image.LANCZOS)
+        buffer = io.BytesIO()
+        if _has_alpha(img):
+            img.convert("RGBA").save(buffer, format="PNG", optimize=True)
+            return buffer.getvalue(), "PNG"
+        img.convert("RGB").save(buffer, format="JPEG", quality=JPEG_QUALITY, optimize=True, progressive=True)
+        return buffer.getvalue(), "JPEG"
+
+
+def _variant_path(path, width, image_format):
+    stem = os.path.splitext(os.path.basename(path))[0]
+    extension = "png" if image_format == "PNG" else "jpg"
+    return os.path.join(ASSET_CACHE_DIR, f"{stem}-{width}w.{extension}")
+
+
+def _load_or_build(path, width, source_mtime):
+    # Reuse a variant on disk if it is newer than its source image
+    for image_format in ("JPEG", "PNG"):
+        variant = _variant_path(path, width, image_format)
+        try:
+            if os.stat(variant).st_mtime_ns >= source_mtime:
+                with open(variant, "rb") as f:
+                    return f.read(), image_format
+        except OSError:
+            continue
+
+    data, image_format = encode_variant(path, width)
+    variant = _variant_path(path, width, image_format)
+    try:
+        os.makedirs(ASSET_CACHE_DIR, exist_ok=True)
+        tmp_path = f"{variant}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, variant)
+    except OSError:
+        pass  # A read-only checkout still gets the in-memory cache
+    return data, image_format
+
+
+def image_variant(path, width):
+    """Return (bytes, format) for ``path`` sized to ``width``, cached per process."""
+    source_mtime = os.stat(path).st_mtime_ns
+    key = (path, width)
+    cached = _cache.get(key)
+    if cached is not None and cached[0] == source_mtime:
+        return cached[1], cached[2]
+    with _cache_lock:
+        data, image_format = _load_or_build(path, width, source_mtime)
+        _cache[key] = (source_mtime, data, image_format)
+    return data, image_format
+
+
+if __name__ == "__main__":
+    for image_path, display_width in HOME_IMAGES:
+        data, image_format = image_variant(image_path, display_width)
+        print(f"{image_path} @ {display_width}px: {os.path.getsize(image_path)} -> {len(data)} bytes ({image_format})")
@@ -0,0 +1,253 @@
+"""Password hashing and signed session tokens.
+
+Passwords are stored as salted scrypt hashes (``scrypt$n$r$p$salt$hash``).
+scrypt is deliberately slow and memory-hard, so hashing runs on a small
+thread pool whose size bounds how much memory concurrent logins can claim.
+The calling script thread still waits for its hash, so a signup or login
+takes as long as one scrypt call (plus any queueing behind other logins);
+OpenSSL releases the GIL meanwhile, so other sessions are not held up. Accounts created before this change hold an unsalted
+SHA-256 hex digest; those still verify and are rehashed on the next login.
+
+A successful login creates a session row and hands back a token of the form
+``<payload>.<signature>``, where the payload carries the username, session id
+and expiry and the signature is an HMAC over it. The app keeps the token in
+the browser session's state only, never in the URL, where it would leak
+through browser history, shared links and Referer headers; reloading the
+page therefore asks for the password again. Verified sessions are
+kept in a process-wide LRU cache with a short TTL, so a logged-in rerun
+checks the signature in memory and never touches the database; logout
+deletes the row and evicts the cache entry. Other processes notice a logout
+once their cached entry expires (``CACHE_TTL`` seconds).
+"""
+
+import base64
+import hashlib
+import hmac
+import json
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import database
+
+SCRYPT_N = 2 ** 14
+SCRYPT_R = 8
+SCRYPT_P = 1
+SALT_BYTES = 16
+HASH_WORKERS = 2  # Each scrypt call holds about 16 MiB while it runs
+MAX_SCRYPT_MEMORY = 64 * 1024 * 1024  # Largest 128 * n * r an imported hash may ask for
+MAX_SCRYPT_P = 4
+
+SESSION_LIFETIME = 12 * 3600  # Seconds a login stays valid
+CACHE_SIZE = 4096
+CACHE_TTL = 300.0  # Seconds a verified session is trusted without re-reading its row
+SECRET_SETTING = 'session_secret'
+
+_hash_executor = ThreadPoolExecutor(max_workers=HASH_WORKERS, thread_name_prefix='password-hash')
+_secrets = {}
+_secrets_lock = threading.Lock()
+
+
+def _scrypt(password, salt, n, r, p):
+    return hashlib.scrypt(password.encode('utf-8'), salt=salt, n=n, r=r, p=p, maxmem=256 * r * n)
+
+
+def _hash_now(password):
+    salt = secrets.token_bytes(SALT_BYTES)
+    digest = _scrypt(password, salt, SCRYPT_N, SCRYPT_R, SCRYPT_P)
+    return f"scrypt${SCRYPT_N}${SCRYPT_R}${SCRYPT_P}${salt.hex()}${digest.hex()}"
+
+
+def _verify_now(password, stored):
+    if not is_password_hash(stored):
+        return False
+    if stored.startswith('scrypt$'):
+        _, n, r, p, salt, digest = stored.split('$')
+        candidate = _scrypt(password, bytes.fromhex(salt), int(n), int(r), int(p))
+        return hmac.compare_digest(candidate.hex(), digest)
+    # Legacy unsalted SHA-256 hex digest
+    return hmac.compare_digest(hashlib.sha256(password.encode('utf-8')).hexdigest(), stored)
+
+
+def needs_rehash(stored):
+    """True if ``stored`` is a legacy hash or uses weaker scrypt parameters than now."""
+    return not stored.startswith(f"scrypt${SCRYPT_N}${SCRYPT_R}${SCRYPT_P}$")
+
+
+def hash_password(password):
+    """Return a new salted scrypt hash of ``password``; blocks until the hash pool has computed it."""
+    return _hash_executor.submit(_hash_now, password).result()
+
+
+def hash_passwords(passwords, workers=HASH_WORKERS):
+    """Hash many passwords for a bulk import, ``workers`` at a time; yields hashes in order."""
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='bulk-password-hash') as executor:
+        yield from executor.map(_hash_now, passwords)
+
+
+def _is_hex(value):
+    return len(value) > 0 and len(value) % 2 == 0 and all(c in '0123456789abcdef' for c in value)
+
+
+def is_password_hash(value):
+    """True if ``value`` is a stored hash this module can verify at a bounded cost.
+
+    scrypt hashes need n a power of two above 1, and n, r and p within
+    ``MAX_SCRYPT_MEMORY`` and ``MAX_SCRYPT_P``, so an imported hash can
+    neither fail verification outright nor make a login exhaust memory.
+    """
+    if value.startswith('scrypt$'):
+        parts = value.split('$')
+        if len(parts) != 6 or not all(part.isdigit() for part in parts[1:4]):
+            return False
+        n, r, p = (int(part) for part in parts[1:4])
+        return (n > 1 and n & (n - 1) == 0 and r > 0 and 0 < p <= MAX_SCRYPT_P
+                and 128 * n * r <= MAX_SCRYPT_MEMORY and _is_hex(parts[4]) and _is_hex(parts[5]))
+    return len(value) == 64 and _is_hex(value)
+
+
+def verify_password(password, stored):
+    """Check ``password`` against a stored hash; blocks until the hash pool has checked it."""
+    return _hash_executor.submit(_verify_now, password, stored).result()
+
+
+# Compared against when the username is unknown, so a miss costs as much as a wrong password
+_dummy_hash = None
+
+
+def _get_dummy_hash():
+    global _dummy_hash
+    if _dummy_hash is None:
+        _dummy_hash = hash_password(secrets.token_hex(16))
+    return _dummy_hash
+
+
+def authenticate(username, password, path=database.DATABASE_NAME):
+    """Return True if the credentials match, upgrading a legacy hash on success."""
+    stored = database.get_password_hash(username, path)
+    if stored is None:
+        verify_password(password, _get_dummy_hash())
+        return False
+    if not verify_password(password, stored):
+        return False
+    if needs_rehash(stored):
+        database.set_password_hash(username, hash_password(password), path)
+    return True
+
+
+class SessionCache:
+    """Thread-safe LRU of verified sessions: session id -> (username, trusted until)."""
+
+    def __init__(self, maxsize=CACHE_SIZE, ttl=CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session_id, now):
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is None:
+                return None
+            if entry[1] <= now:
+                del self._entries[session_id]
+                return None
+            self._entries.move_to_end(session_id)
+            return entry[0]
+
+    def put(self, session_id, username, expires_at, now):
+        with self._lock:
+            self._entries[session_id] = (username, min(expires_at, now + self.ttl))
+            self._entries.move_to_end(session_id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def discard(self, session_id):
+        with self._lock:
+            self._entries.pop(session_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+session_cache = SessionCache()
+
+
+def _secret(path):
+    # One signing key per database, created on first use and shared by every process
+    secret = _secrets.get(path)
+    if secret is None:
+        with _secrets_lock:
+            secret = _secrets.get(path)
+            if secret is None:
+                secret = bytes.fromhex(database.get_setting(SECRET_SETTING, secrets.token_hex(32), path))
+                _secrets[path] = secret
+    return secret
+
+
+def _b64encode(data):
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode('ascii')
+
+
+def _b64decode(text):
+    return base64.urlsafe_b64decode(text + '=' * (-len(text) % 4))
+
+
+def _sign(payload, path):
+    return _b64encode(hmac.new(_secret(path), payload.encode('ascii'), hashlib.sha256).digest())
+
+
+def _parse(token, path):
+    # Return (username, session id, expiry) for a well-signed token, else None
+    try:
+        payload, signature = token.split('.')
+        if not hmac.compare_digest(_sign(payload, path), signature):
+            return None
+        claims = json.loads(_b64decode(payload))
+        return claims['u'], claims['sid'], float(claims['exp'])
+    except (ValueError, KeyError, TypeError):
+        return None
+
+
+def create_session(username, path=database.DATABASE_NAME):
+    """Start a session for an authenticated user and return its signed token."""
+    now = time.time()
+    session_id = secrets.token_urlsafe(18)
+    expires_at = now + SESSION_LIFETIME
+    database.create_session(session_id, username, now, expires_at, path)
+    payload = _b64encode(json.dumps({'u': username, 'sid': session_id, 'exp': int(expires_at)}).encode('utf-8'))
+    session_cache.put(session_id, username, expires_at, now)
+    return f"{payload}.{_sign(payload, path)}"
+
+
+def verify_session(token, path=database.DATABASE_NAME):
+    """Return the username a token belongs to, or None if it is invalid, expired or logged out."""
+    claims = _parse(token, path) if token else None
+    if claims is None:
+        return None
+    username, session_id, expires_at = claims
+    now = time.time()
+    if expires_at <= now:
+        session_cache.discard(session_id)
+        return None
+    cached = session_cache.get(session_id, now)
+    if cached is not None:
+        return cached
+    row = database.find_session(session_id, path)
+    if row is None or row[0] != username or row[1] <= now:
+        return None
+    session_cache.put(session_id, username, row[1], now)
+    return username
+
+
+def end_session(token, path=database.DATABASE_NAME):
+    """Log a session out everywhere it is cached in this process."""
+    claims = _parse(token, path) if token else None
+    if claims is None:
+        return
+    session_id = claims[1]
+    session_cache.discard(session_id)
+    database.delete_session(session_id, path)
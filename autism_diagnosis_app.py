@@ -1,296 +1,559 @@
 import streamlit as st
 import sqlite3
-import hashlib
-import pandas as pd
-import pickle
-from PIL import Image
-import smtplib
-from email.mime.text import MIMEText
-from fpdf import FPDF
-from dotenv import load_dotenv
 import os
+import time
+import auth
+import database
+import diagnosis_history
+import executors
+import metrics
+import result_cache
+from schema import DATASET_FILE, FEATURE_COLUMNS, MODELS_DIR
+
+# pandas, PIL (assets), fpdf (pdf_report) and the model stack (model_registry)
+# are imported inside the helpers that use them, and email_outbox imports
+# smtplib only once there is mail to send, so a new server process and each
+# page load only what that page needs
 
 # Set page config at the very start of the script
 st.set_page_config(page_title="Autism Spectrum Disorder", page_icon=":tada:", layout="wide")
 
-def main():
-    # Load environment variables
+# Constants
+DATABASE_NAME = 'naz.db'
+BATCH_CHUNK_SIZE = 10000
+
+# Load environment variables once per process
+@st.cache_resource
+def load_email_credentials():
+    from dotenv import load_dotenv
     load_dotenv()
-    EMAIL_USER = os.getenv("EMAIL_USER")
-    EMAIL_PASS = os.getenv("EMAIL_PASS")
+    return os.getenv("EMAIL_USER"), os.getenv("EMAIL_PASS")
+
+# Open the shared connection pool, migrating the schema once per process
+def init_db_pool():
+    try:
+        with metrics.span("db_connect"):
+            return database.get_pool(DATABASE_NAME)
+    except sqlite3.DatabaseError as e:
+        st.error(f"Database connection failed: {e}")
+        return None
+
+# Add new user data, storing a salted scrypt hash of the password
+def add_userdata(username, password):
+    try:
+        with metrics.span("signup"):
+            database.add_user(username, auth.hash_password(password), DATABASE_NAME)
+        st.success(f"User '{username}' added successfully.")
+    except sqlite3.IntegrityError:
+        st.error(f"Username '{username}' already exists. Please choose a different username.")
+    except sqlite3.DatabaseError as e:
+        st.error(f"Error adding user data: {e}")
+
+# Verify login details and start a session, returning its signed token
+# An optional st.progress bar is advanced once the password has been checked
+def login_user(username, password, progress=None):
+    try:
+        with metrics.span("login"):
+            if not auth.authenticate(username, password, DATABASE_NAME):
+                return None
+            if progress is not None:
+                progress.progress(60, text="Starting session...")
+            return auth.create_session(username, DATABASE_NAME)
+    except sqlite3.DatabaseError as e:
+        st.error(f"Login error: {e}")
+        return None
+
+# Re-check this browser session's token so expiry and logout take effect; verified tokens are served from memory
+# The token stays in session state only: in the URL it would leak through history, shared links and Referer
+def restore_session():
+    token = st.session_state.get('session_token')
+    if not token:
+        return
+    try:
+        with metrics.span("session_verify"):
+            username = auth.verify_session(token, DATABASE_NAME)
+    except sqlite3.DatabaseError as e:
+        st.error(f"Session check failed: {e}")
+        return
+    if username is None:
+        st.session_state['logged_in'] = False
+        st.session_state.pop('session_token', None)
+        return
+    st.session_state['logged_in'] = True
+    st.session_state['username'] = username
+
+# Process-wide model registry; swaps in newly activated model versions without a restart
+@st.cache_resource
+def load_model_registry():
+    import model_registry
+    return model_registry.ModelRegistry(MODELS_DIR, dataset_file=DATASET_FILE)
+
+# Read an uploaded screening CSV and queue one scoring call per chunk on the worker pool
+def start_batch_job(uploaded_file):
+    import pandas as pd
+    model = load_model_registry().active()
+    calls = []
+    rows = 0
+    with metrics.span("batch_parse"):
+        try:
+            for chunk in pd.read_csv(uploaded_file, chunksize=BATCH_CHUNK_SIZE):
+                missing = [column for column in FEATURE_COLUMNS if column not in chunk.columns]
+                if missing:
+                    raise ValueError(f"Missing columns: {', '.join(missing)}")
+                calls.append((model.version, model.directory, chunk[FEATURE_COLUMNS], rows == 0))
+                rows += len(chunk)
+        except pd.errors.ParserError as e:
+            raise ValueError(str(e)) from e
+    job = executors.start_job(executors.score_csv_chunk, calls, description=f"{rows} rows")
+    job.rows = rows
+    return job
+
+# Queue PDF rendering for every scored row; chunks render in parallel on the worker pool
+def start_report_job(results_csv):
+    import io
+    import pandas as pd
+    import pdf_report
+    results = pd.read_csv(io.BytesIO(results_csv))
+    reports = [
+        (f"Row {i + 1}", diagnosis, row)
+        for i, (diagnosis, row) in enumerate(zip(results["Diagnosis"], results[FEATURE_COLUMNS].to_numpy().tolist()))
+    ]
+    job = executors.start_job(pdf_report.render_many, [(chunk,) for chunk in pdf_report.chunk_reports(reports)])
+    job.reports = reports
+    return job
+
+# Whether the batch job (or the PDF reports asked for with it) is still running
+def batch_job_pending():
+    job = st.session_state['batch_job']
+    report_job = st.session_state.get('report_job')
+    if not job.done():
+        return True
+    return bool(st.session_state.get('batch_reports_requested')) and job.exception() is None and (
+        report_job is None or not report_job.done())
+
+# Show the batch job's progress and downloads; reruns on its own while polling
+def show_batch_job(polling):
+    job = st.session_state['batch_job']
+    if not job.done():
+        st.progress(job.progress(), text=f"Scoring {job.description}...")
+        return
+    if job.exception() is not None:
+        st.error(f"Could not score the uploaded file: {job.exception()}")
+    else:
+        if 'batch_results' not in st.session_state:
+            st.session_state['batch_results'] = b"".join(job.results())
+            metrics.incr("batch_rows_scored", job.rows)
+            metrics.observe("batch_job", time.time() - job.started_at)
+        results_csv = st.session_state['batch_results']
+        st.success(f"Scored {job.rows} screenings.")
+        st.download_button("Download Results CSV", results_csv, file_name="diagnosis_results.csv", mime="text/csv")
+
+        if st.session_state.get('batch_reports_requested') and 'report_job' not in st.session_state:
+            st.session_state['report_job'] = start_report_job(results_csv)
+        report_job = st.session_state.get('report_job')
+        if report_job is not None and not report_job.done():
+            st.progress(report_job.progress(), text="Rendering PDF reports...")
+            return
+        if report_job is not None and report_job.exception() is not None:
+            st.error(f"Could not render the PDF reports: {report_job.exception()}")
+        elif report_job is not None:
+            if 'batch_reports_zip' not in st.session_state:
+                import pdf_report
+                st.session_state['batch_reports_zip'] = pdf_report.zip_reports(report_job.reports, report_job.results())
+            st.download_button("Download PDF Reports (ZIP)", st.session_state['batch_reports_zip'], file_name="diagnosis_reports.zip", mime="application/zip")
+    if polling:
+        st.rerun()  # Everything is done; a full rerun stops the polling
+
+# Start the outbox worker once per process, so mail queued or retrying before a
+# restart goes out without waiting for the next Contact Us message
+@st.cache_resource
+def start_email_outbox():
+    import email_outbox
+    EMAIL_USER, EMAIL_PASS = load_email_credentials()
+    return email_outbox.start_worker(EMAIL_USER, EMAIL_PASS, path=DATABASE_NAME)
+
+# Queue the email; the background outbox worker delivers it
+def send_email(name, email, message):
+    import email_outbox
+    EMAIL_USER, EMAIL_PASS = load_email_credentials()
+    try:
+        email_outbox.start_worker(EMAIL_USER, EMAIL_PASS, path=DATABASE_NAME)
+        with metrics.span("email_enqueue"):
+            email_outbox.enqueue(
+                'Contact Us Form Submission',
+                f"Name: {name}\nEmail: {email}\nMessage: {message}",
+                EMAIL_USER,  # Sender's email
+                EMAIL_USER,  # Change this to the recipient's email address as a string
+                path=DATABASE_NAME,
+            )
+        st.success("Your message has been queued and will be sent shortly!")
+    except Exception as e:
+        st.error(f"An error occurred while sending the email: {e}")
+
+# Process-wide drift monitor, profiled once against the training data
+@st.cache_resource
+def load_drift_monitor():
+    import drift_monitor
+    return drift_monitor.DriftMonitor.from_dataset(DATASET_FILE)
+
+# Count a diagnosis's inputs toward drift; a broken monitor must never block a diagnosis
+def track_drift(inputs):
+    try:
+        load_drift_monitor().observe(inputs)
+    except Exception:
+        metrics.incr("drift_monitor_errors")
+
+# Usernames allowed on the admin pages, from ASD_ADMIN_USERS (comma-separated)
+def is_admin(username):
+    admins = os.getenv("ASD_ADMIN_USERS", "")
+    return username in {name.strip() for name in admins.split(",") if name.strip()}
+
+# ?metrics= and ?profile= expose process internals to whoever opens the URL; off unless ASD_DEBUG_PARAMS=1
+def debug_params_enabled():
+    return os.getenv("ASD_DEBUG_PARAMS") == "1"
+
+# Drift report: recent live inputs against the training data, one row per feature
+def show_drift_report():
+    import pandas as pd
+    import drift_monitor
+    monitor = load_drift_monitor()
+    report = pd.DataFrame(monitor.report())
+    st.write(f"{monitor.observed} diagnoses observed since this server started.")
+    st.caption(f"PSI below {drift_monitor.MODERATE_PSI} is stable, above {drift_monitor.SIGNIFICANT_PSI} is a significant shift. "
+               f"Scores need at least {monitor.min_observations} diagnoses.")
+    report = report.rename(columns={"feature": "Feature", "baseline_mean": "Training Mean",
+                                    "recent_mean": "Recent Mean", "psi": "PSI", "status": "Status"})
+    st.dataframe(report, hide_index=True)
+    if report["PSI"].notna().any():
+        st.bar_chart(report.set_index("Feature")["PSI"])
+
+# Process-wide outcome cube of the dataset; rows appended to the CSV are counted incrementally
+@st.cache_resource
+def load_analytics_cube():
+    import analytics
+    return analytics.LiveCube(DATASET_FILE)
+
+# Outcome rates by one column under the chosen filters, served from the cube
+def show_analytics():
+    import pandas as pd
+    import analytics
+    cube = load_analytics_cube().refresh()
+    flag_columns = analytics.COLUMNS[2:-1]
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        by = st.selectbox("Outcome rate by", analytics.COLUMNS[:-1], index=1, format_func=analytics.LABELS.get)
+    with col2:
+        ages = st.slider("Age range", 0, analytics.SHAPE[1] - 1, (0, analytics.SHAPE[1] - 1))
+    with col3:
+        scores = st.slider("Social Responsiveness range", 0, analytics.SHAPE[0] - 1, (0, analytics.SHAPE[0] - 1))
+    filters = {"Age_Years": ages, "Social_Responsiveness_Scale": scores}
+    with st.expander("More filters"):
+        filter_columns = st.columns(4)
+        for i, column in enumerate(flag_columns):
+            with filter_columns[i % 4]:
+                choice = st.selectbox(analytics.LABELS[column], ["All", analytics.value_label(column, 1), analytics.value_label(column, 0)])
+            if choice != "All":
+                value = 1 if choice == analytics.value_label(column, 1) else 0
+                filters[column] = (value, value)
+
+    with metrics.span("analytics_query"):
+        values, rows, positives = cube.outcome_rates(by, filters)
+    total, total_positive = int(rows.sum()), int(positives.sum())
+    if not total:
+        st.info(f"No screenings match these filters (of {cube.n_rows}).")
+    else:
+        st.write(f"{total} of {cube.n_rows} screenings match; {total_positive / total:.1%} had ASD.")
+        seen = rows > 0  # Values no screening had, e.g. age 0, are left out
+        table = pd.DataFrame({
+            analytics.LABELS[by]: [analytics.value_label(by, value) for value in values[seen]],
+            "Screenings": rows[seen],
+            "ASD Positive": positives[seen],
+            "ASD Rate": positives[seen] / rows[seen],
+        })
+        st.bar_chart(table.set_index(analytics.LABELS[by])["ASD Rate"])
+        st.dataframe(table, hide_index=True)
+
+# Queue a diagnosis for the history table; the background writer stores it in batches
+def record_diagnosis(username, inputs, prediction, probability):
+    try:
+        diagnosis_history.record(username, inputs, prediction, probability, DATABASE_NAME)
+    except Exception as e:
+        st.error(f"Could not save this diagnosis to your history: {e}")
+
+# Move between history pages; runs as a button callback before the page is drawn
+def show_older_history(cursor):
+    st.session_state['history_cursors'].append(cursor)
+
+def show_newer_history():
+    st.session_state['history_cursors'].pop()
+
+# Show an image pre-sized to its display width from the asset cache
+def show_image(path, width, caption=None):
+    import assets
+    with metrics.span("image_load"):
+        data, image_format = assets.image_variant(path, width)
+    st.image(data, width=width, caption=caption, output_format=image_format)
+
+# Show which inputs moved the probability most, in percentage points
+def show_contributions(contributions):
+    import pandas as pd
+    import pdf_report
+    drivers = pd.DataFrame({"Input": pdf_report.LABELS, "Effect (points)": [c * 100 for c in contributions]})
+    drivers = drivers.reindex(drivers["Effect (points)"].abs().sort_values(ascending=False).index)
+    st.dataframe(drivers, hide_index=True)
+
+# What-if panel: the whole Social Responsiveness x Age grid and every yes/no flip, scored at once
+def show_what_if(model, input_row):
+    import pandas as pd
+    import pdf_report
+    with metrics.span("what_if"):
+        grid_labels, grid_probabilities, toggle_labels, toggle_probabilities = model.what_if(input_row)
+    responsiveness, age = input_row[0], input_row[1]
+    cells = pd.DataFrame([
+        {"Social Responsiveness": r, "Age": a, "Probability of ASD": float(grid_probabilities[r, a]),
+         "Diagnosis": "Positive" if grid_labels[r, a] == 1 else "Negative",
+         "Current": r == responsiveness and a == age}
+        for r in range(grid_probabilities.shape[0]) for a in range(grid_probabilities.shape[1])
+    ])
+    st.write("Decision map for every Social Responsiveness and Age, with your other answers kept:")
+    st.vega_lite_chart(cells, {
+        "layer": [
+            {"mark": "rect",
+             "encoding": {
+                 "x": {"field": "Age", "type": "ordinal"},
+                 "y": {"field": "Social Responsiveness", "type": "ordinal", "sort": "descending"},
+                 "color": {"field": "Probability of ASD", "type": "quantitative",
+                           "scale": {"domain": [0, 1], "domainMid": 0.5, "scheme": "blueorange"}},
+                 "tooltip": [{"field": "Social Responsiveness"}, {"field": "Age"},
+                             {"field": "Probability of ASD", "format": ".1%"}, {"field": "Diagnosis"}]}},
+            {"mark": {"type": "square", "filled": False, "color": "black", "size": 200},
+             "transform": [{"filter": "datum.Current"}],
+             "encoding": {"x": {"field": "Age", "type": "ordinal"},
+                          "y": {"field": "Social Responsiveness", "type": "ordinal", "sort": "descending"}}},
+        ],
+    }, width="stretch")
+
+    # Flip one yes/no answer at a time
+    current = float(grid_probabilities[responsiveness, age])
+    toggles = pd.DataFrame({
+        "Input": pdf_report.LABELS[2:],
+        "Changed to": [("Male" if value == 0 else "Female") if column == "Sex" else ("Yes" if value == 0 else "No")
+                       for column, value in zip(FEATURE_COLUMNS[2:], input_row[2:])],
+        "Diagnosis": ["Positive" if label == 1 else "Negative" for label in toggle_labels],
+        "Probability of ASD": [f"{p:.1%}" for p in toggle_probabilities],
+        "Change (points)": [round((p - current) * 100, 1) for p in toggle_probabilities],
+    })
+    st.write("Changing a single answer:")
+    st.dataframe(toggles, hide_index=True)
+
+# Show one page of the diagnosis history as a table
+def show_history_table(page):
+    import pandas as pd
+    import pdf_report
+    history = pd.DataFrame(page)
+    history["Date"] = pd.to_datetime(history["created_at"], unit="s").dt.strftime("%Y-%m-%d %H:%M:%S")
+    history["Diagnosis"] = ["Positive" if p == 1 else "Negative" for p in history["prediction"]]
+    history["Probability"] = history["probability"]
+    history = history.rename(columns=dict(zip(diagnosis_history.INPUT_COLUMNS, pdf_report.LABELS)))
+    st.dataframe(history[["Date", "Diagnosis", "Probability"] + pdf_report.LABELS], hide_index=True)
+
+# Function to generate PDF report, rendered in memory on the worker pool; returns a future
+# Reports already rendered for this model, input and name come from the shared result cache
+def generate_pdf_result(model, name, diagnosis_result, input_data, probability=None, contributions=None):
+    import pdf_report
+    return result_cache.report(model, input_data[0], name, lambda: executors.submit_cpu(
+        pdf_report.render_report, name, diagnosis_result, input_data[0], probability, contributions))
+
+# Home page: what ASD is, its causes and symptoms, with pre-sized images
+def show_home_page():
+    st.markdown(
+          """
+    <style>
+    .stApp {
+        background-color: 	#C3B1E1;  /* You can choose your own color */
+        color: #000000;  /* Text color to ensure readability */
+    }
+    </style>
+    """,
+    unsafe_allow_html=True
+    )
+    st.title(":blue[Autism Spectrum Disorder]")
+    st.write("---")
+    with st.container():
+        col1, col2 = st.columns([3, 2])
+        with col1:
+            st.title("What is Autism Spectrum Disorder?")
+            st.write("Autism spectrum disorder (ASD) is a developmental disability caused by differences in the brain. People with ASD often have problems with social communication and interaction, and restricted or repetitive behaviors or interests.")
+
+            st.title("What Causes Autism Spectrum Disorder?")
+            st.write("The Autism Spectrum Disorder Foundation lists the following as possible causes of ASD:")
+
+            st.write("Genetics : Research suggests that ASD can be caused by a combination of genetic and environmental factors. Some genes have been identified as being associated with an increased risk for ASD, but no single gene has been proven to cause ASD.")
+
+            st.write("Environmental factors : Studies are currently underway to explore whether certain exposure to toxins during pregnancy or after birth can increase the risk for developing ASD.")
+
+            st.write("Brain differences : Differences in certain areas of the brain have been observed in people with ASD, compared to those without ASD. It is not yet known what causes these differences.")
+
+            st.title("Symptoms of ASD:")
+            st.write("1.Avoids or does not keep eye contact")
+            st.write("2.Does not respond to name by 9 months of age")
+            st.write("3.Does not show facial expressions like happy, sad, angry, and surprised by 9 months of age")
+            st.write("4.Lines up toys or other objects and gets upset when order is changed")
+            st.write("5.Repeats words or phrases over and over (called echolalia)")
+            st.write("6.Plays with toys the same way every time")
+            st.write("7.Delayed language skills")
+            st.write("8.Delayed movement skills")
+            st.write("9.Delayed cognitive or learning skill, etc.")
+
+            st.title("Prevalence Autism in Malaysia")
+
+            st.write("The exact prevalence of Autism Spectrum Disorder (ASD) in Malaysia is not well-established due to a lack of nationwide studies and consistent diagnostic criteria. However, some studies have estimated that the prevalence of ASD in Malaysia is between 1 and 2 per 1000 children. According to to an Ministry of Health (MOH) study in 2005, which use modified checklist for Autism in Toddlers (M-CHAT) screener for ASD, the prevelance in Malaysia is between one and two per 1000 children aged 18 months to three years. The study also found that male children are four times more likely to get ASD than female children.")
+            st.title("World Autism Awareness Day")
+            st.write("World Autism Awareness Day is observed on April 2nd each year. Established by the United Nations in 2007, this day aims to raise awareness about autism spectrum disorder (ASD) and promote acceptance and inclusion of individuals with autism worldwide. The day encourages governments, organizations, and communities to take action to improve the lives of people with autism and their families.")
+
+        with col2:
+            show_image("asd_child.jpg", width=300)
+
+            show_image("causes-of-autism.png", width=400)
+
+            st.write("")
+            st.write("")
+            st.write("")
+
+            show_image("autism.png", width=500)
+
+            show_image("childrenautism2023.png", width=500)
+
+            st.write("")
+            st.write("")
+            st.write("")
+
+            show_image("licensed-image.jpg", width=400)
+
+# Signup page
+def show_signup_page():
+    # Change background color for the Signup section only
+    st.markdown(
+    """
+    <style>
+    .stApp {
+        background-color: #FFDDC1;  /* Light pink background for the Signup section */
+        color: #000000;  /* Text color to ensure readability */
+    }
+    </style>
+    """,
+    unsafe_allow_html=True
+    )
+    st.title(":iphone: :blue[Create New Account]")
+    new_user = st.text_input("Username")
+    new_password = st.text_input("Password", type='password')
+    if st.button("Signup"):
+        add_userdata(new_user, new_password)
+
+# Login page; the progress bar follows the password check and session creation
+def show_login_page():
+    # Change background color for the Login section only
+    st.markdown(
+    """
+    <style>
+    .stApp {
+        background-color: #B2E6A6;  /* Light blue background for the Login section */
+        color: #000000;  /* Text color to ensure readability */
+    }
+    </style>
+    """,
+    unsafe_allow_html=True
+    )
+    st.title(":calling: :blue[Login Section]")
+    username = st.text_input("User Name")
+    password = st.text_input("Password", type='password')
+    if st.button("Login"):
+        progress = st.progress(0, text="Checking password...")
+        token = login_user(username, password, progress)
+        if token:
+            progress.progress(100, text="Logged in")
+            st.success(f"Logged In as {username}")
+            st.session_state['logged_in'] = True  # Set session state for logged-in users
+            st.session_state['username'] = username  # Store the username
+            st.session_state['session_token'] = token
+
+            # Add button to go to Autism Diagnosis
+            if st.button("Go to Autism Diagnosis"):
+                st.session_state['go_to_diagnosis'] = True
+                # Use query parameters to trigger a change in the URL to refresh the app state
+                st.experimental_set_query_params(diagnosis=True)
+        else:
+            progress.empty()
+            st.warning("Incorrect Username/Password")
+
+# Contact Us page
+def show_contact_page():
+    # Change background color for the Contact Us section only
+    st.markdown(
+    """
+    <style>
+    .stApp {
+        background-color: #FFF9C4;  /* Light blue background for the Login section */
+        color: #000000;  /* Text color to ensure readability */
+    }
+    </style>
+    """,
+    unsafe_allow_html=True
+    )
+    st.title("Contact Us")
+    name = st.text_input("Your Name")
+    email = st.text_input("Your Email")
+    message = st.text_area("Your Message")
+    if st.button("Send"):
+        send_email(name, email, message)
+
 
+def main():
     # Check if environment variables are loaded
+    EMAIL_USER, EMAIL_PASS = load_email_credentials()
     if EMAIL_USER is None or EMAIL_PASS is None:
         st.error("Error loading email credentials. Please check your .env file.")
 
-    # Constants
-    DATABASE_NAME = 'naz.db'
-    MODEL_FILE = "autism_random_forest.pkl"
-    SCALER_FILE = 'scaler.pkl'
-    DATASET_FILE = "asd_data_csv.csv"
-
-    # Function to hash passwords
-    def make_hashes(password):
-        return hashlib.sha256(str.encode(password)).hexdigest()
-
-    # Initialize database connection
-    def init_db_connection():
-        try:
-            conn = sqlite3.connect(DATABASE_NAME)
-            return conn
-        except sqlite3.DatabaseError as e:
-            st.error(f"Database connection failed: {e}")
-            return None
-
-    # Create a new table if it doesn't exist
-    def create_usertable(conn):
-        try:
-            c = conn.cursor()
-            c.execute('CREATE TABLE IF NOT EXISTS userstable(username TEXT PRIMARY KEY, password TEXT)')
-            conn.commit()
-        except sqlite3.DatabaseError as e:
-            st.error(f"Error creating table: {e}")
-
-    # Add new user data
-    def add_userdata(conn, username, password):
-        try:
-            c = conn.cursor()
-            c.execute('INSERT INTO userstable(username, password) VALUES (?, ?)', (username, password))
-            conn.commit()
-            st.success(f"User '{username}' added successfully.")
-        except sqlite3.IntegrityError:
-            st.error(f"Username '{username}' already exists. Please choose a different username.")
-        except sqlite3.DatabaseError as e:
-            st.error(f"Error adding user data: {e}")
-
-    # Verify login details
-    def login_user(conn, username, password):
-        try:
-            c = conn.cursor()
-            c.execute('SELECT * FROM userstable WHERE username = ? AND password = ?', (username, password))
-            return c.fetchall()
-        except sqlite3.DatabaseError as e:
-            st.error(f"Login error: {e}")
-            return []
-
-    # Load the model and scaler
-    @st.cache_resource
-    def load_model_and_scaler():
-        with open(MODEL_FILE, "rb") as model_file:
-            classifier = pickle.load(model_file)
-        with open(SCALER_FILE, "rb") as scaler_file:
-            scaler = pickle.load(scaler_file)
-        return classifier, scaler
-
-    # Load the dataset
-    @st.cache_data
-    def load_data():
-        asd_data_csv = pd.read_csv(DATASET_FILE)
-        return asd_data_csv
-
-    # Send email function
-    def send_email(name, email, message):
-        try:
-            server = smtplib.SMTP('smtp.gmail.com', 587)
-            server.starttls()
-            server.login(EMAIL_USER, EMAIL_PASS)  # Use environment variables for credentials
-            msg = MIMEText(f"Name: {name}\nEmail: {email}\nMessage: {message}")
-            msg['Subject'] = 'Contact Us Form Submission'
-            msg['From'] = EMAIL_USER  # Sender's email
-            msg['To'] = EMAIL_USER  # Change this to the recipient's email address as a string
-            server.sendmail(EMAIL_USER, EMAIL_USER, msg.as_string())
-            server.quit()
-            st.success("Your message has been sent successfully!")
-        except Exception as e:
-            st.error(f"An error occurred while sending the email: {e}")
-
-    # Function to generate PDF report
-    def generate_pdf_result(name, diagnosis_result, input_data):
-        pdf = FPDF()
-        pdf.add_page()
-        pdf.set_font("Arial", size=12)
-
-        pdf.cell(200, 10, txt="Autism Diagnosis Result", ln=True, align='C')
-        pdf.cell(200, 10, txt=f"Patient Name: {name}", ln=True)
-        pdf.cell(200, 10, txt=f"Diagnosis: {diagnosis_result}", ln=True)
-        pdf.cell(200, 10, txt="Input Data Results:", ln=True)
-
-        # Add input data with labels and convert 1/0 to Yes/No accordingly
-        labels = [
-            "Social Responsiveness",
-            "Age",
-            "Speech Delay",
-            "Learning Disorder",
-            "Genetic Disorders",
-            "Depression",
-            "Intellectual Disability",
-            "Social/Behavioral Issues",
-            "Anxiety Disorder",
-            "Gender (Male=1/Female=0)",
-            "Suffers from Jaundice",
-            "Family History with ASD"
-        ]
-
-        # Convert input_data values, keeping gender unchanged
-        input_data_converted = []
-        for i, value in enumerate(input_data[0]):  # input_data is in a nested list
-            if labels[i] != "Gender (Male=1/Female=0)":
-                if value == 1:
-                    input_data_converted.append("Yes")
-                elif value == 0:
-                    input_data_converted.append("No")
-                else:
-                    input_data_converted.append(value)  # Keep other values (like age) unchanged
-            else:
-                input_data_converted.append(value)  # Keep gender unchanged
-
-        # Create the PDF rows
-        for label, value in zip(labels, input_data_converted):
-            pdf.cell(200, 10, txt=f"{label}: {value}", ln=True)
-
-        pdf_file_path = "diagnosis_result.pdf"
-        pdf.output(pdf_file_path)
-
-        return pdf_file_path
+    restore_session()
 
     # Sidebar navigation
     st.sidebar.title("Navigation")
-    menu = ["Home", "Signup", "Login", "Contact Us"]
+    menu = ["Home", "Dataset Analytics", "Signup", "Login", "Contact Us"]
     if 'logged_in' in st.session_state and st.session_state['logged_in']:
         menu.append("Autism Diagnosis")
+        menu.append("Diagnosis History")
+        if is_admin(st.session_state.get('username')):
+            menu.append("Drift Monitor")
         menu.append("Logout")  # Add logout option to the menu
 
     selected = st.sidebar.selectbox("Select Page", menu)  # Sidebar dropdown for navigation
+    metrics.incr(f"page_view_{selected.lower().replace(' ', '_')}")
 
-    conn = init_db_connection()
-    if conn is None:
+    if init_db_pool() is None:
         st.stop()  # Stop execution if database connection failed
-
-    create_usertable(conn)  # Ensure the table is created at the start
+    start_email_outbox()
 
     # Home Section
     if selected == "Home":
-        st.markdown(
-              """
-        <style>
-        .stApp {
-            background-color: 	#C3B1E1;  /* You can choose your own color */
-            color: #000000;  /* Text color to ensure readability */
-        }
-        </style>
-        """,
-        unsafe_allow_html=True
-    ) 
-        st.title(":blue[Autism Spectrum Disorder]")
-        st.write("---")
-        with st.container():
-            col1, col2 = st.columns([3, 2])
-            with col1:
-                st.title("What is Autism Spectrum Disorder?")
-                st.write("Autism spectrum disorder (ASD) is a developmental disability caused by differences in the brain. People with ASD often have problems with social communication and interaction, and restricted or repetitive behaviors or interests.")
-
-                st.title("What Causes Autism Spectrum Disorder?")
-                st.write("The Autism Spectrum Disorder Foundation lists the following as possible causes of ASD:")
-
-                st.write("Genetics : Research suggests that ASD can be caused by a combination of genetic and environmental factors. Some genes have been identified as being associated with an increased risk for ASD, but no single gene has been proven to cause ASD.")
-
-                st.write("Environmental factors : Studies are currently underway to explore whether certain exposure to toxins during pregnancy or after birth can increase the risk for developing ASD.")
-
-                st.write("Brain differences : Differences in certain areas of the brain have been observed in people with ASD, compared to those without ASD. It is not yet known what causes these differences.")
-
-                st.title("Symptoms of ASD:")
-                st.write("1.Avoids or does not keep eye contact")
-                st.write("2.Does not respond to name by 9 months of age")
-                st.write("3.Does not show facial expressions like happy, sad, angry, and surprised by 9 months of age")
-                st.write("4.Lines up toys or other objects and gets upset when order is changed")
-                st.write("5.Repeats words or phrases over and over (called echolalia)")
-                st.write("6.Plays with toys the same way every time")
-                st.write("7.Delayed language skills")
-                st.write("8.Delayed movement skills")
-                st.write("9.Delayed cognitive or learning skill, etc.")
-
-                st.title("Prevalence Autism in Malaysia")
-
-                st.write("The exact prevalence of Autism Spectrum Disorder (ASD) in Malaysia is not well-established due to a lack of nationwide studies and consistent diagnostic criteria. However, some studies have estimated that the prevalence of ASD in Malaysia is between 1 and 2 per 1000 children. According to to an Ministry of Health (MOH) study in 2005, which use modified checklist for Autism in Toddlers (M-CHAT) screener for ASD, the prevelance in Malaysia is between one and two per 1000 children aged 18 months to three years. The study also found that male children are four times more likely to get ASD than female children.")
-                st.title("World Autism Awareness Day")
-                st.write("World Autism Awareness Day is observed on April 2nd each year. Established by the United Nations in 2007, this day aims to raise awareness about autism spectrum disorder (ASD) and promote acceptance and inclusion of individuals with autism worldwide. The day encourages governments, organizations, and communities to take action to improve the lives of people with autism and their families.")
-               
-            with col2:
-                img1 = Image.open("asd_child.jpg")
-                st.image(img1, width=300)
-                
-                img2 = Image.open("causes-of-autism.png")
-                st.image(img2, width=400)
-
-                st.write("")
-                st.write("")
-                st.write("")
-            
-                img3 = Image.open("autism.png")
-                st.image(img3, width=500)
-
-                img4 = Image.open("childrenautism2023.png")
-                st.image(img4, width=500)
-
-                st.write("")
-                st.write("")
-                st.write("")
-                         
-                img5 = Image.open("licensed-image.jpg")
-                st.image(img5, width=400)
+        show_home_page()
+
+    # Dataset Analytics Section
+    elif selected == "Dataset Analytics":
+        st.title("Dataset Analytics")
+        st.write("Outcome rates in the screening dataset the model was trained on.")
+        try:
+            show_analytics()
+        except Exception as e:
+            st.error(f"Could not load the dataset analytics: {e}")
 
     # Signup Section
     elif selected == "Signup":
-        # Change background color for the Signup section only
-        st.markdown(
-        """
-        <style>
-        .stApp {
-            background-color: #FFDDC1;  /* Light pink background for the Signup section */
-            color: #000000;  /* Text color to ensure readability */
-        }
-        </style>
-        """,
-        unsafe_allow_html=True
-    )
-        st.title(":iphone: :blue[Create New Account]")
-        new_user = st.text_input("Username")
-        new_password = st.text_input("Password", type='password')
-        if st.button("Signup"):
-            add_userdata(conn, new_user, make_hashes(new_password))
+        show_signup_page()
 
     # Login Section
     elif selected == "Login":
-         # Change background color for the Login section only
-        st.markdown(
-        """
-        <style>
-        .stApp {
-            background-color: #B2E6A6;  /* Light blue background for the Login section */
-            color: #000000;  /* Text color to ensure readability */
-        }
-        </style>
-        """,
-        unsafe_allow_html=True
-    )
-        st.title(":calling: :blue[Login Section]")
-        username = st.text_input("User Name")
-        password = st.text_input("Password", type='password')
-        if st.button("Login"):
-            hashed_pswd = make_hashes(password)
-            result = login_user(conn, username, hashed_pswd)
-            if result:
-                st.success(f"Logged In as {username}")
-                st.session_state['logged_in'] = True  # Set session state for logged-in users
-                st.session_state['username'] = username  # Store the username
-                
-                # Add button to go to Autism Diagnosis
-                if st.button("Go to Autism Diagnosis"):
-                    st.session_state['go_to_diagnosis'] = True
-                    # Use query parameters to trigger a change in the URL to refresh the app state
-                    st.experimental_set_query_params(diagnosis=True)
-            else:
-                st.warning("Incorrect Username/Password")
+        show_login_page()
 
     # Autism Diagnosis Section
     elif selected == "Autism Diagnosis" and (st.session_state['logged_in'] or st.session_state.get('go_to_diagnosis', False)):
@@ -307,78 +570,158 @@ def main():
     )
         st.title('Autism Diagnosis')
 
-        # Load model and scaler
-        classifier, scaler = load_model_and_scaler()
-
-        # Input form for prediction
-        social_responsiveness = st.slider("Social Responsiveness", min_value=0, max_value=10)
-        age = st.slider("Age", min_value=0, max_value=18)
-        speech_delay = st.selectbox("Speech Delay", options=["Yes", "No"])
-        learning_disorder = st.selectbox("Learning Disorder", options=["Yes", "No"])
-        genetic_disorders = st.selectbox("Genetic Disorders", options=["Yes", "No"])
-        depression = st.selectbox("Depression", options=["Yes", "No"])
-        intellectual_disability = st.selectbox("Intellectual Disability", options=["Yes", "No"])
-        social_behavioral_issues = st.selectbox("Social/Behavioral Issues", options=["Yes", "No"])
-        anxiety_disorder = st.selectbox("Anxiety Disorder", options=["Yes", "No"])
-        gender = st.selectbox("Gender (Male=1/Female=0)", options=["Male", "Female"])
-        jaundice = st.selectbox("Suffers from Jaundice", options=["Yes", "No"])
-        family_history_asd = st.selectbox("Family History with ASD", options=["Yes", "No"])
-
-        if st.button("Diagnose"):
-            # Prepare input data for prediction
-            input_data = [[
-                social_responsiveness,
-                age,
-                1 if speech_delay == "Yes" else 0,
-                1 if learning_disorder == "Yes" else 0,
-                1 if genetic_disorders == "Yes" else 0,
-                1 if depression == "Yes" else 0,
-                1 if intellectual_disability == "Yes" else 0,
-                1 if social_behavioral_issues == "Yes" else 0,
-                1 if anxiety_disorder == "Yes" else 0,
-                1 if gender == "Male" else 0,
-                1 if jaundice == "Yes" else 0,
-                1 if family_history_asd == "Yes" else 0
-            ]]
-
-            # Scale input data
-            input_data_scaled = scaler.transform(input_data)
-
-            # Make prediction
-            diagnosis = classifier.predict(input_data_scaled)
-
-            # Display result
-            result = "Positive" if diagnosis[0] == 1 else "Negative"
-            st.success(f"Diagnosis Result: {result}")
-
-            # Generate PDF report
-            pdf_path = generate_pdf_result(st.session_state['username'], result, input_data)
-
-            # Provide link to download the PDF
-            with open(pdf_path, "rb") as f:
-                pdf_data = f.read()
-            st.download_button("Download Diagnosis Report", pdf_data, file_name=pdf_path)
-
-    # Contact Us Section
-    elif selected == "Contact Us":
-         # Change background color for the Login section only
+        # Choose between a single screening and scoring an uploaded CSV
+        mode = st.radio("Screening Mode", ["Single Screening", "Batch CSV Upload"], horizontal=True)
+
+        if mode == "Batch CSV Upload":
+            st.write("Upload a CSV with the same 12 input columns as the training data (an Outcome column is ignored).")
+            uploaded_file = st.file_uploader("Screening CSV", type=["csv"])
+            build_reports = st.checkbox("Also build a PDF report for every row")
+            if uploaded_file is not None and st.button("Score File"):
+                # Replace any earlier job; the scoring itself runs on the worker pool
+                for key in ('batch_job', 'report_job', 'batch_results', 'batch_reports_zip'):
+                    st.session_state.pop(key, None)
+                try:
+                    st.session_state['batch_job'] = start_batch_job(uploaded_file)
+                    st.session_state['batch_reports_requested'] = build_reports
+                except ValueError as e:
+                    st.error(f"Could not score the uploaded file: {e}")
+
+            # The page stays responsive while the job runs; only this part polls for progress
+            if 'batch_job' in st.session_state:
+                polling = batch_job_pending()
+                st.fragment(show_batch_job, run_every=0.5 if polling else None)(polling)
+
+        else:
+            # Input form for prediction
+            social_responsiveness = st.slider("Social Responsiveness", min_value=0, max_value=10)
+            age = st.slider("Age", min_value=0, max_value=18)
+            speech_delay = st.selectbox("Speech Delay", options=["Yes", "No"])
+            learning_disorder = st.selectbox("Learning Disorder", options=["Yes", "No"])
+            genetic_disorders = st.selectbox("Genetic Disorders", options=["Yes", "No"])
+            depression = st.selectbox("Depression", options=["Yes", "No"])
+            intellectual_disability = st.selectbox("Intellectual Disability", options=["Yes", "No"])
+            social_behavioral_issues = st.selectbox("Social/Behavioral Issues", options=["Yes", "No"])
+            anxiety_disorder = st.selectbox("Anxiety Disorder", options=["Yes", "No"])
+            gender = st.selectbox("Gender (Male=1/Female=0)", options=["Male", "Female"])
+            jaundice = st.selectbox("Suffers from Jaundice", options=["Yes", "No"])
+            family_history_asd = st.selectbox("Family History with ASD", options=["Yes", "No"])
+
+            if st.button("Diagnose"):
+                # Prepare input data for prediction
+                input_data = [[
+                    social_responsiveness,
+                    age,
+                    1 if speech_delay == "Yes" else 0,
+                    1 if learning_disorder == "Yes" else 0,
+                    1 if genetic_disorders == "Yes" else 0,
+                    1 if depression == "Yes" else 0,
+                    1 if intellectual_disability == "Yes" else 0,
+                    1 if social_behavioral_issues == "Yes" else 0,
+                    1 if anxiety_disorder == "Yes" else 0,
+                    1 if gender == "Male" else 0,
+                    1 if jaundice == "Yes" else 0,
+                    1 if family_history_asd == "Yes" else 0
+                ]]
+
+                # Look up the precomputed prediction of the active model, falling back to the model itself;
+                # inputs any session scored before are served from the shared result cache
+                registry = load_model_registry()
+                model = registry.active()
+                model.warm()
+                with metrics.span("predict"):
+                    label, probability, _, contributions = result_cache.diagnose(model, input_data[0])
+                    diagnosis = [label]
+                metrics.incr("diagnoses")
+                registry.shadow_score(input_data[0], label, probability)
+                record_diagnosis(st.session_state['username'], input_data[0], label, probability)
+                track_drift(input_data[0])
+
+                # Start rendering the PDF report while the result is drawn
+                result = "Positive" if diagnosis[0] == 1 else "Negative"
+                pdf_future = generate_pdf_result(model, st.session_state['username'], result, input_data, probability, contributions)
+
+                # Display result
+                st.success(f"Diagnosis Result: {result}")
+                st.write(f"Probability of ASD: {probability:.1%}")
+
+                # Show which inputs moved the probability most, in percentage points
+                st.write("What drove the result:")
+                show_contributions(contributions)
+
+                with st.expander("What if..."):
+                    show_what_if(model, input_data[0])
+
+                # Collect the rendered PDF report
+                with metrics.span("pdf_render"):
+                    try:
+                        pdf_data = pdf_future.result(timeout=30)
+                    except Exception as e:
+                        st.error(f"Could not build the PDF report: {e}")
+                        pdf_data = None
+
+                # Provide link to download the PDF
+                if pdf_data is not None:
+                    st.download_button("Download Diagnosis Report", pdf_data, file_name="diagnosis_result.pdf")
+
+    # Diagnosis History Section
+    elif selected == "Diagnosis History" and st.session_state['logged_in']:
         st.markdown(
         """
         <style>
         .stApp {
-            background-color: #FFF9C4;  /* Light blue background for the Login section */
+            background-color: #D6EAF8;  /* Pale blue background for the History section */
             color: #000000;  /* Text color to ensure readability */
         }
         </style>
         """,
         unsafe_allow_html=True
     )
-        st.title("Contact Us")
-        name = st.text_input("Your Name")
-        email = st.text_input("Your Email")
-        message = st.text_area("Your Message")
-        if st.button("Send"):
-            send_email(name, email, message)
+        st.title("Diagnosis History")
+
+        # Stack of keyset cursors, one per page the user has paged past
+        if 'history_cursors' not in st.session_state:
+            st.session_state['history_cursors'] = []
+        cursors = st.session_state['history_cursors']
+        cursor = cursors[-1] if cursors else None
+        try:
+            diagnosis_history.flush(DATABASE_NAME)  # Include the diagnosis just made
+            with metrics.span("history_page"):
+                # One row past the page tells whether there is an older page at all
+                page = diagnosis_history.fetch_page(st.session_state['username'], cursor,
+                                                    limit=diagnosis_history.PAGE_SIZE + 1, path=DATABASE_NAME)
+        except sqlite3.DatabaseError as e:
+            st.error(f"Could not load your history: {e}")
+            page = []
+        has_older = len(page) > diagnosis_history.PAGE_SIZE
+        page = page[:diagnosis_history.PAGE_SIZE]
+
+        if not page and cursor is None:
+            st.info("No diagnoses yet. Results from the Autism Diagnosis page will appear here.")
+        elif not page:
+            st.info("No older diagnoses.")
+        else:
+            show_history_table(page)
+            st.caption(f"Page {len(cursors) + 1}")
+
+        col1, col2 = st.columns(2)
+        with col1:
+            st.button("Newer", disabled=not cursors, on_click=show_newer_history)
+        with col2:
+            st.button("Older", disabled=not has_older,
+                      on_click=show_older_history, args=(diagnosis_history.next_cursor(page),))
+
+    # Drift Monitor Section (admins only)
+    elif selected == "Drift Monitor" and st.session_state['logged_in'] and is_admin(st.session_state.get('username')):
+        st.title("Input Drift Monitor")
+        try:
+            show_drift_report()
+        except Exception as e:
+            st.error(f"Could not load the drift monitor: {e}")
+
+    # Contact Us Section
+    elif selected == "Contact Us":
+        show_contact_page()
 
     # Logout Section
     elif selected == "Logout":
@@ -393,11 +736,31 @@ def main():
         """,
         unsafe_allow_html=True
     )
+        try:
+            auth.end_session(st.session_state.pop('session_token', None), DATABASE_NAME)
+        except sqlite3.DatabaseError as e:
+            st.error(f"Logout error: {e}")
         st.session_state['logged_in'] = False
         st.session_state['go_to_diagnosis'] = False
+        st.session_state['history_cursors'] = []
         st.success("Logged out successfully.")
 
-    conn.close()  # Close database connection at the end
-
 if __name__ == "__main__":
-    main()
+    metrics.start_http_server()  # Only when ASD_METRICS_PORT is set
+
+    # With ASD_DEBUG_PARAMS=1, ?metrics=prometheus or ?metrics=json shows the process metrics instead of the app
+    debug_params = debug_params_enabled()
+    metrics_format = st.query_params.get("metrics") if debug_params else None
+    if metrics_format == "prometheus":
+        st.code(metrics.render_prometheus(), language="text")
+    elif metrics_format == "json":
+        st.json(metrics.snapshot())
+    # ?profile=1 profiles this rerun and shows the hottest calls
+    elif debug_params and st.query_params.get("profile") == "1":
+        with metrics.profile() as profiled, metrics.span("rerun"):
+            main()
+        with st.expander("Profile of this rerun"):
+            st.code(profiled["stats"], language="text")
+    else:
+        with metrics.span("rerun"):
+            main()
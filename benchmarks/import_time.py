@@ -0,0 +1,148 @@
+"""Cold-start import budget for autism_diagnosis_app.py.
+
+A new Streamlit server process pays for every module the app imports before
+it can draw the first page. This benchmark imports the app in fresh
+interpreters and checks the median import time (on top of ``streamlit``
+itself) against a budget. It then renders each page once, in a fresh
+interpreter against a scratch database, and checks that heavy libraries
+load only on the pages that use them::
+
+    python benchmarks/import_time.py --runs 5 --budget-ms 150
+    python benchmarks/import_time.py --output results/import-head.json
+
+Exits non-zero when the budget is exceeded or a page loads a module it
+should not.
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import time
+
+from load_test import APP_SCRIPT, REPO_DIR, git_commit, prepare_workdir
+
+HEAVY_MODULES = ["pandas", "fpdf", "smtplib", "sklearn", "model_registry", "dotenv"]
+
+# Modules each page must not import just to be drawn
+PAGE_FORBIDDEN = {
+    "Home": ["pandas", "fpdf", "smtplib", "sklearn", "model_registry"],
+    "Signup": ["pandas", "fpdf", "smtplib", "sklearn", "model_registry"],
+    "Login": ["pandas", "fpdf", "smtplib", "sklearn", "model_registry"],
+    "Contact Us": ["pandas", "fpdf", "sklearn", "model_registry"],
+    "Autism Diagnosis": ["smtplib"],
+    "Diagnosis History": ["smtplib", "sklearn", "model_registry"],
+}
+LOGGED_IN_PAGES = {"Autism Diagnosis", "Diagnosis History"}
+
+IMPORT_SNIPPET = """
+import json, sys, time
+start = time.perf_counter()
+import streamlit
+middle = time.perf_counter()
+import autism_diagnosis_app
+end = time.perf_counter()
+print(json.dumps({"streamlit_s": middle - start, "app_s": end - middle,
+                  "modules": [m for m in %r if m in sys.modules]}))
+"""
+
+PAGE_SNIPPET = """
+import json, sys, time
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file(%r, default_timeout=60)
+if %r:
+    at.session_state["logged_in"] = True
+    at.session_state["username"] = "import-benchmark"
+start = time.perf_counter()
+at.run()
+at.sidebar.selectbox[0].select(%r).run()
+print(json.dumps({"render_s": time.perf_counter() - start,
+                  "errors": [e.value for e in at.exception],
+                  "modules": [m for m in %r if m in sys.modules]}))
+"""
+
+
+def run_snippet(snippet, cwd):
+    """Run ``snippet`` in a fresh interpreter and parse the JSON line it prints."""
+    env = dict(os.environ, PYTHONPATH=REPO_DIR, ASD_METRICS="0")
+    completed = subprocess.run([sys.executable, "-c", snippet], cwd=cwd, env=env,
+                               capture_output=True, text=True, check=True)
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def measure_import(runs, workdir):
+    samples = [run_snippet(IMPORT_SNIPPET % HEAVY_MODULES, workdir) for _ in range(runs)]
+    return {
+        "runs": runs,
+        "streamlit_ms": statistics.median(s["streamlit_s"] for s in samples) * 1e3,
+        "app_ms": statistics.median(s["app_s"] for s in samples) * 1e3,
+        "app_max_ms": max(s["app_s"] for s in samples) * 1e3,
+        "modules": samples[-1]["modules"],
+    }
+
+
+def measure_pages(workdir):
+    app_path = os.path.join(workdir, APP_SCRIPT)
+    pages = {}
+    for page, forbidden in PAGE_FORBIDDEN.items():
+        result = run_snippet(PAGE_SNIPPET % (app_path, page in LOGGED_IN_PAGES, page, HEAVY_MODULES), workdir)
+        result["render_ms"] = result.pop("render_s") * 1e3
+        result["forbidden_loaded"] = [m for m in forbidden if m in result["modules"]]
+        pages[page] = result
+    return pages
+
+
+def print_report(results, budget_ms):
+    imports = results["import"]
+    print(f"import streamlit     {imports['streamlit_ms']:8.1f} ms (median of {imports['runs']})")
+    print(f"import app           {imports['app_ms']:8.1f} ms (max {imports['app_max_ms']:.1f}, budget {budget_ms:.0f})")
+    print(f"  heavy modules: {', '.join(imports['modules']) or 'none'}")
+    print(f"\n{'page':18s} {'first render ms':>16s}  heavy modules loaded")
+    for page, result in results["pages"].items():
+        flag = f"  <-- should not load {', '.join(result['forbidden_loaded'])}" if result["forbidden_loaded"] else ""
+        print(f"{page:18s} {result['render_ms']:16.1f}  {', '.join(result['modules']) or 'none'}{flag}")
+        for error in result["errors"]:
+            print(f"ERROR {page}: {error}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters used to time the import")
+    parser.add_argument("--budget-ms", type=float, default=150.0,
+                        help="fail if the median app import (after streamlit) takes longer")
+    parser.add_argument("--output", help="write machine-readable results to this JSON file")
+    args = parser.parse_args(argv)
+
+    workdir = prepare_workdir()
+    try:
+        results = {"import": measure_import(args.runs, workdir), "pages": measure_pages(workdir)}
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    results["meta"] = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "budget_ms": args.budget_ms,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+    }
+    print_report(results, args.budget_ms)
+
+    if args.output:
+        output_path = os.path.abspath(args.output)
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        with open(output_path, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nWrote {output_path}")
+
+    ok = results["import"]["app_ms"] <= args.budget_ms and not any(
+        result["forbidden_loaded"] or result["errors"] for result in results["pages"].values())
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
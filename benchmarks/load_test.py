@@ -0,0 +1,310 @@
+"""Concurrent-session load test for autism_diagnosis_app.py.
+
+Each simulated session is a headless Streamlit ``AppTest`` that walks the
+same path a user does: open Home, sign up, log in, run a diagnosis (which
+renders the PDF offered for download), send the Contact Us form and log in
+again on the Register page of the same multipage app. Sessions
+are spread over concurrently running worker processes against a scratch copy
+of the app directory with a fresh database, so ``naz.db`` is never touched
+and no real email is sent.
+
+The report gives p50/p95/p99 rerun latency per step, throughput and
+resident memory per session, and is written as JSON so runs from different
+commits can be compared::
+
+    python benchmarks/load_test.py --sessions 16 --output results/head.json
+    python benchmarks/load_test.py --sessions 16 --compare results/head.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_SCRIPT = "autism_diagnosis_app.py"
+DATABASE_FILES = {"naz.db", "naz.db-wal", "naz.db-shm"}
+REGISTER_PAGE = "pages/1_Register.py"
+STEPS = ["home", "signup", "login", "diagnosis", "contact", "register_login"]
+
+
+class _NullSMTP:
+    """SMTP stand-in so the outbox worker never reaches a real server."""
+
+    def sendmail(self, sender, recipient, message):
+        return {}
+
+    def quit(self):
+        pass
+
+
+def prepare_workdir():
+    """Link the app's files into a scratch directory with no database."""
+    workdir = tempfile.mkdtemp(prefix="asd-load-test-")
+    for name in os.listdir(REPO_DIR):
+        if name in DATABASE_FILES or name.startswith("."):
+            continue
+        os.symlink(os.path.join(REPO_DIR, name), os.path.join(workdir, name))
+    return workdir
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a list of samples."""
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[rank]
+
+
+def summarize(samples):
+    if not samples:
+        return {"count": 0}
+    return {
+        "count": len(samples),
+        "mean_ms": sum(samples) / len(samples) * 1e3,
+        "p50_ms": percentile(samples, 50) * 1e3,
+        "p95_ms": percentile(samples, 95) * 1e3,
+        "p99_ms": percentile(samples, 99) * 1e3,
+        "max_ms": max(samples) * 1e3,
+    }
+
+
+def run_session(session_id, timeout):
+    """Walk one user through the app, returning {step: [rerun seconds]} and any errors."""
+    from streamlit.testing.v1 import AppTest
+
+    timings = {step: [] for step in STEPS}
+    errors = []
+    at = AppTest.from_file(os.path.join(os.getcwd(), APP_SCRIPT), default_timeout=timeout)
+
+    def rerun(step, action):
+        start = time.perf_counter()
+        action()
+        timings[step].append(time.perf_counter() - start)
+        if at.exception:
+            errors.append(f"{step}: {at.exception[0].value}")
+
+    def navigate(page):
+        return lambda: at.sidebar.selectbox[0].select(page).run()
+
+    username = f"loadtest-{session_id}-{os.getpid()}"
+    password = "load-test-password"
+
+    rerun("home", at.run)
+
+    rerun("signup", navigate("Signup"))
+    at.text_input[0].input(username)
+    at.text_input[1].input(password)
+    rerun("signup", at.button[0].click().run)
+
+    rerun("login", navigate("Login"))
+    at.text_input[0].input(username)
+    at.text_input[1].input(password)
+    rerun("login", at.button[0].click().run)
+    if "logged_in" not in at.session_state or not at.session_state["logged_in"]:
+        errors.append(f"login: not logged in ({', '.join(e.value for e in at.error) or 'no error shown'})")
+        return timings, errors
+
+    # The menu only gains "Autism Diagnosis" on the rerun after logging in
+    rerun("diagnosis", at.run)
+    rerun("diagnosis", navigate("Autism Diagnosis"))
+    rerun("diagnosis", at.button[0].click().run)
+    if not any(s.value.startswith("Diagnosis Result") for s in at.success):
+        errors.append("diagnosis: no result shown")
+
+    rerun("contact", navigate("Contact Us"))
+    at.text_input[0].input(f"Load Test {session_id}")
+    at.text_input[1].input(f"{username}@example.com")
+    at.text_area[0].input("Load test message")
+    rerun("contact", at.button[0].click().run)
+
+    # The Register page draws the same Login form in the same session; the step covers its login
+    rerun("register_login", lambda: at.switch_page(REGISTER_PAGE).run())
+    rerun("register_login", lambda: at.sidebar.radio[0].set_value("Login").run())
+    at.text_input[0].input(username)
+    at.text_input[1].input(password)
+    rerun("register_login", at.button[0].click().run)
+    if not any(s.value == f"Logged In as {username}" for s in at.success):
+        errors.append("register_login: not logged in")
+    return timings, errors
+
+
+def _max_rss_bytes():
+    # ru_maxrss is in KiB on Linux and bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+def run_worker(session_ids, timeout, workdir):
+    """Run a share of the sessions one after another inside a worker process."""
+    os.chdir(workdir)
+    sys.path.insert(0, REPO_DIR)
+    import email_outbox
+    import executors
+
+    # Start the outbox worker first so the app reuses it instead of dialling Gmail
+    outbox = email_outbox.start_worker(None, None, smtp_factory=lambda *args: _NullSMTP())
+    timings = {step: [] for step in STEPS}
+    errors = []
+    rss_after_first = None
+    try:
+        for session_id in session_ids:
+            session_timings, session_errors = run_session(session_id, timeout)
+            for step, samples in session_timings.items():
+                timings[step].extend(samples)
+            errors.extend(f"session {session_id} {error}" for error in session_errors)
+            if rss_after_first is None:
+                rss_after_first = _max_rss_bytes()
+    finally:
+        outbox.stop(timeout=10)
+        executors.shutdown()
+    return timings, errors, rss_after_first, _max_rss_bytes(), len(session_ids)
+
+
+def run(sessions, concurrency, timeout, workdir):
+    """Spread sessions over ``concurrency`` worker processes running at the same time.
+
+    AppTest swaps a process-global runtime in and out around every rerun, so
+    it cannot drive several sessions from threads; each worker process is an
+    independent app server sharing the same database file.
+    """
+    shares = [list(range(i, sessions, concurrency)) for i in range(concurrency)]
+    timings = {step: [] for step in STEPS}
+    errors = []
+    peak_rss = []
+    marginal_rss = []
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=concurrency) as executor:
+        futures = [executor.submit(run_worker, share, timeout, workdir) for share in shares if share]
+        for future in futures:
+            worker_timings, worker_errors, rss_after_first, rss_end, count = future.result()
+            for step, samples in worker_timings.items():
+                timings[step].extend(samples)
+            errors.extend(worker_errors)
+            peak_rss.append(rss_end)
+            if count > 1:
+                marginal_rss.append((rss_end - rss_after_first) / (count - 1))
+    elapsed = time.perf_counter() - start
+
+    all_samples = [sample for samples in timings.values() for sample in samples]
+    return {
+        "steps": {step: summarize(samples) for step, samples in timings.items()},
+        "overall": summarize(all_samples),
+        "throughput": {
+            "elapsed_s": elapsed,
+            "reruns_per_s": len(all_samples) / elapsed,
+            "sessions_per_s": sessions / elapsed,
+        },
+        "memory": {
+            "peak_rss_per_process_bytes": max(peak_rss),
+            "rss_per_session_bytes": max(peak_rss) * len(peak_rss) / sessions,
+            "marginal_rss_per_session_bytes": sum(marginal_rss) / len(marginal_rss) if marginal_rss else None,
+        },
+        "errors": errors,
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current, baseline_path, max_regression):
+    """Print per-step latency ratios against a baseline; return True if within budget."""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    ok = True
+    print(f"\nCompared with {baseline_path} (commit {baseline['meta'].get('commit')}):")
+    for step in STEPS + ["overall"]:
+        new = current["steps"].get(step) if step != "overall" else current["overall"]
+        old = baseline["steps"].get(step) if step != "overall" else baseline["overall"]
+        if not new or not old or not old.get("count") or not new.get("count"):
+            continue
+        for key in ("p50_ms", "p95_ms"):
+            ratio = new[key] / old[key] if old[key] else float("inf")
+            flag = ""
+            if ratio > max_regression:
+                flag = "  <-- regression"
+                ok = False
+            print(f"  {step:14s} {key}: {old[key]:8.1f} -> {new[key]:8.1f} ms ({ratio:.2f}x){flag}")
+    return ok
+
+
+def print_report(results):
+    print(f"{'step':14s} {'count':>6s} {'p50 ms':>9s} {'p95 ms':>9s} {'p99 ms':>9s}")
+    for step, stats in list(results["steps"].items()) + [("overall", results["overall"])]:
+        if stats["count"]:
+            print(f"{step:14s} {stats['count']:6d} {stats['p50_ms']:9.1f} {stats['p95_ms']:9.1f} {stats['p99_ms']:9.1f}")
+    throughput = results["throughput"]
+    memory = results["memory"]
+    print(f"\n{throughput['reruns_per_s']:.1f} reruns/s, {throughput['sessions_per_s']:.2f} sessions/s "
+          f"over {throughput['elapsed_s']:.1f}s")
+    print(f"peak RSS {memory['peak_rss_per_process_bytes'] / 2 ** 20:.1f} MiB per process, "
+          f"{memory['rss_per_session_bytes'] / 2 ** 20:.1f} MiB per session", end="")
+    if memory["marginal_rss_per_session_bytes"] is not None:
+        print(f", {memory['marginal_rss_per_session_bytes'] / 2 ** 20:.2f} MiB per extra session")
+    else:
+        print()
+    for error in results["errors"]:
+        print(f"ERROR {error}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=8, help="number of simulated user sessions")
+    parser.add_argument("--concurrency", type=int, default=None,
+                        help="worker processes running sessions at once (default: CPU count)")
+    parser.add_argument("--timeout", type=float, default=60.0, help="per-rerun timeout in seconds")
+    parser.add_argument("--output", help="write machine-readable results to this JSON file")
+    parser.add_argument("--compare", help="baseline JSON file to compare against")
+    parser.add_argument("--max-regression", type=float, default=1.25,
+                        help="fail --compare if a p50/p95 latency grows by more than this factor")
+    args = parser.parse_args(argv)
+
+    output_path = os.path.abspath(args.output) if args.output else None
+    compare_path = os.path.abspath(args.compare) if args.compare else None
+    concurrency = min(args.concurrency or os.cpu_count() or 1, args.sessions)
+    workdir = prepare_workdir()
+    try:
+        results = run(args.sessions, concurrency, args.timeout, workdir)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    results["meta"] = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "sessions": args.sessions,
+        "concurrency": concurrency,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+    print_report(results)
+
+    if output_path:
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        with open(output_path, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nWrote {output_path}")
+
+    ok = not results["errors"]
+    if compare_path:
+        ok = compare(results, compare_path, args.max_regression) and ok
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,256 @@
+"""Shared SQLite data layer for ``naz.db``.
+
+Streamlit reruns the page script on every widget interaction, so opening a
+connection and running DDL per rerun makes concurrent users contend on the
+database file lock. This module keeps a process-wide pool of connections in
+WAL journal mode (readers never block the writer), relies on sqlite3's
+per-connection statement cache so repeated queries are prepared once, and
+applies schema migrations once per process, tracked with ``PRAGMA
+user_version``.
+"""
+
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+DATABASE_NAME = 'naz.db'
+POOL_SIZE = 8
+POOL_TIMEOUT = 10.0  # Seconds to wait for a free connection
+BUSY_TIMEOUT = 5.0  # Seconds SQLite waits on a locked database
+STATEMENT_CACHE_SIZE = 128
+MAX_QUERY_PARAMETERS = 999  # SQLite's lowest default limit on ? parameters per statement
+
+# Schema migrations in order; each entry is a list of statements run in one transaction
+MIGRATIONS = [
+    [
+        'CREATE TABLE IF NOT EXISTS userstable(username TEXT PRIMARY KEY, password TEXT)',
+    ],
+    [
+        'CREATE TABLE IF NOT EXISTS email_outbox('
+        'id INTEGER PRIMARY KEY AUTOINCREMENT, sender TEXT, recipient TEXT, subject TEXT, body TEXT, '
+        "status TEXT NOT NULL DEFAULT 'pending', attempts INTEGER NOT NULL DEFAULT 0, "
+        'created_at REAL NOT NULL, next_attempt_at REAL NOT NULL, sent_at REAL, last_error TEXT)',
+        'CREATE INDEX IF NOT EXISTS email_outbox_due ON email_outbox(status, next_attempt_at)',
+    ],
+    [
+        'CREATE TABLE IF NOT EXISTS sessions('
+        'id TEXT PRIMARY KEY, username TEXT NOT NULL, created_at REAL NOT NULL, expires_at REAL NOT NULL)',
+        'CREATE INDEX IF NOT EXISTS sessions_expiry ON sessions(expires_at)',
+        'CREATE TABLE IF NOT EXISTS app_settings(key TEXT PRIMARY KEY, value TEXT NOT NULL)',
+    ],
+    [
+        'CREATE TABLE IF NOT EXISTS diagnoses('
+        'id INTEGER PRIMARY KEY AUTOINCREMENT, username TEXT NOT NULL, created_at REAL NOT NULL, '
+        'social_responsiveness INTEGER, age INTEGER, speech_delay INTEGER, learning_disorder INTEGER, '
+        'genetic_disorders INTEGER, depression INTEGER, intellectual_disability INTEGER, '
+        'social_behavioral_issues INTEGER, anxiety_disorder INTEGER, sex INTEGER, jaundice INTEGER, '
+        'family_history_asd INTEGER, prediction INTEGER NOT NULL, probability REAL)',
+        # Serves keyset pagination: WHERE username = ? AND (created_at, id) < (?, ?) ORDER BY created_at DESC, id DESC
+        'CREATE INDEX IF NOT EXISTS diagnoses_user_time ON diagnoses(username, created_at)',
+    ],
+]
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def _connect(path):
+    conn = sqlite3.connect(
+        path,
+        timeout=BUSY_TIMEOUT,
+        check_same_thread=False,  # Pooled connections move between script threads
+        cached_statements=STATEMENT_CACHE_SIZE,
+    )
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    return conn
+
+
+def migrate(conn):
+    """Apply any migrations newer than the database's user_version."""
+    current = conn.execute('PRAGMA user_version').fetchone()[0]
+    if current >= len(MIGRATIONS):
+        return
+    # Take the write lock first so concurrent processes migrate one at a time
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        current = conn.execute('PRAGMA user_version').fetchone()[0]
+        for version, statements in enumerate(MIGRATIONS[current:], start=current + 1):
+            for statement in statements:
+                conn.execute(statement)
+            conn.execute(f'PRAGMA user_version = {version}')
+        conn.execute('COMMIT')
+    except BaseException:
+        conn.execute('ROLLBACK')
+        raise
+
+
+class ConnectionPool:
+    """Fixed-size pool of SQLite connections shared by every session in the process."""
+
+    def __init__(self, path, size=POOL_SIZE):
+        self.path = path
+        self.size = size
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def _acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._created < self.size:
+                conn = _connect(self.path)
+                self._created += 1
+                return conn
+        try:
+            return self._idle.get(timeout=POOL_TIMEOUT)
+        except queue.Empty:
+            raise sqlite3.OperationalError(f'No free database connection after {POOL_TIMEOUT} seconds') from None
+
+    def _release(self, conn):
+        if conn.in_transaction:
+            conn.rollback()
+        self._idle.put(conn)
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection, returning it to the pool afterwards."""
+        conn = self._acquire()
+        try:
+            yield conn
+        finally:
+            self._release(conn)
+
+    def close(self):
+        """Close every idle connection."""
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self._lock:
+                self._created -= 1
+
+
+def get_pool(path=DATABASE_NAME):
+    """Return the process-wide pool for ``path``, migrating the schema on first use."""
+    pool = _pools.get(path)
+    if pool is not None:
+        return pool
+    with _pools_lock:
+        pool = _pools.get(path)
+        if pool is None:
+            pool = ConnectionPool(path)
+            with pool.connection() as conn:
+                migrate(conn)
+            _pools[path] = pool
+    return pool
+
+
+@contextmanager
+def connection(path=DATABASE_NAME):
+    """Borrow a pooled connection to ``path``."""
+    with get_pool(path).connection() as conn:
+        yield conn
+
+
+def add_user(username, password, path=DATABASE_NAME):
+    """Insert a user; raises sqlite3.IntegrityError if the username is taken."""
+    with connection(path) as conn:
+        with conn:
+            conn.execute('INSERT INTO userstable(username, password) VALUES (?, ?)', (username, password))
+
+
+def add_users(users, path=DATABASE_NAME):
+    """Insert (username, password_hash) pairs in one transaction; returns the positions skipped.
+
+    Usernames that already exist, or repeat within ``users``, are skipped
+    instead of failing the batch.
+    """
+    users = list(users)
+    with connection(path) as conn:
+        # Take the write lock first, so the duplicate check and the insert see the same table
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            taken = set()
+            names = [username for username, _ in users]
+            for start in range(0, len(names), MAX_QUERY_PARAMETERS):
+                batch = names[start:start + MAX_QUERY_PARAMETERS]
+                placeholders = ','.join('?' * len(batch))
+                taken.update(row[0] for row in conn.execute(
+                    f'SELECT username FROM userstable WHERE username IN ({placeholders})', batch))
+            new_users, skipped = [], []
+            for index, (username, password_hash) in enumerate(users):
+                if username in taken:
+                    skipped.append(index)
+                else:
+                    taken.add(username)
+                    new_users.append((username, password_hash))
+            conn.executemany('INSERT INTO userstable(username, password) VALUES (?, ?)', new_users)
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+    return skipped
+
+
+def iter_users(path=DATABASE_NAME, batch_size=10000):
+    """Yield (username, password_hash) for every user in username order, fetched in batches."""
+    with connection(path) as conn:
+        cursor = conn.execute('SELECT username, password FROM userstable ORDER BY username')
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield from rows
+
+
+def get_password_hash(username, path=DATABASE_NAME):
+    """Return the stored password hash for ``username``, or None if there is no such user."""
+    with connection(path) as conn:
+        row = conn.execute('SELECT password FROM userstable WHERE username = ?', (username,)).fetchone()
+    return row[0] if row else None
+
+
+def set_password_hash(username, password_hash, path=DATABASE_NAME):
+    """Replace a user's stored password hash."""
+    with connection(path) as conn:
+        with conn:
+            conn.execute('UPDATE userstable SET password = ? WHERE username = ?', (password_hash, username))
+
+
+def create_session(session_id, username, created_at, expires_at, path=DATABASE_NAME):
+    """Record a new login session, dropping sessions that have expired."""
+    with connection(path) as conn:
+        with conn:
+            conn.execute('DELETE FROM sessions WHERE expires_at < ?', (created_at,))
+            conn.execute(
+                'INSERT INTO sessions(id, username, created_at, expires_at) VALUES (?, ?, ?, ?)',
+                (session_id, username, created_at, expires_at),
+            )
+
+
+def find_session(session_id, path=DATABASE_NAME):
+    """Return (username, expires_at) for a live session id, or None."""
+    with connection(path) as conn:
+        return conn.execute('SELECT username, expires_at FROM sessions WHERE id = ?', (session_id,)).fetchone()
+
+
+def delete_session(session_id, path=DATABASE_NAME):
+    """Forget a session id, e.g. on logout."""
+    with connection(path) as conn:
+        with conn:
+            conn.execute('DELETE FROM sessions WHERE id = ?', (session_id,))
+
+
+def get_setting(key, default, path=DATABASE_NAME):
+    """Return the value stored under ``key``, storing ``default`` first if it is unset."""
+    with connection(path) as conn:
+        with conn:
+            conn.execute('INSERT OR IGNORE INTO app_settings(key, value) VALUES (?, ?)', (key, default))
+        return conn.execute('SELECT value FROM app_settings WHERE key = ?', (key,)).fetchone()[0]
@@ -0,0 +1,166 @@
+"""Compact, memory-mapped columnar cache of ``asd_data_csv.csv``.
+
+``pd.read_csv`` parses the CSV into int64 columns although every value is a
+small integer and 11 of the 13 columns are 0/1 flags. The cache stores the
+CSV once in a smaller form:
+
+* identical rows are collapsed into one, with a ``counts`` column holding how
+  often each occurred;
+* small-integer columns are stored as uint8;
+* 0/1 flag columns are bit-packed, eight rows per byte.
+
+The cache is a ``mapped_file`` container. It remembers the CSV's size and
+modification time and is rebuilt only when the CSV changes. Build
+it ahead of time with::
+
+    python dataset.py
+"""
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+import mapped_file
+from schema import DATASET_FILE
+
+CACHE_FILE = "asd_data.cols"
+READ_CHUNK_ROWS = 1_000_000
+
+MAGIC = b"ASDCOLS\0"
+FORMAT_VERSION = 2
+
+
+class DatasetError(ValueError):
+    """Raised when the CSV cannot be stored compactly or a cache file is unreadable."""
+
+
+def _source_stamp(csv_path):
+    stat = os.stat(csv_path)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+class CompactDataset:
+    """The distinct rows of the dataset, column by column, with their counts."""
+
+    def __init__(self, columns, stored, counts):
+        self.columns = list(columns)
+        self._stored = stored  # name -> (kind, array); kind is "u8" or "bits"
+        self.counts = counts
+
+    @property
+    def n_unique(self):
+        return len(self.counts)
+
+    @property
+    def n_rows(self):
+        """Row count of the original CSV, duplicates included."""
+        return int(self.counts.sum(dtype=np.int64))
+
+    @property
+    def nbytes(self):
+        return self.counts.nbytes + sum(array.nbytes for _, array in self._stored.values())
+
+    def column(self, name):
+        """Values of one column for each distinct row, as uint8."""
+        kind, array = self._stored[name]
+        if kind == "bits":
+            return np.unpackbits(array, count=self.n_unique)
+        return array
+
+    def to_frame(self, columns=None, expand=False):
+        """Return the distinct rows as a uint8 DataFrame with a ``Count`` column.
+
+        With ``expand=True`` each row is repeated ``Count`` times instead,
+        which reproduces the CSV's rows (though not their order).
+        """
+        columns = self.columns if columns is None else columns
+        frame = pd.DataFrame({name: self.column(name) for name in columns})
+        if expand:
+            return frame.loc[frame.index.repeat(self.counts)].reset_index(drop=True)
+        frame["Count"] = self.counts
+        return frame
+
+
+def _unique_rows(matrix, counts=None):
+    # Collapse identical rows of a uint8 matrix, summing their counts
+    radices = matrix.max(axis=0, initial=0).astype(np.int64) + 1
+    if np.prod(radices.astype(np.float64)) < 2 ** 62:
+        # Sorting one mixed-radix int64 key per row is much faster than np.unique(axis=0)
+        keys = np.zeros(len(matrix), dtype=np.int64)
+        for column, radix in enumerate(radices):
+            keys = keys * radix + matrix[:, column]
+        keys, inverse = np.unique(keys, return_inverse=True)
+        rows = np.empty((len(keys), matrix.shape[1]), dtype=np.uint8)
+        for column in range(matrix.shape[1] - 1, -1, -1):
+            keys, rows[:, column] = np.divmod(keys, radices[column])
+    else:
+        rows, inverse = np.unique(matrix, axis=0, return_inverse=True)
+    inverse = inverse.reshape(-1)
+    return rows, np.bincount(inverse, weights=counts, minlength=len(rows)).astype(np.uint32)
+
+
+def build_cache(csv_path=DATASET_FILE, cache_path=CACHE_FILE, chunk_rows=READ_CHUNK_ROWS):
+    """Convert the CSV into a cache file, reading it in chunks of ``chunk_rows``."""
+    stamp = _source_stamp(csv_path)
+    columns = None
+    parts, part_counts = [], []
+    for chunk in pd.read_csv(csv_path, chunksize=chunk_rows):
+        if columns is None:
+            columns = list(chunk.columns)
+        values = chunk.to_numpy()
+        if values.dtype.kind not in "iu" or (values.size and (values.min() < 0 or values.max() > 255)):
+            raise DatasetError(f"{csv_path} has values that do not fit in uint8.")
+        rows, counts = _unique_rows(values.astype(np.uint8))
+        parts.append(rows)
+        part_counts.append(counts)
+    if columns is None:
+        raise DatasetError(f"{csv_path} is empty.")
+    rows, counts = _unique_rows(np.concatenate(parts), np.concatenate(part_counts))
+
+    arrays, kinds = {}, {}
+    for index, name in enumerate(columns):
+        values = rows[:, index]
+        if values.max(initial=0) <= 1:
+            arrays[name], kinds[name] = np.packbits(values), "bits"
+        else:
+            arrays[name], kinds[name] = values, "u8"
+    arrays["__counts__"] = counts.astype("<u4")
+
+    header = {"source": stamp, "columns": columns, "kinds": kinds, "n_unique": len(counts)}
+    mapped_file.write(cache_path, MAGIC, FORMAT_VERSION, header, arrays)
+
+
+def _read_cache(cache_path):
+    # Return (header, dataset) for a cache file, memory-mapped read-only
+    try:
+        header, arrays = mapped_file.read(cache_path, MAGIC, FORMAT_VERSION, "dataset cache")
+    except mapped_file.MappedFileError as e:
+        raise DatasetError(str(e)) from e
+    counts = arrays.pop("__counts__")
+    stored = {name: (header["kinds"][name], arrays[name]) for name in header["columns"]}
+    return header, CompactDataset(header["columns"], stored, counts)
+
+
+def load_dataset(csv_path=DATASET_FILE, cache_path=CACHE_FILE):
+    """Return the dataset from its cache, rebuilding the cache if the CSV has changed."""
+    stamp = _source_stamp(csv_path)
+    try:
+        header, data = _read_cache(cache_path)
+        if header["source"] == stamp:
+            return data
+    except DatasetError:
+        pass
+    build_cache(csv_path, cache_path)
+    return _read_cache(cache_path)[1]
+
+
+if __name__ == "__main__":
+    csv_path = sys.argv[1] if len(sys.argv) > 1 else DATASET_FILE
+    cache_path = sys.argv[2] if len(sys.argv) > 2 else CACHE_FILE
+    build_cache(csv_path, cache_path)
+    data = load_dataset(csv_path, cache_path)
+    frame_bytes = pd.read_csv(csv_path).memory_usage(deep=True).sum()
+    print(f"Wrote {cache_path}: {data.n_rows} rows as {data.n_unique} distinct rows, "
+          f"{data.nbytes} bytes of columns (read_csv frame: {frame_bytes} bytes)")
@@ -0,0 +1,157 @@
+"""Persistent diagnosis history in the ``diagnoses`` table of ``naz.db``.
+
+Pressing Diagnose only queues the result in memory; a single writer thread
+per process collects queued results and inserts them in batches (one
+transaction per batch rather than per diagnosis). ``flush`` waits until
+everything queued so far is written, so a page that reads the history right
+after a diagnosis sees it.
+
+History is read with keyset pagination: each page is the next ``limit`` rows
+before a ``(created_at, id)`` cursor, served straight from the
+``(username, created_at)`` index, so page 1000 costs the same as page 1.
+"""
+
+import atexit
+import queue
+import threading
+import time
+
+import database
+import metrics
+
+BATCH_SIZE = 256
+FLUSH_INTERVAL = 0.5  # Seconds a result may wait in memory before being written
+PAGE_SIZE = 25
+
+INPUT_COLUMNS = [
+    'social_responsiveness',
+    'age',
+    'speech_delay',
+    'learning_disorder',
+    'genetic_disorders',
+    'depression',
+    'intellectual_disability',
+    'social_behavioral_issues',
+    'anxiety_disorder',
+    'sex',
+    'jaundice',
+    'family_history_asd',
+]
+COLUMNS = ['id', 'username', 'created_at'] + INPUT_COLUMNS + ['prediction', 'probability']
+
+_INSERT = (
+    f"INSERT INTO diagnoses(username, created_at, {', '.join(INPUT_COLUMNS)}, prediction, probability) "
+    f"VALUES ({', '.join('?' * (len(INPUT_COLUMNS) + 4))})"
+)
+_SELECT = f"SELECT {', '.join(COLUMNS)} FROM diagnoses"
+
+
+class HistoryWriter(threading.Thread):
+    """Background thread that writes queued diagnoses in batches."""
+
+    def __init__(self, path=database.DATABASE_NAME):
+        super().__init__(name='diagnosis-history', daemon=True)
+        self.path = path
+        self._queue = queue.SimpleQueue()
+
+    def submit(self, row):
+        self._queue.put(row)
+
+    def flush(self, timeout=None):
+        """Block until every row submitted before this call has been written."""
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def run(self):
+        while True:
+            batch, waiters = [], []
+            item = self._queue.get()
+            deadline = time.monotonic() + FLUSH_INTERVAL
+            # Keep collecting until the batch is full, the interval is up or someone flushes
+            while True:
+                if isinstance(item, threading.Event):
+                    waiters.append(item)
+                    break
+                batch.append(item)
+                if len(batch) >= BATCH_SIZE:
+                    break
+                try:
+                    item = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+            if batch:
+                try:
+                    self._write(batch)
+                except Exception:
+                    metrics.incr("history_write_failures", len(batch))
+            for waiter in waiters:
+                waiter.set()
+
+    def _write(self, batch):
+        with metrics.span("history_write"):
+            with database.connection(self.path) as conn:
+                with conn:
+                    conn.executemany(_INSERT, batch)
+        metrics.incr("history_rows_written", len(batch))
+
+
+_writers = {}
+_writers_lock = threading.Lock()
+
+
+def _writer(path):
+    writer = _writers.get(path)
+    if writer is None:
+        with _writers_lock:
+            writer = _writers.get(path)
+            if writer is None:
+                writer = HistoryWriter(path)
+                writer.start()
+                _writers[path] = writer
+    return writer
+
+
+def record(username, inputs, prediction, probability, path=database.DATABASE_NAME):
+    """Queue one diagnosis for writing; returns immediately."""
+    row = (username, time.time(), *(int(value) for value in inputs), int(prediction),
+           None if probability is None else float(probability))
+    _writer(path).submit(row)
+
+
+def flush(path=database.DATABASE_NAME, timeout=10.0):
+    """Write everything queued for ``path`` so far."""
+    writer = _writers.get(path)
+    return True if writer is None else writer.flush(timeout)
+
+
+@atexit.register
+def _flush_all():
+    for writer in list(_writers.values()):
+        writer.flush(timeout=5.0)
+
+
+def fetch_page(username, cursor=None, limit=PAGE_SIZE, path=database.DATABASE_NAME):
+    """Return up to ``limit`` of a user's diagnoses, newest first, older than ``cursor``.
+
+    ``cursor`` is the ``(created_at, id)`` of the last row of the previous
+    page, or None for the first page. Rows are dicts keyed by ``COLUMNS``.
+    """
+    with database.connection(path) as conn:
+        if cursor is None:
+            rows = conn.execute(
+                f"{_SELECT} WHERE username = ? ORDER BY created_at DESC, id DESC LIMIT ?",
+                (username, limit),
+            ).fetchall()
+        else:
+            rows = conn.execute(
+                f"{_SELECT} WHERE username = ? AND (created_at, id) < (?, ?) "
+                "ORDER BY created_at DESC, id DESC LIMIT ?",
+                (username, cursor[0], cursor[1], limit),
+            ).fetchall()
+    return [dict(zip(COLUMNS, row)) for row in rows]
+
+
+def next_cursor(page):
+    """Cursor for the page after ``page``."""
+    return (page[-1]['created_at'], page[-1]['id']) if page else None
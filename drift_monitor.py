@@ -0,0 +1,142 @@
+"""Streaming input-drift monitor for the diagnosis form.
+
+Every diagnosis adds its 12 inputs to per-feature histograms held in one
+fixed (12, 19) array, with a bin for every value the form can produce
+(Social Responsiveness 0-10, Age 0-18, 0/1 for the rest). Two views are kept:
+the lifetime counts and a recent window whose counts decay by ``DECAY`` per
+observation, which weights roughly the last ``1 / (1 - DECAY)`` diagnoses.
+Observing costs the same few array operations however much traffic has been
+seen, and memory never grows.
+
+Drift is scored per feature as the population stability index of the recent
+window against a baseline profile of ``asd_data_csv.csv``::
+
+    PSI = sum((recent - baseline) * ln(recent / baseline))
+
+Below ``MODERATE_PSI`` a feature is stable; above ``SIGNIFICANT_PSI`` its
+mix has clearly moved. Scores are pushed to ``metrics`` gauges every
+``GAUGE_INTERVAL`` observations and shown on the app's Drift Monitor page.
+"""
+
+import re
+import threading
+
+import numpy as np
+
+import metrics
+import prediction_table
+from schema import DATASET_FILE, FEATURE_COLUMNS
+
+BINS = [prediction_table.RESPONSIVENESS_VALUES, prediction_table.AGE_VALUES] + [2] * prediction_table.FLAG_COUNT
+
+DECAY = 0.998  # Recent window of about 500 diagnoses
+MIN_OBSERVATIONS = 30  # Fewer recent diagnoses than this are not scored
+GAUGE_INTERVAL = 32
+MODERATE_PSI = 0.1
+SIGNIFICANT_PSI = 0.25
+SMOOTHING = 0.5  # Pseudo-count per bin, so empty bins keep PSI finite
+
+
+def gauge_name(column):
+    return "drift_psi_" + re.sub(r"[^a-z0-9]+", "_", column.lower()).strip("_")
+
+
+def status(psi):
+    if psi is None:
+        return "Not enough data"
+    if psi >= SIGNIFICANT_PSI:
+        return "Significant drift"
+    if psi >= MODERATE_PSI:
+        return "Moderate drift"
+    return "Stable"
+
+
+def baseline_counts(csv_path=DATASET_FILE):
+    """Per-feature value counts of the training data, shape (12, max bins)."""
+    import dataset
+
+    data = dataset.load_dataset(csv_path)
+    counts = np.zeros((len(FEATURE_COLUMNS), max(BINS)))
+    for i, (column, bins) in enumerate(zip(FEATURE_COLUMNS, BINS)):
+        values = np.minimum(data.column(column), bins - 1)
+        counts[i, :bins] = np.bincount(values, weights=data.counts, minlength=bins)
+    return counts
+
+
+class DriftMonitor:
+    """Constant-memory histograms of live inputs, scored against a baseline."""
+
+    def __init__(self, baseline, decay=DECAY, min_observations=MIN_OBSERVATIONS):
+        self.baseline = np.asarray(baseline, dtype=np.float64)
+        self.decay = decay
+        self.min_observations = min_observations
+        self._features = np.arange(len(FEATURE_COLUMNS))
+        self._upper = np.array(BINS) - 1
+        self._mask = np.arange(self.baseline.shape[1]) < np.array(BINS)[:, None]
+        self._values = np.where(self._mask, np.arange(self.baseline.shape[1]), 0)
+        self._lock = threading.Lock()
+        self.reset()
+
+    @classmethod
+    def from_dataset(cls, csv_path=DATASET_FILE, **kwargs):
+        return cls(baseline_counts(csv_path), **kwargs)
+
+    def reset(self):
+        with self._lock:
+            self.total = np.zeros_like(self.baseline)
+            self.recent = np.zeros_like(self.baseline)
+            self.observed = 0
+
+    def observe(self, row):
+        """Add one 12-value input row; out-of-range values count in the nearest bin."""
+        bins = np.clip(np.asarray(row, dtype=np.int64), 0, self._upper)
+        with self._lock:
+            self.total[self._features, bins] += 1
+            self.recent *= self.decay
+            self.recent[self._features, bins] += 1
+            self.observed += 1
+            push = self.observed % GAUGE_INTERVAL == 0
+        if push:
+            self.push_gauges()
+
+    def _proportions(self, counts):
+        smoothed = np.where(self._mask, counts + SMOOTHING, 0.0)
+        return smoothed / smoothed.sum(axis=1, keepdims=True)
+
+    def scores(self):
+        """PSI of the recent window per feature, or None before ``min_observations``."""
+        with self._lock:
+            recent = self.recent.copy()
+            observed = self.observed
+        if observed < self.min_observations:
+            return {column: None for column in FEATURE_COLUMNS}
+        expected = self._proportions(self.baseline)
+        actual = self._proportions(recent)
+        ratio = np.log(np.divide(actual, expected, out=np.ones_like(actual), where=self._mask))
+        psi = ((actual - expected) * ratio).sum(axis=1)
+        return {column: float(value) for column, value in zip(FEATURE_COLUMNS, psi)}
+
+    def push_gauges(self):
+        scores = self.scores()
+        if scores[FEATURE_COLUMNS[0]] is None:
+            return
+        for column, psi in scores.items():
+            metrics.set_gauge(gauge_name(column), round(psi, 6))
+        metrics.set_gauge("drift_psi_max", round(max(scores.values()), 6))
+
+    def report(self):
+        """One row per feature: baseline and recent mean, PSI and a status."""
+        scores = self.scores()
+        with self._lock:
+            recent = self.recent.copy()
+            observed = self.observed
+        baseline_mean = (self.baseline * self._values).sum(axis=1) / self.baseline.sum(axis=1)
+        weight = recent.sum(axis=1)
+        recent_mean = np.divide((recent * self._values).sum(axis=1), weight,
+                                out=np.full(len(weight), np.nan), where=weight > 0)
+        return [
+            {"feature": column, "baseline_mean": float(baseline_mean[i]),
+             "recent_mean": float(recent_mean[i]) if observed else None,
+             "psi": scores[column], "status": status(scores[column])}
+            for i, column in enumerate(FEATURE_COLUMNS)
+        ]
@@ -0,0 +1,207 @@
+"""Durable outbox for Contact Us emails, delivered by a background thread.
+
+Submitting the form only inserts a row into the ``email_outbox`` table of
+``naz.db``. A single worker thread per process drains the table in batches
+over one authenticated SMTP connection that it keeps open between batches,
+retrying failed messages with exponential backoff. The SMTP host, port and
+connection factory are configurable so the worker can be pointed at a local
+SMTP stand-in.
+
+Several processes may share one database (more than one Streamlit server,
+say), each with its own worker. A worker claims a batch before sending it:
+under the write lock it marks the rows ``sending`` with a lease of
+``CLAIM_LEASE`` seconds, so no other worker picks them up. If a worker dies
+mid-batch, its rows become due again once the lease runs out.
+
+``smtplib`` is only imported once there is mail to send, so starting the
+worker with every server process costs nothing on an empty outbox.
+"""
+
+import threading
+import time
+
+import database
+import metrics
+
+SMTP_HOST = 'smtp.gmail.com'
+SMTP_PORT = 587
+BATCH_SIZE = 20
+POLL_INTERVAL = 5.0  # Seconds between outbox scans when idle
+IDLE_DISCONNECT = 60.0  # Close the SMTP connection after this long without mail
+RETRY_BASE_DELAY = 10.0
+RETRY_MAX_DELAY = 3600.0
+MAX_ATTEMPTS = 8
+CLAIM_LEASE = 15 * 60.0  # Seconds a claimed batch is left to its worker; above BATCH_SIZE SMTP timeouts
+
+
+def enqueue(subject, body, sender, recipient, path=database.DATABASE_NAME):
+    """Queue a message for delivery and return its outbox id."""
+    with database.connection(path) as conn:
+        with conn:
+            cursor = conn.execute(
+                'INSERT INTO email_outbox(sender, recipient, subject, body, created_at, next_attempt_at) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (sender, recipient, subject, body, time.time(), 0),
+            )
+    worker = _worker
+    if worker is not None:
+        worker.wake()
+    return cursor.lastrowid
+
+
+def retry_delay(attempts):
+    """Backoff before the next attempt after ``attempts`` failures."""
+    return min(RETRY_BASE_DELAY * 2 ** (attempts - 1), RETRY_MAX_DELAY)
+
+
+def _starttls_smtp(host, port, user, password):
+    import smtplib
+    server = smtplib.SMTP(host, port, timeout=30)
+    server.starttls()
+    if user:
+        server.login(user, password)
+    return server
+
+
+class OutboxWorker(threading.Thread):
+    """Background thread that drains the outbox over a persistent SMTP connection."""
+
+    def __init__(self, user, password, host=SMTP_HOST, port=SMTP_PORT,
+                 path=database.DATABASE_NAME, smtp_factory=_starttls_smtp):
+        super().__init__(name='email-outbox', daemon=True)
+        self.user = user
+        self.password = password
+        self.host = host
+        self.port = port
+        self.path = path
+        self.smtp_factory = smtp_factory
+        self._server = None
+        self._last_used = 0.0
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+
+    def wake(self):
+        self._wakeup.set()
+
+    def stop(self, timeout=None):
+        self._stopping.set()
+        self._wakeup.set()
+        self.join(timeout)
+
+    def run(self):
+        while not self._stopping.is_set():
+            try:
+                attempted = self.deliver_due()
+            except Exception:
+                attempted = False
+            if not attempted:
+                if self._server is not None and time.time() - self._last_used > IDLE_DISCONNECT:
+                    self._disconnect()
+                self._wakeup.wait(POLL_INTERVAL)
+                self._wakeup.clear()
+        self._disconnect()
+
+    def _connection(self):
+        if self._server is None:
+            with metrics.span("smtp_connect"):
+                self._server = self.smtp_factory(self.host, self.port, self.user, self.password)
+        return self._server
+
+    def _disconnect(self):
+        if self._server is not None:
+            import smtplib
+            try:
+                self._server.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._server = None
+
+    def _claim_due(self):
+        # Due rows are pending ones whose retry time has come and claims whose lease ran out
+        now = time.time()
+        with database.connection(self.path) as conn:
+            # Take the write lock first, so no other worker can select the same rows
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                messages = conn.execute(
+                    "SELECT id, sender, recipient, subject, body, attempts FROM email_outbox "
+                    "WHERE status IN ('pending', 'sending') AND next_attempt_at <= ? ORDER BY id LIMIT ?",
+                    (now, BATCH_SIZE),
+                ).fetchall()
+                conn.executemany(
+                    "UPDATE email_outbox SET status = 'sending', next_attempt_at = ? WHERE id = ?",
+                    [(now + CLAIM_LEASE, message[0]) for message in messages],
+                )
+                conn.execute('COMMIT')
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+        return messages
+
+    def deliver_due(self):
+        """Claim and send one batch of due messages; returns True if anything was attempted."""
+        messages = self._claim_due()
+        if not messages:
+            return False
+        import smtplib
+        from email.mime.text import MIMEText
+
+        sent, failed = [], []
+        connect_error = None
+        for message_id, sender, recipient, subject, body, attempts in messages:
+            # If the server cannot be reached, the rest of the batch waits for a retry
+            if connect_error is None:
+                try:
+                    server = self._connection()
+                except (smtplib.SMTPException, OSError) as e:
+                    connect_error = e
+            if connect_error is not None:
+                failed.append((message_id, attempts + 1, repr(connect_error)))
+                continue
+
+            msg = MIMEText(body)
+            msg['Subject'] = subject
+            msg['From'] = sender
+            msg['To'] = recipient
+            try:
+                with metrics.span("smtp_send"):
+                    server.sendmail(sender, recipient, msg.as_string())
+            except (smtplib.SMTPException, OSError) as e:
+                # A broken connection is reopened on the next message
+                self._disconnect()
+                failed.append((message_id, attempts + 1, repr(e)))
+            else:
+                sent.append(message_id)
+        self._last_used = time.time()
+        metrics.incr("emails_sent", len(sent))
+        metrics.incr("email_send_failures", len(failed))
+
+        now = time.time()
+        with database.connection(self.path) as conn:
+            with conn:
+                conn.executemany(
+                    "UPDATE email_outbox SET status = 'sent', sent_at = ?, attempts = attempts + 1 WHERE id = ?",
+                    [(now, message_id) for message_id in sent],
+                )
+                conn.executemany(
+                    "UPDATE email_outbox SET status = ?, attempts = ?, next_attempt_at = ?, last_error = ? "
+                    "WHERE id = ?",
+                    [('failed' if attempts >= MAX_ATTEMPTS else 'pending', attempts,
+                      now + retry_delay(attempts), error, message_id)
+                     for message_id, attempts, error in failed],
+                )
+        return True
+
+
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def start_worker(user, password, **kwargs):
+    """Start the process-wide outbox worker if it is not already running."""
+    global _worker
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = OutboxWorker(user, password, **kwargs)
+            _worker.start()
+        return _worker
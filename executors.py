@@ -0,0 +1,146 @@
+"""Shared worker pools that keep heavy work off the Streamlit script thread.
+
+Every session's script runs on its own thread in one server process, so a
+long computation there blocks that user's page and holds the GIL against
+every other session. This module keeps one process-wide pool of worker
+processes (one per core) for CPU-bound jobs such as scoring uploaded CSV
+chunks and rendering PDF reports. Each worker loads a model version the
+first time a job needs it and keeps it for later jobs.
+
+Workers are started through a fork server (or spawned where there is none),
+never forked from the server process itself: that process runs many threads,
+and a forked child could inherit a lock one of them held and deadlock.
+
+``start_job`` submits a list of calls and returns a ``Job``, which the page
+keeps in ``st.session_state`` and polls for progress on later reruns
+instead of waiting.
+"""
+
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+CPU_WORKERS = os.cpu_count() or 1
+WORKER_MODEL_CACHE = 2  # Model versions a CPU worker keeps loaded
+
+_cpu_pool = None
+_pools_lock = threading.Lock()
+
+
+def _mp_context():
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+
+def cpu_pool():
+    """The process-wide process pool, created on first use."""
+    global _cpu_pool
+    with _pools_lock:
+        if _cpu_pool is None:
+            _cpu_pool = ProcessPoolExecutor(max_workers=CPU_WORKERS, mp_context=_mp_context())
+        return _cpu_pool
+
+
+def _replace_broken_pool(pool):
+    # A worker that died (e.g. killed for memory) breaks the whole pool; start a fresh one
+    global _cpu_pool
+    with _pools_lock:
+        if _cpu_pool is pool:
+            _cpu_pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def submit_cpu(fn, *args, **kwargs):
+    """Run ``fn(*args, **kwargs)`` in a worker process; returns a Future."""
+    pool = cpu_pool()
+    try:
+        return pool.submit(fn, *args, **kwargs)
+    except BrokenProcessPool:
+        _replace_broken_pool(pool)
+        return cpu_pool().submit(fn, *args, **kwargs)
+
+
+def shutdown(wait=True):
+    """Stop the process pool; the next submit starts a fresh one.
+
+    Needed before a ``multiprocessing`` child exits: the interpreter's own
+    pool cleanup does not run there, and the child would wait forever on its
+    idle workers.
+    """
+    global _cpu_pool
+    with _pools_lock:
+        pool, _cpu_pool = _cpu_pool, None
+    if pool is not None:
+        pool.shutdown(wait=wait)
+
+
+class Job:
+    """A group of futures the UI polls; results come back in submission order."""
+
+    def __init__(self, futures, description=""):
+        self.futures = futures
+        self.description = description
+        self.started_at = time.time()
+
+    @property
+    def total(self):
+        return len(self.futures)
+
+    @property
+    def completed(self):
+        return sum(future.done() for future in self.futures)
+
+    def progress(self):
+        return self.completed / self.total if self.futures else 1.0
+
+    def done(self):
+        return all(future.done() for future in self.futures)
+
+    def exception(self):
+        """The first failure among finished calls, or None."""
+        for future in self.futures:
+            if future.done() and future.exception() is not None:
+                return future.exception()
+        return None
+
+    def results(self):
+        return [future.result() for future in self.futures]
+
+    def cancel(self):
+        for future in self.futures:
+            future.cancel()
+
+
+def start_job(fn, calls, description=""):
+    """Submit ``fn(*args)`` for every ``args`` in ``calls`` to the process pool and return the Job."""
+    return Job([submit_cpu(fn, *args) for args in calls], description)
+
+
+# Model bundles loaded inside this worker process, most recent last
+_worker_models = {}
+
+
+def worker_model(version, directory):
+    """The model bundle for a version, loaded once per worker process."""
+    import model_registry
+
+    key = (version, directory)
+    bundle = _worker_models.pop(key, None)
+    if bundle is None:
+        bundle = model_registry.ModelBundle(version, directory)
+        while len(_worker_models) >= WORKER_MODEL_CACHE:
+            _worker_models.pop(next(iter(_worker_models)))
+    _worker_models[key] = bundle
+    return bundle
+
+
+def score_csv_chunk(version, directory, features, header):
+    """Score one chunk of an uploaded CSV in a worker and return it as CSV bytes."""
+    labels, _ = worker_model(version, directory).predict_many(features.to_numpy())
+    results = features.copy()
+    results["Prediction"] = labels
+    results["Diagnosis"] = ["Positive" if label == 1 else "Negative" for label in labels]
+    return results.to_csv(header=header, index=False).encode("utf-8")
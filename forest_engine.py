@@ -0,0 +1,205 @@
+"""Array-backed inference for the random forest + StandardScaler pipeline.
+
+The trees in ``autism_random_forest.pkl`` are flattened into contiguous NumPy
+arrays and the ``scaler.pkl`` StandardScaler is folded into the split
+thresholds, so raw (unscaled) inputs can be traversed directly. Outputs are
+bit-identical to ``classifier.predict(scaler.transform(X))``.
+"""
+
+import numpy as np
+
+TREE_LEAF = -1
+APPLY_BLOCK_ROWS = 512
+
+
+def _fold_thresholds(thresholds, features, mean, scale):
+    """Map scaled-space thresholds to the largest raw value that goes left.
+
+    sklearn compares ``float32((x - mean) / scale) <= threshold``. That
+    expression is monotone in ``x``, so the set of raw values going left is
+    ``x <= t`` for some float64 ``t``. We find ``t`` exactly by bisecting on
+    the ordered bit patterns of float64, which keeps the folded comparison
+    bit-identical to the scaled one.
+    """
+    def goes_left(raw):
+        scaled = ((raw - mean[features]) / scale[features]).astype(np.float32)
+        return scaled <= thresholds
+
+    def to_ordered(values):
+        bits = values.view(np.int64)
+        return np.where(bits < 0, np.int64(-(2 ** 63)) - bits, bits)
+
+    def from_ordered(ordered):
+        bits = np.where(ordered < 0, np.int64(-(2 ** 63)) - ordered, ordered)
+        return bits.view(np.float64)
+
+    # Bracket the answer: lo always goes left, hi never does
+    approx = thresholds.astype(np.float64) * scale[features] + mean[features]
+    lo = to_ordered(np.full_like(approx, -np.finfo(np.float64).max))
+    hi = to_ordered(np.full_like(approx, np.finfo(np.float64).max))
+    width = np.maximum(np.abs(approx), 1.0)
+    for step in (1e-6, 1e-3, 1.0, 1e3):
+        low_guess = approx - step * width
+        high_guess = approx + step * width
+        lo = np.where(goes_left(low_guess) & (to_ordered(low_guess) > lo), to_ordered(low_guess), lo)
+        hi = np.where(~goes_left(high_guess) & (to_ordered(high_guess) < hi), to_ordered(high_guess), hi)
+
+    while np.any(hi - 1 > lo):
+        mid = lo // 2 + hi // 2 + ((lo & 1) + (hi & 1)) // 2
+        left = goes_left(from_ordered(mid))
+        lo = np.where(left, mid, lo)
+        hi = np.where(left, hi, mid)
+    return from_ordered(lo)
+
+
+class CompiledForest:
+    """Flattened random forest that scores raw 12-feature rows."""
+
+    def __init__(self, feature, threshold, children, value, roots, depth, classes, n_features):
+        self.feature = feature
+        self.threshold = threshold
+        self.children = children
+        self.value = value
+        self.roots = roots
+        self.depth = depth
+        self.classes = classes
+        self.n_features = n_features
+
+    @property
+    def classes_(self):
+        return self.classes
+
+    @classmethod
+    def from_pipeline(cls, classifier, scaler=None):
+        """Compile a fitted RandomForestClassifier and optional StandardScaler."""
+        trees = [estimator.tree_ for estimator in classifier.estimators_]
+        n_features = classifier.n_features_in_
+        n_classes = len(classifier.classes_)
+
+        if scaler is not None and scaler.mean_ is not None:
+            mean = np.asarray(scaler.mean_, dtype=np.float64)
+        else:
+            mean = np.zeros(n_features)
+        if scaler is not None and scaler.scale_ is not None:
+            scale = np.asarray(scaler.scale_, dtype=np.float64)
+        else:
+            scale = np.ones(n_features)
+
+        offsets = np.cumsum([0] + [tree.node_count for tree in trees])
+        feature = np.concatenate([tree.feature for tree in trees]).astype(np.intp)
+        threshold = np.concatenate([tree.threshold for tree in trees])
+        left = np.concatenate([np.where(t.children_left == TREE_LEAF, np.arange(t.node_count), t.children_left) + o
+                               for t, o in zip(trees, offsets)]).astype(np.intp)
+        right = np.concatenate([np.where(t.children_right == TREE_LEAF, np.arange(t.node_count), t.children_right) + o
+                                for t, o in zip(trees, offsets)]).astype(np.intp)
+        value = np.concatenate([tree.value[:, 0, :n_classes] for tree in trees]).astype(np.float64)
+
+        # Leaves loop back to themselves on feature 0 with an always-true split
+        is_leaf = np.concatenate([tree.children_left == TREE_LEAF for tree in trees])
+        feature[is_leaf] = 0
+        folded = np.full(threshold.shape, np.inf)
+        split = ~is_leaf
+        folded[split] = _fold_thresholds(threshold[split], feature[split], mean, scale)
+
+        return cls(
+            feature=feature,
+            threshold=folded,
+            children=np.stack([left, right], axis=1).ravel(),
+            value=value,
+            roots=offsets[:-1].astype(np.intp),
+            depth=max(tree.max_depth for tree in trees),
+            classes=np.asarray(classifier.classes_),
+            n_features=n_features,
+        )
+
+    def _as_rows(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if X.ndim != 2 or X.shape[1] != self.n_features:
+            raise ValueError(f"Expected rows with {self.n_features} features, got shape {X.shape}")
+        if not np.isfinite(X).all():
+            raise ValueError("Input contains NaN or infinity.")
+        return X
+
+    def apply(self, X):
+        """Return the global leaf index reached in every tree, shape (n_rows, n_trees)."""
+        X = self._as_rows(X)
+        n_rows, n_trees = X.shape[0], len(self.roots)
+        flat_X = X.ravel()
+
+        # A single row needs no row offsets, which keeps per-level work minimal
+        if n_rows == 1:
+            node = self.roots
+            for _ in range(self.depth):
+                goes_right = flat_X.take(self.feature.take(node)) > self.threshold.take(node)
+                node = self.children.take(2 * node + goes_right)
+            return node.reshape(1, n_trees)
+        leaves = np.empty((n_rows, n_trees), dtype=np.intp)
+
+        # Small row blocks keep the working set in cache; buffers are reused
+        block = min(n_rows, APPLY_BLOCK_ROWS)
+        size = block * n_trees
+        index = np.empty(size, dtype=np.intp)
+        values = np.empty(size)
+        thresholds = np.empty(size)
+        goes_right = np.empty(size, dtype=bool)
+        for start in range(0, n_rows, block):
+            stop = min(start + block, n_rows)
+            size = (stop - start) * n_trees
+            row_offset = np.repeat(np.arange(start, stop) * self.n_features, n_trees)
+            node = np.tile(self.roots, stop - start)
+            for _ in range(self.depth):
+                np.take(self.feature, node, out=index[:size])
+                index[:size] += row_offset
+                np.take(flat_X, index[:size], out=values[:size])
+                np.take(self.threshold, node, out=thresholds[:size])
+                np.greater(values[:size], thresholds[:size], out=goes_right[:size])
+                node *= 2
+                node += goes_right[:size]
+                np.take(self.children, node, out=node)
+            leaves[start:stop] = node.reshape(stop - start, n_trees)
+        return leaves
+
+    def predict_proba(self, X):
+        """Class probabilities averaged over trees, summed in estimator order like sklearn."""
+        leaves = self.apply(X)
+        proba = np.cumsum(self.value[leaves], axis=1)[:, -1]
+        proba /= len(self.roots)
+        return proba
+
+    def predict(self, X):
+        """Predicted class labels for raw (unscaled) input rows."""
+        return self.classes.take(np.argmax(self.predict_proba(X), axis=1), axis=0)
+
+    def contributions(self, row, class_index=1):
+        """Tree-path attribution of one row's class probability to its features.
+
+        Walking each tree from root to leaf, every split moves the node value
+        from the parent's to the child's; that change is credited to the
+        split feature. Averaged over trees, ``bias + contributions.sum()``
+        equals ``predict_proba(row)[0, class_index]``. Returns ``(bias,
+        contributions)`` with one contribution per feature.
+        """
+        flat_X = self._as_rows(row)[0]
+        value = self.value[:, class_index]
+        node = self.roots
+        parents, steps = [], []
+        for _ in range(self.depth):
+            goes_right = flat_X.take(self.feature.take(node)) > self.threshold.take(node)
+            child = self.children.take(2 * node + goes_right)
+            parents.append(node)
+            steps.append(child)
+            node = child
+        parents = np.concatenate(parents)
+        # Leaves loop back to themselves, so their steps add exactly zero
+        gains = value.take(np.concatenate(steps)) - value.take(parents)
+        n_trees = len(self.roots)
+        totals = np.bincount(self.feature.take(parents), weights=gains, minlength=self.n_features)
+        return value.take(self.roots).sum() / n_trees, totals / n_trees
+
+    def matches_pipeline(self, classifier, scaler, X):
+        """Check that probabilities are bit-identical to the sklearn pipeline on ``X``."""
+        X = self._as_rows(X)
+        expected = classifier.predict_proba(scaler.transform(X) if scaler is not None else X)
+        return np.array_equal(expected, self.predict_proba(X))
@@ -0,0 +1,261 @@
+"""Headless JSON inference service for the diagnosis model.
+
+Serves the same model as the Streamlit app, including hot-swapped versions
+(see ``model_registry``), over plain HTTP::
+
+    python inference_service.py --port 8502
+
+    POST /predict       {"record": [...]} or {"records": [[...], ...]}
+    GET  /health        model version and queue depth
+    GET  /metrics       Prometheus text (``/metrics.json`` for JSON)
+
+A record is either a list of the 12 inputs in ``FEATURE_COLUMNS`` order or
+an object keyed by those column names. Each response holds one prediction
+per record, in order::
+
+    {"model_version": "local",
+     "predictions": [{"label": 1, "diagnosis": "Positive", "probability": 0.87}]}
+
+Requests are not scored one by one. Handler threads hand their rows to a
+single batching thread, which waits up to ``MAX_WAIT`` seconds for more
+requests (or until ``MAX_BATCH_ROWS`` rows are waiting). It then scores the
+whole micro-batch with one vectorized call and hands each request its slice
+of the result. Hundreds of concurrent callers therefore share a few
+``predict`` calls.
+"""
+
+import argparse
+import json
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+import metrics
+import model_registry
+from schema import FEATURE_COLUMNS
+
+HOST = "127.0.0.1"
+PORT = 8502
+MAX_BATCH_ROWS = 512
+MAX_WAIT = 0.005  # Seconds the first request of a micro-batch waits for company
+MAX_RECORDS_PER_REQUEST = 10000
+MAX_BODY_BYTES = 8 * 1024 * 1024
+REQUEST_TIMEOUT = 30.0
+
+
+class RequestError(ValueError):
+    """A malformed request; reported to the caller as HTTP 400."""
+
+
+def parse_records(payload):
+    """Turn a request body into an (n, 12) float array."""
+    if not isinstance(payload, dict):
+        raise RequestError("Body must be a JSON object with 'record' or 'records'.")
+    if "records" in payload:
+        records = payload["records"]
+        if not isinstance(records, list) or not records:
+            raise RequestError("'records' must be a non-empty list.")
+    elif "record" in payload:
+        records = [payload["record"]]
+    else:
+        raise RequestError("Body must contain 'record' or 'records'.")
+    if len(records) > MAX_RECORDS_PER_REQUEST:
+        raise RequestError(f"At most {MAX_RECORDS_PER_REQUEST} records per request.")
+
+    rows = []
+    for index, record in enumerate(records):
+        if isinstance(record, dict):
+            missing = [column for column in FEATURE_COLUMNS if column not in record]
+            if missing:
+                raise RequestError(f"Record {index} is missing: {', '.join(missing)}")
+            record = [record[column] for column in FEATURE_COLUMNS]
+        if not isinstance(record, list) or len(record) != len(FEATURE_COLUMNS):
+            raise RequestError(f"Record {index} must have {len(FEATURE_COLUMNS)} values.")
+        if not all(isinstance(value, (int, float)) and not isinstance(value, bool) for value in record):
+            raise RequestError(f"Record {index} must contain only numbers.")
+        rows.append(record)
+    try:
+        rows = np.array(rows, dtype=np.float64)
+    except OverflowError:
+        # JSON integers are unbounded; 10**400 has no float value
+        raise RequestError("Records must contain only numbers that fit in a float.") from None
+    if not np.isfinite(rows).all():
+        raise RequestError("Records must not contain NaN or infinity.")
+    return rows
+
+
+class MicroBatcher(threading.Thread):
+    """Coalesces concurrent requests into batched calls to ``score(rows)``."""
+
+    def __init__(self, score, max_batch_rows=MAX_BATCH_ROWS, max_wait=MAX_WAIT):
+        super().__init__(name="inference-batcher", daemon=True)
+        self.score = score
+        self.max_batch_rows = max_batch_rows
+        self.max_wait = max_wait
+        self._queue = queue.SimpleQueue()
+
+    def submit(self, rows):
+        """Queue an (n, 12) array; the future resolves to this request's slice of the result."""
+        future = Future()
+        self._queue.put((rows, future))
+        return future
+
+    def pending(self):
+        return self._queue.qsize()
+
+    def run(self):
+        while True:
+            batch = [self._queue.get()]
+            batch_rows = len(batch[0][0])
+            deadline = time.monotonic() + self.max_wait
+            while batch_rows < self.max_batch_rows:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                batch.append(item)
+                batch_rows += len(item[0])
+            self._run_batch(batch)
+
+    def _run_batch(self, batch):
+        try:
+            with metrics.span("service_batch"):
+                results = self.score(np.concatenate([rows for rows, _ in batch]))
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        metrics.incr("service_batches")
+        metrics.incr("service_rows", sum(len(rows) for rows, _ in batch))
+        start = 0
+        for rows, future in batch:
+            stop = start + len(rows)
+            future.set_result(tuple(result[start:stop] for result in results))
+            start = stop
+
+
+class InferenceService:
+    """Model registry plus micro-batcher behind the HTTP handler."""
+
+    def __init__(self, registry=None, max_batch_rows=MAX_BATCH_ROWS, max_wait=MAX_WAIT):
+        self.registry = registry or model_registry.ModelRegistry()
+        self.registry.active().warm()
+        self.batcher = MicroBatcher(self._score, max_batch_rows, max_wait)
+        self.batcher.start()
+
+    def _score(self, rows):
+        bundle = self.registry.active()
+        labels, probabilities = bundle.predict_many(rows)
+        versions = np.full(len(rows), bundle.version, dtype=object)
+        return labels, probabilities, versions
+
+    def predict(self, payload):
+        rows = parse_records(payload)
+        labels, probabilities, versions = self.batcher.submit(rows).result(REQUEST_TIMEOUT)
+        return {
+            "model_version": versions[0],
+            "predictions": [
+                {"label": int(label), "diagnosis": "Positive" if label == 1 else "Negative",
+                 "probability": float(probability)}
+                for label, probability in zip(labels, probabilities)
+            ],
+        }
+
+    def health(self):
+        return {"status": "ok", "model_version": self.registry.active().version,
+                "pending_requests": self.batcher.pending()}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-alive, so busy callers reuse connections
+
+    def _send(self, status, body, content_type="application/json"):
+        data = body.encode("utf-8") if isinstance(body, str) else json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._send(200, self.server.service.health())
+        elif self.path == "/metrics":
+            self._send(200, metrics.render_prometheus(), "text/plain; version=0.0.4")
+        elif self.path == "/metrics.json":
+            self._send(200, metrics.render_json())
+        else:
+            self._send(404, {"error": "Not found"})
+
+    def do_POST(self):
+        if self.path != "/predict":
+            self._send(404, {"error": "Not found"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+        except ValueError:
+            length = -1
+        if not 0 < length <= MAX_BODY_BYTES:
+            self._send(400 if length <= 0 else 413, {"error": "Missing or oversized request body."})
+            self.close_connection = True
+            return
+        with metrics.span("service_request"):
+            try:
+                payload = json.loads(self.rfile.read(length))
+                result = self.server.service.predict(payload)
+            except (RequestError, json.JSONDecodeError, UnicodeDecodeError) as e:
+                metrics.incr("service_bad_requests")
+                self._send(400, {"error": str(e)})
+                return
+            except Exception as e:
+                metrics.incr("service_errors")
+                self._send(500, {"error": f"Prediction failed: {e}"})
+                return
+        self._send(200, result)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024  # The default backlog of 5 resets bursts of parallel callers
+
+
+def make_server(host=HOST, port=PORT, service=None):
+    """Build (but do not start) the HTTP server; port 0 picks a free port."""
+    server = _Server((host, port), _Handler)
+    server.service = service or InferenceService()
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless JSON inference service for the diagnosis model.")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--max-batch-rows", type=int, default=MAX_BATCH_ROWS)
+    parser.add_argument("--max-wait-ms", type=float, default=MAX_WAIT * 1000)
+    args = parser.parse_args(argv)
+
+    service = InferenceService(max_batch_rows=args.max_batch_rows, max_wait=args.max_wait_ms / 1000)
+    server = make_server(args.host, args.port, service)
+    print(f"Serving model {service.registry.active().version} on http://{args.host}:{server.server_port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
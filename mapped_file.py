@@ -0,0 +1,102 @@
+"""Single-file container for NumPy arrays that are memory-mapped read-only.
+
+Derived data that every process loads (the compiled forest, the dataset
+cache) is stored in this layout::
+
+    magic (8 bytes) | uint32 header length | JSON header (padded) | array payload
+
+The header holds the caller's own metadata, the format version and, under
+``arrays``, each array's dtype, shape and offset; arrays start on 64-byte
+boundaries. ``read`` maps the file and returns views into it, so loading
+costs a header parse and all processes share one page-cache copy. ``write``
+goes through a private temporary file and ``os.replace``, so readers never
+see a partial file.
+"""
+
+import hashlib
+import json
+import os
+import struct
+import threading
+
+import numpy as np
+
+ALIGNMENT = 64
+
+
+class MappedFileError(ValueError):
+    """Raised when a file is missing, of another kind, an unknown version, corrupt or truncated."""
+
+
+def _aligned(size):
+    return (size + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def write(path, magic, version, header, arrays, checksum=False):
+    """Atomically write ``arrays`` (name -> array) behind ``magic`` and the JSON-able ``header``.
+
+    With ``checksum`` the header also records the payload's SHA-256, which
+    ``read`` verifies.
+    """
+    arrays = {name: np.ascontiguousarray(array) for name, array in arrays.items()}
+    specs = {}
+    offset = 0
+    for name, array in arrays.items():
+        specs[name] = {"dtype": np.lib.format.dtype_to_descr(array.dtype), "shape": list(array.shape), "offset": offset}
+        offset = _aligned(offset + array.nbytes)
+    payload = bytearray(offset)
+    for name, array in arrays.items():
+        start = specs[name]["offset"]
+        payload[start:start + array.nbytes] = array.tobytes()
+
+    header = dict(header, format_version=version, arrays=specs)
+    if checksum:
+        header["payload_sha256"] = hashlib.sha256(payload).hexdigest()
+    encoded = json.dumps(header).encode("utf-8")
+    prefix_size = len(magic) + 4
+    encoded = encoded.ljust(_aligned(prefix_size + len(encoded)) - prefix_size, b" ")
+
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(magic)
+        f.write(struct.pack("<I", len(encoded)))
+        f.write(encoded)
+        f.write(payload)
+    os.replace(tmp_path, path)
+
+
+def read(path, magic, version, kind, verify=True):
+    """Memory-map a file written by ``write``; returns (header, arrays) with read-only array views.
+
+    ``kind`` names the file in error messages. With ``verify`` a recorded
+    payload checksum is checked.
+    """
+    try:
+        data = np.memmap(path, dtype=np.uint8, mode="r")
+    except (OSError, ValueError) as e:
+        raise MappedFileError(f"Cannot open {kind} {path}: {e}") from e
+
+    prefix_size = len(magic) + 4
+    if len(data) < prefix_size or bytes(data[:len(magic)]) != magic:
+        raise MappedFileError(f"{path} is not a {kind}.")
+    (header_size,) = struct.unpack("<I", bytes(data[len(magic):prefix_size]))
+    payload_start = prefix_size + header_size
+    try:
+        header = json.loads(bytes(data[prefix_size:payload_start]))
+    except ValueError as e:
+        raise MappedFileError(f"{path} has a corrupt header: {e}") from e
+    if header.get("format_version") != version:
+        raise MappedFileError(f"{path} has unsupported format version {header.get('format_version')}.")
+
+    payload = data[payload_start:]
+    if verify and "payload_sha256" in header and hashlib.sha256(payload).hexdigest() != header["payload_sha256"]:
+        raise MappedFileError(f"{path} failed its checksum.")
+
+    arrays = {}
+    for name, spec in header["arrays"].items():
+        dtype = np.lib.format.descr_to_dtype(spec["dtype"])
+        count = int(np.prod(spec["shape"]))
+        if spec["offset"] + count * dtype.itemsize > len(payload):
+            raise MappedFileError(f"{path} is truncated.")
+        arrays[name] = np.ndarray(spec["shape"], dtype=dtype, buffer=payload, offset=spec["offset"])
+    return header, arrays
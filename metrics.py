@@ -0,0 +1,219 @@
+"""Lightweight in-process timing spans, counters and metrics export.
+
+Call sites wrap hot-path work in ``with metrics.span("predict"):`` and bump
+counters with ``metrics.incr("diagnoses")``. Span durations are aggregated
+into fixed-bucket histograms shared by every session in the process and can
+be exported as Prometheus text or JSON. When metrics are disabled (set
+``ASD_METRICS=0``), ``span`` returns a shared no-op context manager, so the
+instrumentation costs one attribute check per call.
+
+Set ``ASD_METRICS_PORT`` to also serve ``/metrics`` (Prometheus) and
+``/metrics.json`` from a background HTTP server. ``profile()`` wraps one
+request in cProfile for ad-hoc investigation.
+"""
+
+import cProfile
+import io
+import json
+import os
+import pstats
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager, nullcontext
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PREFIX = "asd"
+# Histogram bucket upper bounds in seconds, from 50us to 10s
+BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+           0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+enabled = os.getenv("ASD_METRICS", "1") != "0"
+
+_lock = threading.Lock()
+_histograms = {}
+_counters = {}
+_gauges = {}
+_NOOP = nullcontext()
+
+
+class Histogram:
+    """Cumulative bucket counts, sum and count of observed durations."""
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)  # Last slot is +Inf
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, seconds):
+        self.counts[bisect_left(BUCKETS, seconds)] += 1
+        self.total += seconds
+        self.count += 1
+
+    def quantile(self, q):
+        """Bucket upper bound below which a fraction ``q`` of observations fall."""
+        if not self.count:
+            return None
+        target = q * self.count
+        seen = 0
+        for bound, count in zip(BUCKETS + (float("inf"),), self.counts):
+            seen += count
+            if seen >= target:
+                return bound
+        return float("inf")
+
+
+def observe(name, seconds):
+    """Record one duration for span ``name``."""
+    with _lock:
+        histogram = _histograms.get(name)
+        if histogram is None:
+            histogram = _histograms[name] = Histogram()
+        histogram.observe(seconds)
+
+
+class _Span:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        observe(self.name, time.perf_counter() - self.start)
+        if exc_type is not None:
+            incr(f"{self.name}_errors")
+        return False
+
+
+def span(name):
+    """Context manager timing the enclosed block into histogram ``name``."""
+    if not enabled:
+        return _NOOP
+    return _Span(name)
+
+
+def incr(name, value=1):
+    """Add ``value`` to counter ``name``."""
+    if not enabled:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+
+
+def set_gauge(name, value):
+    """Set gauge ``name`` to its current ``value``."""
+    if not enabled:
+        return
+    with _lock:
+        _gauges[name] = value
+
+
+def reset():
+    """Drop every recorded metric."""
+    with _lock:
+        _histograms.clear()
+        _counters.clear()
+        _gauges.clear()
+
+
+def snapshot():
+    """Return all metrics as plain data (the JSON export)."""
+    with _lock:
+        spans = {}
+        for name, histogram in sorted(_histograms.items()):
+            spans[name] = {
+                "count": histogram.count,
+                "sum_seconds": histogram.total,
+                "mean_seconds": histogram.total / histogram.count if histogram.count else None,
+                "p50_seconds": histogram.quantile(0.5),
+                "p95_seconds": histogram.quantile(0.95),
+                "p99_seconds": histogram.quantile(0.99),
+                "buckets": dict(zip([str(b) for b in BUCKETS] + ["+Inf"], histogram.counts)),
+            }
+        return {"spans": spans, "counters": dict(sorted(_counters.items())), "gauges": dict(sorted(_gauges.items()))}
+
+
+def render_json():
+    return json.dumps(snapshot(), indent=2, default=str)
+
+
+def render_prometheus():
+    """Render all metrics in the Prometheus text exposition format."""
+    lines = [
+        f"# HELP {PREFIX}_span_seconds Duration of instrumented hot-path spans.",
+        f"# TYPE {PREFIX}_span_seconds histogram",
+    ]
+    with _lock:
+        for name, histogram in sorted(_histograms.items()):
+            cumulative = 0
+            for bound, count in zip([str(b) for b in BUCKETS] + ["+Inf"], histogram.counts):
+                cumulative += count
+                lines.append(f'{PREFIX}_span_seconds_bucket{{span="{name}",le="{bound}"}} {cumulative}')
+            lines.append(f'{PREFIX}_span_seconds_sum{{span="{name}"}} {histogram.total}')
+            lines.append(f'{PREFIX}_span_seconds_count{{span="{name}"}} {histogram.count}')
+        lines.append(f"# HELP {PREFIX}_events_total Count of instrumented events.")
+        lines.append(f"# TYPE {PREFIX}_events_total counter")
+        for name, value in sorted(_counters.items()):
+            lines.append(f'{PREFIX}_events_total{{event="{name}"}} {value}')
+        lines.append(f"# HELP {PREFIX}_gauge Current value of instrumented gauges.")
+        lines.append(f"# TYPE {PREFIX}_gauge gauge")
+        for name, value in sorted(_gauges.items()):
+            lines.append(f'{PREFIX}_gauge{{name="{name}"}} {value}')
+    return "\n".join(lines) + "\n"
+
+
+@contextmanager
+def profile(sort="cumulative", limit=30):
+    """Profile the enclosed block; the yielded dict gets a ``"stats"`` text report."""
+    result = {}
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield result
+    finally:
+        profiler.disable()
+        output = io.StringIO()
+        pstats.Stats(profiler, stream=output).sort_stats(sort).print_stats(limit)
+        result["stats"] = output.getvalue()
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path == "/metrics":
+            body, content_type = render_prometheus(), "text/plain; version=0.0.4"
+        elif self.path == "/metrics.json":
+            body, content_type = render_json(), "application/json"
+        else:
+            self.send_error(404)
+            return
+        data = body.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def start_http_server(port=None, host="127.0.0.1"):
+    """Serve metrics over HTTP once per process; port defaults to $ASD_METRICS_PORT."""
+    global _server
+    if port is None:
+        port = os.getenv("ASD_METRICS_PORT")
+        if not port:
+            return None
+    with _server_lock:
+        if _server is None:
+            _server = ThreadingHTTPServer((host, int(port)), _MetricsHandler)
+            threading.Thread(target=_server.serve_forever, name="metrics-http", daemon=True).start()
+        return _server
@@ -0,0 +1,103 @@
+"""Versioned, memory-mappable model artifact for the compiled random forest.
+
+Unpickling ``autism_random_forest.pkl`` costs every new server process a full
+deserialisation and a private copy of all 100 trees. This module writes the
+compiled forest (scaler already folded in, see ``forest_engine``) as raw
+arrays in a ``mapped_file`` container, so cold start is near-instant and all
+worker processes share one page-cache copy.
+
+The header records a SHA-256 checksum of the payload and the checksums of
+the two pickles the forest was compiled from. Loading with ``sources`` rejects an artifact left
+over from other pickles, so replacing a pickle never serves the old model.
+Export the shipped pickles with::
+
+    python model_artifact.py
+"""
+
+import hashlib
+import os
+import pickle
+import sys
+
+import numpy as np
+
+import mapped_file
+from forest_engine import CompiledForest
+from schema import ARTIFACT_FILE, DATASET_FILE, MODEL_FILE, SCALER_FILE
+
+MAGIC = b"ASDMODEL"
+FORMAT_VERSION = 1
+ARRAY_NAMES = ["feature", "threshold", "children", "value", "roots", "classes"]
+
+
+class ArtifactError(ValueError):
+    """Raised when an artifact file is missing, corrupt or an unknown version."""
+
+
+def sha256_file(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def source_digests(directory="."):
+    """SHA-256 of the model and scaler pickles in ``directory``, as stored in an artifact header."""
+    return {name: sha256_file(os.path.join(directory, name)) for name in (MODEL_FILE, SCALER_FILE)}
+
+
+def export_artifact(forest, path=ARTIFACT_FILE, sources=None):
+    """Write a compiled forest to ``path`` atomically, recording the pickle checksums ``sources``."""
+    arrays = {}
+    for name in ARRAY_NAMES:
+        array = np.asarray(getattr(forest, name))
+        if array.dtype.kind in "iu":
+            array = array.astype("<i8")
+        elif array.dtype.kind == "f":
+            array = array.astype("<f8")
+        arrays[name] = array
+    header = {"n_features": int(forest.n_features), "depth": int(forest.depth), "sources": sources}
+    mapped_file.write(path, MAGIC, FORMAT_VERSION, header, arrays, checksum=True)
+
+
+def load_artifact(path=ARTIFACT_FILE, verify=True, sources=None):
+    """Memory-map an artifact read-only and return it as a ``CompiledForest``.
+
+    With ``sources`` (see ``source_digests``) an artifact compiled from any
+    other pickles raises ``ArtifactError``.
+    """
+    try:
+        header, arrays = mapped_file.read(path, MAGIC, FORMAT_VERSION, "model artifact", verify)
+    except mapped_file.MappedFileError as e:
+        raise ArtifactError(str(e)) from e
+    if sources is not None and header.get("sources") != sources:
+        raise ArtifactError(f"{path} was compiled from different pickles.")
+    if verify and "payload_sha256" not in header:
+        raise ArtifactError(f"{path} has no checksum.")
+    if set(arrays) != set(ARRAY_NAMES):
+        raise ArtifactError(f"{path} does not hold a compiled forest.")
+
+    return CompiledForest(
+        depth=header["depth"],
+        n_features=header["n_features"],
+        **arrays,
+    )
+
+
+if __name__ == "__main__":
+    import dataset
+
+    output_path = sys.argv[1] if len(sys.argv) > 1 else ARTIFACT_FILE
+    with open(MODEL_FILE, "rb") as model_file:
+        classifier = pickle.load(model_file)
+    with open(SCALER_FILE, "rb") as scaler_file:
+        scaler = pickle.load(scaler_file)
+
+    forest = CompiledForest.from_pipeline(classifier, scaler)
+    data = dataset.load_dataset(DATASET_FILE)
+    check_rows = data.to_frame(data.columns[:forest.n_features]).iloc[:, :forest.n_features].to_numpy()
+    if not forest.matches_pipeline(classifier, scaler, check_rows):
+        sys.exit("Compiled forest does not reproduce the pickled pipeline; not exporting.")
+    export_artifact(forest, output_path, source_digests())
+    print(f"Wrote model artifact to {output_path}")
@@ -0,0 +1,458 @@
+"""Hot-reloadable model registry with optional shadow scoring.
+
+A model *version* is a directory under ``models/`` written by ``train.py``:
+the two pickles, the compiled forest and a ``manifest.json`` with their
+checksums. Two pointer files choose what is served:
+
+* ``models/ACTIVE`` names the version the app predicts with. Without it the
+  app serves the pickles in the app directory, as before, and reloads them
+  (recompiling the forest and rebuilding the table) when either is replaced.
+* ``models/SHADOW`` optionally names a candidate version that is scored on
+  the same live inputs in the background, without affecting what users see.
+
+A watcher thread polls the pointers every ``POLL_INTERVAL`` seconds. When
+they change it loads and warms the new version (compiled forest and
+prediction table) off the script thread, then swaps it in with a single
+reference assignment. Reruns already holding the old bundle finish with it,
+so nothing is dropped and no process has to restart. A version that fails
+to load, active or shadow, leaves the other untouched and is retried on the
+next poll.
+
+Shadow scoring queues each live input with the active model's answer. A
+background thread scores it with the candidate and counts agreements. The
+queue is bounded, and inputs are dropped when it is full rather than
+slowing the page down. Switch versions with::
+
+    python model_registry.py activate <version>
+    python model_registry.py shadow <version>
+    python model_registry.py status
+"""
+
+import functools
+import itertools
+import json
+import os
+import pickle
+import queue
+import sys
+import threading
+
+import numpy as np
+
+import dataset
+import metrics
+import model_artifact
+import prediction_table
+from forest_engine import CompiledForest
+from schema import ARTIFACT_FILE, DATASET_FILE, MODEL_FILE, MODELS_DIR, SCALER_FILE, TABLE_FILE
+
+MANIFEST_FILE = "manifest.json"
+ACTIVE_POINTER = "ACTIVE"
+SHADOW_POINTER = "SHADOW"
+
+POLL_INTERVAL = 5.0
+WHAT_IF_CACHE_SIZE = 1024
+SHADOW_QUEUE_SIZE = 1024
+
+
+sha256_file = model_artifact.sha256_file
+
+
+def verify_version(version_dir):
+    """Check every file of a version against its manifest checksum; returns the manifest."""
+    with open(os.path.join(version_dir, MANIFEST_FILE)) as f:
+        manifest = json.load(f)
+    for name, expected in manifest["files"].items():
+        if sha256_file(os.path.join(version_dir, name)) != expected:
+            raise ValueError(f"{os.path.join(version_dir, name)} does not match its manifest checksum.")
+    return manifest
+
+
+_bundle_serials = itertools.count()
+
+
+class ModelBundle:
+    """One model version: pickles, compiled forest and prediction table, each loaded on first use."""
+
+    def __init__(self, version, directory, manifest=None, dataset_file=DATASET_FILE):
+        self.version = version
+        self.directory = directory
+        self.manifest = manifest
+        self.dataset_file = dataset_file
+        self._lock = threading.RLock()
+        self._pipeline = None
+        self._forest = None
+        self._forest_loaded = False
+        self._table = None
+        self._source_digests = None
+        self._explainer = None
+        # Distinguishes this load from any other of the same version, e.g. reloaded local pickles
+        self.cache_key = (version, next(_bundle_serials))
+        self._what_if = functools.lru_cache(maxsize=WHAT_IF_CACHE_SIZE)(self._what_if_uncached)
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    @property
+    def pipeline(self):
+        """The (classifier, scaler) pair from the pickles."""
+        if self._pipeline is None:
+            with self._lock:
+                if self._pipeline is None:
+                    with metrics.span("model_load"):
+                        with open(self._path(MODEL_FILE), "rb") as model_file:
+                            classifier = pickle.load(model_file)
+                        with open(self._path(SCALER_FILE), "rb") as scaler_file:
+                            scaler = pickle.load(scaler_file)
+                    self._pipeline = (classifier, scaler)
+        return self._pipeline
+
+    @property
+    def forest(self):
+        """The compiled forest, memory-mapped, or compiled and exported if missing; None if unusable."""
+        if not self._forest_loaded:
+            with self._lock:
+                if not self._forest_loaded:
+                    self._forest = self._load_forest()
+                    self._forest_loaded = True
+        return self._forest
+
+    def _sources(self):
+        # Checksums of the pickles a usable artifact and table must have been built from
+        if self._source_digests is None:
+            if self.manifest is not None:
+                self._source_digests = {name: self.manifest["files"][name] for name in (MODEL_FILE, SCALER_FILE)}
+            else:
+                self._source_digests = model_artifact.source_digests(self.directory)
+        return self._source_digests
+
+    def _load_forest(self):
+        sources = self._sources()
+        try:
+            with metrics.span("artifact_load"):
+                return model_artifact.load_artifact(self._path(ARTIFACT_FILE), sources=sources)
+        except model_artifact.ArtifactError:
+            metrics.incr("artifact_load_misses")
+        classifier, scaler = self.pipeline
+        forest = CompiledForest.from_pipeline(classifier, scaler)
+        # Only use the compiled forest if it reproduces the pipeline exactly
+        data = dataset.load_dataset(self.dataset_file)
+        columns = data.columns[:forest.n_features]
+        if not forest.matches_pipeline(classifier, scaler, data.to_frame(columns)[columns].to_numpy()):
+            return None
+        model_artifact.export_artifact(forest, self._path(ARTIFACT_FILE), sources)
+        return forest
+
+    @property
+    def table(self):
+        """The precomputed prediction table, rebuilt if it is missing, stale or disagrees with the model."""
+        if self._table is None:
+            with self._lock:
+                if self._table is None:
+                    # The forest is checksum-bound to the pickles and bit-exact, so with a usable
+                    # artifact the pickles are never unpickled
+                    forest = self.forest
+                    model, scaler = self.pipeline if forest is None else (forest, None)
+                    with metrics.span("prediction_table_load"):
+                        self._table = prediction_table.load_or_build_table(
+                            model, scaler, self._path(TABLE_FILE), self._sources())
+        return self._table
+
+    def warm(self):
+        """Load everything a single diagnosis needs."""
+        return self.table
+
+    def predict(self, row):
+        """Return (label, positive-class probability) for one 12-value input row."""
+        try:
+            return prediction_table.lookup(self.table, row)
+        except KeyError:
+            pass
+        forest = self.forest
+        if forest is not None:
+            model, features = forest, [row]
+        else:
+            model, scaler = self.pipeline
+            features = scaler.transform([row])
+        proba = model.predict_proba(features)[0]
+        return int(model.classes_[proba.argmax()]), float(proba[list(model.classes_).index(1)])
+
+    def predict_many(self, rows):
+        """Return (labels, positive-class probabilities) for an (n, 12) array of rows.
+
+        Rows the diagnosis form can produce are looked up in the prediction
+        table in one gather; any others are scored together in one call.
+        """
+        rows = np.asarray(rows, dtype=np.float64)
+        keys, in_range = prediction_table.pack_keys(rows)
+        entries = self.table[keys]
+        labels = entries["label"].astype(np.int64)
+        probabilities = entries["proba"].astype(np.float64)
+        if not in_range.all():
+            outside = ~in_range
+            forest = self.forest
+            if forest is not None:
+                scored = prediction_table.score_rows(forest, None, rows[outside])
+            else:
+                scored = prediction_table.score_rows(*self.pipeline, rows[outside])
+            labels[outside], probabilities[outside] = scored
+        return labels, probabilities
+
+    def explain(self, row):
+        """Return (label, probability, bias, contributions) for one input row.
+
+        ``contributions`` holds one tree-path attribution per feature toward
+        the positive class; ``bias`` is the forest's average positive rate.
+        """
+        label, probability = self.predict(row)
+        explainer = self.forest
+        if explainer is None:
+            # Attribution only needs the tree structure, even if the compiled forest is not bit-exact
+            if self._explainer is None:
+                self._explainer = CompiledForest.from_pipeline(*self.pipeline)
+            explainer = self._explainer
+        positive = list(explainer.classes_).index(1)
+        bias, contributions = explainer.contributions(row, positive)
+        return label, probability, float(bias), tuple(float(value) for value in contributions)
+
+    def what_if(self, row):
+        """Return (grid_labels, grid_probabilities, toggle_labels, toggle_probabilities), cached by row.
+
+        The grids are (11, 19) arrays over every Social Responsiveness (rows)
+        and Age (columns) value with the other inputs kept; the toggles score
+        the row with each of the ten yes/no inputs flipped in turn. All 219
+        variations are scored in one ``predict_many`` call. The arrays are
+        shared between callers and read-only.
+        """
+        return self._what_if(tuple(float(value) for value in row))
+
+    def _what_if_uncached(self, row):
+        shape = (prediction_table.RESPONSIVENESS_VALUES, prediction_table.AGE_VALUES)
+        grid_size = shape[0] * shape[1]
+        rows = np.tile(np.asarray(row, dtype=np.float64), (grid_size + prediction_table.FLAG_COUNT, 1))
+        rows[:grid_size, 0], rows[:grid_size, 1] = np.divmod(np.arange(grid_size), shape[1])
+        toggled = np.arange(prediction_table.FLAG_COUNT)
+        rows[grid_size + toggled, 2 + toggled] = 1 - rows[grid_size + toggled, 2 + toggled]
+        labels, probabilities = self.predict_many(rows)
+        results = (labels[:grid_size].reshape(shape), probabilities[:grid_size].reshape(shape),
+                   labels[grid_size:], probabilities[grid_size:])
+        for result in results:
+            result.setflags(write=False)
+        return results
+
+
+class ShadowStats:
+    """Running agreement counts between the active model and a shadow candidate."""
+
+    def __init__(self, version):
+        self.version = version
+        self.scored = 0
+        self.agreed = 0
+        self.dropped = 0
+        self.failed = 0
+        self.total_probability_gap = 0.0
+
+    def as_dict(self):
+        return {
+            "version": self.version,
+            "scored": self.scored,
+            "agreed": self.agreed,
+            "agreement_rate": self.agreed / self.scored if self.scored else None,
+            "mean_probability_gap": self.total_probability_gap / self.scored if self.scored else None,
+            "dropped": self.dropped,
+            "failed": self.failed,
+        }
+
+
+def read_pointer(models_dir, name):
+    """Return the version a pointer file names, or None."""
+    try:
+        with open(os.path.join(models_dir, name)) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def write_pointer(models_dir, name, version):
+    """Atomically point ``name`` at ``version`` (None removes the pointer)."""
+    path = os.path.join(models_dir, name)
+    if version is None:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        return
+    verify_version(os.path.join(models_dir, version))
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write(version + "\n")
+    os.replace(tmp_path, path)
+
+
+def list_versions(models_dir=MODELS_DIR):
+    """Version directories with a manifest, oldest first."""
+    try:
+        names = sorted(os.listdir(models_dir))
+    except FileNotFoundError:
+        return []
+    return [name for name in names if os.path.isfile(os.path.join(models_dir, name, MANIFEST_FILE))]
+
+
+class ModelRegistry:
+    """Serves the active model bundle and swaps it when the pointer files change."""
+
+    def __init__(self, models_dir=MODELS_DIR, base_dir=".", dataset_file=DATASET_FILE, poll_interval=POLL_INTERVAL):
+        self.models_dir = models_dir
+        self.base_dir = base_dir
+        self.dataset_file = dataset_file
+        self.poll_interval = poll_interval
+        self._shadow = None
+        self._shadow_stats = None
+        self._shadow_queue = queue.Queue(maxsize=SHADOW_QUEUE_SIZE)
+        active, shadow, stamp = self._read_state()
+        try:
+            self._active = self._load(active)
+        except (OSError, ValueError):
+            # Serve the app directory's pickles rather than fail to start; the pointer is retried on every poll
+            metrics.incr("model_reload_failures")
+            self._active = self._load(None)
+            active, stamp = None, self._local_stamp()
+        # _state records what was actually loaded, so a pointer that failed to load differs from it
+        self._state = (active, self._set_shadow(shadow), stamp)
+        self._stopping = threading.Event()
+        self._watcher = threading.Thread(target=self._watch, name="model-registry", daemon=True)
+        self._watcher.start()
+        threading.Thread(target=self._shadow_loop, name="model-shadow", daemon=True).start()
+
+    def _read_state(self):
+        active = read_pointer(self.models_dir, ACTIVE_POINTER)
+        shadow = read_pointer(self.models_dir, SHADOW_POINTER)
+        if active is None:
+            return None, shadow, self._local_stamp()
+        return active, shadow, None
+
+    def _local_stamp(self):
+        # The app directory's own pickles are reloaded when either is replaced
+        try:
+            return tuple(os.stat(os.path.join(self.base_dir, name)).st_mtime_ns for name in (MODEL_FILE, SCALER_FILE))
+        except FileNotFoundError:
+            return None
+
+    def _load(self, version):
+        if version is None:
+            return ModelBundle("local", self.base_dir, dataset_file=self.dataset_file)
+        directory = os.path.join(self.models_dir, version)
+        return ModelBundle(version, directory, verify_version(directory), self.dataset_file)
+
+    def _set_shadow(self, version):
+        # Returns the version now shadowed; a candidate that fails to load is dropped, never the active model
+        if version is not None:
+            try:
+                bundle = self._load(version)
+                bundle.warm()
+            except Exception:
+                metrics.incr("shadow_load_failures")
+            else:
+                self._shadow, self._shadow_stats = bundle, ShadowStats(version)
+                return version
+        self._shadow, self._shadow_stats = None, None
+        return None
+
+    def active(self):
+        """The bundle to serve this rerun with; hold on to it for the whole rerun."""
+        return self._active
+
+    def refresh(self):
+        """Pick up pointer changes now; returns True if anything was swapped."""
+        active, shadow, stamp = self._read_state()
+        loaded_active, loaded_shadow, loaded_stamp = self._state
+        swapped = False
+        if (active, stamp) != (loaded_active, loaded_stamp):
+            try:
+                bundle = self._load(active)
+                # Warm before swapping so no session pays for the load
+                with metrics.span("model_swap"):
+                    bundle.warm()
+            except Exception:
+                # Keep serving the current bundle; the pointer is tried again on the next poll
+                metrics.incr("model_reload_failures")
+            else:
+                self._active = bundle
+                loaded_active, loaded_stamp = active, stamp
+                metrics.incr("model_swaps")
+                swapped = True
+        if shadow != loaded_shadow:
+            had_shadow = loaded_shadow is not None
+            loaded_shadow = self._set_shadow(shadow)
+            swapped = swapped or had_shadow or loaded_shadow is not None
+        self._state = (loaded_active, loaded_shadow, loaded_stamp)
+        return swapped
+
+    def _watch(self):
+        while not self._stopping.wait(self.poll_interval):
+            try:
+                self.refresh()
+            except Exception:
+                # A half-written or corrupt version keeps the current bundle serving
+                metrics.incr("model_reload_failures")
+
+    def stop(self):
+        self._stopping.set()
+        self._shadow_queue.put(None)
+
+    def shadow_score(self, row, label, probability):
+        """Queue a live input and the active model's answer for the shadow candidate."""
+        stats = self._shadow_stats
+        if stats is None:
+            return
+        try:
+            self._shadow_queue.put_nowait((self._shadow, stats, row, label, probability))
+        except queue.Full:
+            stats.dropped += 1
+
+    def _shadow_loop(self):
+        while True:
+            item = self._shadow_queue.get()
+            if item is None:
+                return
+            bundle, stats, row, label, probability = item
+            try:
+                with metrics.span("shadow_predict"):
+                    shadow_label, shadow_probability = bundle.predict(row)
+            except Exception:
+                stats.failed += 1
+                continue
+            stats.scored += 1
+            stats.total_probability_gap += abs(shadow_probability - probability)
+            if shadow_label == label:
+                stats.agreed += 1
+                metrics.incr("shadow_agreements")
+            else:
+                metrics.incr("shadow_disagreements")
+            metrics.set_gauge("shadow_agreement_rate", stats.agreed / stats.scored)
+
+    def shadow_stats(self):
+        """Agreement counts for the current shadow candidate, or None."""
+        stats = self._shadow_stats
+        return None if stats is None else stats.as_dict()
+
+    def status(self):
+        return {
+            "active": self._active.version,
+            "shadow": self.shadow_stats(),
+            "versions": list_versions(self.models_dir),
+        }
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "status"
+    if command == "activate" and len(sys.argv) == 3:
+        write_pointer(MODELS_DIR, ACTIVE_POINTER, None if sys.argv[2] == "local" else sys.argv[2])
+    elif command == "shadow" and len(sys.argv) == 3:
+        write_pointer(MODELS_DIR, SHADOW_POINTER, None if sys.argv[2] == "--clear" else sys.argv[2])
+    elif command != "status":
+        sys.exit("usage: python model_registry.py [status | activate <version>|local | shadow <version>|--clear]")
+    print(f"active: {read_pointer(MODELS_DIR, ACTIVE_POINTER) or 'local'}")
+    print(f"shadow: {read_pointer(MODELS_DIR, SHADOW_POINTER) or '-'}")
+    for name in list_versions(MODELS_DIR):
+        print(f"  {name}")
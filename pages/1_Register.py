@@ -0,0 +1,28 @@
+import streamlit as st
+import autism_diagnosis_app as app
+
+# Register page of the multipage app: Signup and Login drawn by the main app's page functions,
+# in the same server process, so it shares the connection pool, caches and session state
+
+# Set page layout
+st.set_page_config(layout="wide")
+
+# Main application function
+def main():
+    if app.init_db_pool() is None:
+        st.stop()  # Stop execution if database connection failed
+
+    app.restore_session()
+
+    # Sidebar menu for navigation using radio buttons
+    menu = ["Signup", "Login"]
+    selected = st.sidebar.radio("Start Here!", menu)
+
+    if selected == "Signup":
+        app.show_signup_page()
+    elif selected == "Login":
+        app.show_login_page()
+
+# Run the main function
+if __name__ == '__main__':
+    main()
@@ -1,7 +1,7 @@
-import requests
 import streamlit as st
+import autism_diagnosis_app as app
 
-from PIL import Image
+# Home page of the multipage app; images are served pre-sized from the shared asset cache
 
 st.set_page_config(page_title="My Webpage", page_icon=":tada:", layout="wide")
 
@@ -15,8 +15,7 @@ with st.container():
         Autism spectrum disorder (ASD) is a developmental disability caused by differences in the brain. People with ASD often have problems with social communication and interaction, and restricted or repetitive behaviors or interests. People with ASD may also have different ways of learning, moving, or paying attention.
         """)
     with col2:
-        img1=Image.open("image/asd_child.jpg")
-        st.image(img1,width=300)
+        app.show_image("asd_child.jpg", width=300)
 
 
 with st.container():
@@ -33,8 +32,7 @@ with st.container():
         :blue[Brain differences] : Differences in certain areas of the brain have been observed in people with ASD, compared to those without ASD. It is not yet known what causes these differences.
         """)
     with col2:
-        img1=Image.open("image/causes-of-autism.png")
-        st.image(img1,width=350, caption="Causes of ASD")
+        app.show_image("causes-of-autism.png", width=350, caption="Causes of ASD")
 
 
 with st.container():
@@ -62,10 +60,8 @@ with st.container():
         """)
         st.write("[Learn More >](https://www.who.int/news-room/fact-sheets/detail/autism-spectrum-disorders)")
     with col2:
-        img=Image.open("image/autism.png")
-        st.image(img,caption="Signs of ASD")
-        img1=Image.open("image/Strategies.jpeg")
-        st.image(img1,caption="")
+        app.show_image("autism.png", width=400, caption="Signs of ASD")
+        app.show_image("Strategies.jpeg", width=400)
     
 
 
@@ -96,10 +92,8 @@ with st.container():
             """)
 
     with right_column:
-        img=Image.open("image/autism-stats-1.jpg")
-        st.image(img,width=350,caption="ASD ststistics")
-        img1=Image.open("image/autism-stats-2.png")
-        st.image(img1,width=350,caption="USA data over 18 years")
+        app.show_image("autism-stats-1.jpg", width=350, caption="ASD ststistics")
+        app.show_image("autism-stats-2.png", width=350, caption="USA data over 18 years")
 
 with st.container():
     st.title("World Autism Awareness Day")
@@ -107,9 +101,7 @@ with st.container():
         "This year, WAAD will be observed with a virtual event on Sunday, 2 April, from 10:00 a.m. to 1:00 p.m. EDT.The event is organized in close collaboration with autistic people and will feature autistic people from around the world discussing how the transformation in the narrative around neurodiversity can continue to be furthered in order to overcome barriers and improve the lives of autistic people. It will also address the contributions that autistic people make – and can make – to society, and to the achievement of the Sustainable Development Goals."
     )
 c1,c2=st.columns([5,5])
-im=Image.open("image/World.png")
-c1.image(im,caption="")
-im1=Image.open("image/Worlds.png")
-   
-c2.image(im1,caption="")
-        
\ No newline at end of file
+with c1:
+    app.show_image("World.png", width=600)
+with c2:
+    app.show_image("Worlds.png", width=600)
@@ -0,0 +1,11 @@
+import streamlit as st
+import autism_diagnosis_app as app
+
+# Contact Us page of the multipage app; messages go through the shared email outbox
+
+st.set_page_config(page_title="Contact Us", page_icon=":mailbox:", layout="wide")
+
+if app.init_db_pool() is None:
+    st.stop()  # Stop execution if database connection failed
+
+app.show_contact_page()
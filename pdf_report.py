@@ -0,0 +1,115 @@
+"""In-memory PDF diagnosis reports.
+
+Reports are rendered straight into bytes, so concurrent sessions never share
+a file on disk. Labels and the value formatting are prepared once at import;
+building a fresh ``FPDF`` page is cheaper than cloning a pre-built one, so
+each report starts from a new document. ``render_many`` renders a chunk of
+reports inside a pool worker and ``zip_reports`` packs the results into a
+single zip archive.
+"""
+
+import io
+import re
+import zipfile
+
+from fpdf import FPDF
+
+TITLE = "Autism Diagnosis Result"
+FONT = "Arial"
+FONT_SIZE = 12
+CELL_WIDTH = 200
+CELL_HEIGHT = 10
+GENDER_LABEL = "Gender (Male=1/Female=0)"
+BATCH_CHUNK_SIZE = 64
+
+LABELS = [
+    "Social Responsiveness",
+    "Age",
+    "Speech Delay",
+    "Learning Disorder",
+    "Genetic Disorders",
+    "Depression",
+    "Intellectual Disability",
+    "Social/Behavioral Issues",
+    "Anxiety Disorder",
+    GENDER_LABEL,
+    "Suffers from Jaundice",
+    "Family History with ASD"
+]
+
+# Yes/No wording for the flag fields; gender and numeric fields are shown as-is
+_YES_NO = {1: "Yes", 0: "No"}
+_CONVERT = [label != GENDER_LABEL for label in LABELS]
+
+
+def format_inputs(input_row):
+    """Return the report lines for one 12-value input row."""
+    lines = []
+    for label, convert, value in zip(LABELS, _CONVERT, input_row):
+        if convert and value in _YES_NO:
+            value = _YES_NO[value]
+        lines.append(f"{label}: {value}")
+    return lines
+
+
+def format_contributions(contributions):
+    """Return report lines for per-feature contributions, largest effect first."""
+    ranked = sorted(zip(LABELS, contributions), key=lambda item: -abs(item[1]))
+    return [f"{label}: {value * 100:+.1f} points" for label, value in ranked]
+
+
+def render_report(name, diagnosis_result, input_row, probability=None, contributions=None):
+    """Render one diagnosis report and return the PDF bytes.
+
+    ``probability`` (of a positive result) and ``contributions`` (one value
+    per input, in probability units) are added when given.
+    """
+    pdf = FPDF()
+    pdf.add_page()
+    pdf.set_font(FONT, size=FONT_SIZE)
+
+    pdf.cell(CELL_WIDTH, CELL_HEIGHT, txt=TITLE, ln=True, align='C')
+    pdf.cell(CELL_WIDTH, CELL_HEIGHT, txt=f"Patient Name: {name}", ln=True)
+    pdf.cell(CELL_WIDTH, CELL_HEIGHT, txt=f"Diagnosis: {diagnosis_result}", ln=True)
+    if probability is not None:
+        pdf.cell(CELL_WIDTH, CELL_HEIGHT, txt=f"Probability of ASD: {probability * 100:.1f}%", ln=True)
+    pdf.cell(CELL_WIDTH, CELL_HEIGHT, txt="Input Data Results:", ln=True)
+    for line in format_inputs(input_row):
+        pdf.cell(CELL_WIDTH, CELL_HEIGHT, txt=line, ln=True)
+    if contributions is not None:
+        pdf.cell(CELL_WIDTH, CELL_HEIGHT, txt="What drove the result (change in ASD probability):", ln=True)
+        for line in format_contributions(contributions):
+            pdf.cell(CELL_WIDTH, CELL_HEIGHT, txt=line, ln=True)
+
+    data = pdf.output(dest='S')
+    # fpdf 1.x returns a latin-1 str, fpdf2 returns a bytearray
+    return data.encode('latin-1') if isinstance(data, str) else bytes(data)
+
+
+def report_filename(index, name):
+    """Zip member name for the ``index``-th report."""
+    safe_name = re.sub(r'[^A-Za-z0-9_.-]+', '_', str(name)).strip('_') or 'report'
+    return f"{index:06d}_{safe_name}.pdf"
+
+
+def render_many(reports):
+    """Render a list of ``(name, diagnosis_result, input_row)`` tuples; used by pool workers."""
+    return [render_report(*report) for report in reports]
+
+
+def chunk_reports(reports):
+    """Split reports into the chunks rendered by one worker call each."""
+    return [reports[i:i + BATCH_CHUNK_SIZE] for i in range(0, len(reports), BATCH_CHUNK_SIZE)]
+
+
+def zip_reports(reports, rendered_chunks):
+    """Pack rendered chunks (in ``chunk_reports`` order) into one zip archive in memory."""
+    buffer = io.BytesIO()
+    # PDFs are already compressed, so store them without deflating again
+    with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_STORED) as archive:
+        index = 0
+        for rendered in rendered_chunks:
+            for pdf_bytes in rendered:
+                archive.writestr(report_filename(index + 1, reports[index][0]), pdf_bytes)
+                index += 1
+    return buffer.getvalue()
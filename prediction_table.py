@@ -0,0 +1,167 @@
+"""Precomputed predictions for every input the diagnosis form can produce.
+
+The form has Social Responsiveness 0-10, Age 0-18 and ten yes/no (or gender)
+fields, so there are only 11 * 19 * 2**10 = 214,016 possible inputs. The
+table scores all of them once and stores the class and positive-class
+probability in a memory-mapped ``mapped_file`` container indexed by a packed
+integer key. Probabilities are kept as float64 (about 1.9 MB in all), so a
+lookup returns exactly what the model would. Like the model artifact, the
+header records the checksums of the pickles the table was built from.
+
+Build it ahead of time with::
+
+    python prediction_table.py
+"""
+
+import pickle
+import sys
+
+import numpy as np
+
+import mapped_file
+from schema import MODEL_FILE, SCALER_FILE, TABLE_FILE
+
+RESPONSIVENESS_VALUES = 11  # Social Responsiveness 0-10
+AGE_VALUES = 19  # Age 0-18
+FLAG_COUNT = 10  # Remaining yes/no and gender fields
+TABLE_SIZE = RESPONSIVENESS_VALUES * AGE_VALUES * 2 ** FLAG_COUNT
+
+TABLE_DTYPE = np.dtype([("label", np.uint8), ("proba", np.float64)])
+MAGIC = b"ASDTABLE"
+FORMAT_VERSION = 1
+
+
+def pack_key(row):
+    """Pack one 12-value input row into its table index; KeyError if the form cannot produce it."""
+    values = [float(value) for value in row]
+    if not all(value.is_integer() for value in values):
+        raise KeyError(f"Input outside the form's range: {row}")
+    responsiveness, age, *flags = (int(value) for value in values)
+    if not (0 <= responsiveness < RESPONSIVENESS_VALUES and 0 <= age < AGE_VALUES):
+        raise KeyError(f"Input outside the form's range: {row}")
+    if len(flags) != FLAG_COUNT or any(flag not in (0, 1) for flag in flags):
+        raise KeyError(f"Input outside the form's range: {row}")
+    key = responsiveness * AGE_VALUES + age
+    for flag in flags:
+        key = (key << 1) | flag
+    return key
+
+
+def pack_keys(rows):
+    """Vectorized ``pack_key`` for an (n, 12) array.
+
+    Returns ``(keys, in_range)``; rows the form cannot produce (out of range
+    or non-integer) are flagged False in ``in_range`` and get key 0.
+    """
+    rows = np.asarray(rows, dtype=np.float64)
+    flags = rows[:, 2:]
+    in_range = (
+        (rows.shape[1] == 2 + FLAG_COUNT)
+        & np.all(rows == np.floor(rows), axis=1)
+        & (rows[:, 0] >= 0) & (rows[:, 0] < RESPONSIVENESS_VALUES)
+        & (rows[:, 1] >= 0) & (rows[:, 1] < AGE_VALUES)
+        & np.all((flags == 0) | (flags == 1), axis=1)
+    )
+    valid = np.where(in_range[:, None], rows, 0).astype(np.int64)
+    keys = valid[:, 0] * AGE_VALUES + valid[:, 1]
+    for i in range(FLAG_COUNT):
+        keys = (keys << 1) | valid[:, 2 + i]
+    return keys, in_range
+
+
+def unpack_keys(keys):
+    """Expand packed keys back into input rows, shape (len(keys), 12)."""
+    keys = np.asarray(keys, dtype=np.int64)
+    rows = np.empty((len(keys), 2 + FLAG_COUNT), dtype=np.int64)
+    prefix = keys >> FLAG_COUNT
+    rows[:, 0] = prefix // AGE_VALUES
+    rows[:, 1] = prefix % AGE_VALUES
+    for i in range(FLAG_COUNT):
+        rows[:, 2 + i] = (keys >> (FLAG_COUNT - 1 - i)) & 1
+    return rows
+
+
+def score_rows(classifier, scaler, rows):
+    """Score rows with the live model, returning (labels, positive-class probabilities).
+
+    ``scaler`` may be None for models that take raw rows, such as a
+    ``forest_engine.CompiledForest``.
+    """
+    if scaler is not None:
+        rows = scaler.transform(rows)
+    proba = classifier.predict_proba(rows)
+    labels = classifier.classes_.take(np.argmax(proba, axis=1), axis=0)
+    positive = list(classifier.classes_).index(1)
+    return labels, proba[:, positive]
+
+
+def build_table(classifier, scaler, path=TABLE_FILE, sources=None):
+    """Score every possible form input in one batch and save the table to ``path``.
+
+    ``sources`` are the checksums of the pickles the model came from (see
+    ``model_artifact.source_digests``).
+    """
+    labels, proba = score_rows(classifier, scaler, unpack_keys(np.arange(TABLE_SIZE)))
+    table = np.empty(TABLE_SIZE, dtype=TABLE_DTYPE)
+    table["label"] = labels
+    table["proba"] = proba
+    mapped_file.write(path, MAGIC, FORMAT_VERSION, {"sources": sources}, {"table": table})
+    return load_table(path, sources)
+
+
+def load_table(path=TABLE_FILE, sources=None):
+    """Memory-map a previously built table read-only.
+
+    With ``sources`` a table built from any other pickles raises ValueError.
+    """
+    header, arrays = mapped_file.read(path, MAGIC, FORMAT_VERSION, "prediction table")
+    table = arrays.get("table")
+    if table is None or table.dtype != TABLE_DTYPE or table.shape != (TABLE_SIZE,):
+        raise ValueError(f"{path} is not a prediction table for this form.")
+    if sources is not None and header.get("sources") != sources:
+        raise ValueError(f"{path} was built from different pickles.")
+    return table
+
+
+def lookup(table, row):
+    """Return (label, positive-class probability) for one form input."""
+    entry = table[pack_key(row)]
+    return int(entry["label"]), float(entry["proba"])
+
+
+def check_table(table, classifier, scaler, samples=512, seed=0):
+    """Spot-check a random sample of table entries against the live model."""
+    keys = np.random.default_rng(seed).choice(TABLE_SIZE, size=samples, replace=False)
+    keys.sort()
+    labels, proba = score_rows(classifier, scaler, unpack_keys(keys))
+    entries = table[keys]
+    return (np.array_equal(entries["label"], labels)
+            and np.array_equal(entries["proba"], proba))
+
+
+def load_or_build_table(classifier, scaler, path=TABLE_FILE, sources=None):
+    """Load the table, rebuilding it if it is missing, from other pickles or disagrees with the model.
+
+    ``classifier`` and ``scaler`` are only used to spot-check and rebuild
+    the table, so a compiled forest (with no scaler) serves as well as the
+    pickles it was compiled from.
+    """
+    try:
+        table = load_table(path, sources)
+    except (OSError, ValueError):
+        return build_table(classifier, scaler, path, sources)
+    if not check_table(table, classifier, scaler):
+        return build_table(classifier, scaler, path, sources)
+    return table
+
+
+if __name__ == "__main__":
+    import model_artifact
+
+    output_path = sys.argv[1] if len(sys.argv) > 1 else TABLE_FILE
+    with open(MODEL_FILE, "rb") as model_file:
+        classifier = pickle.load(model_file)
+    with open(SCALER_FILE, "rb") as scaler_file:
+        scaler = pickle.load(scaler_file)
+    build_table(classifier, scaler, output_path, model_artifact.source_digests())
+    print(f"Wrote {TABLE_SIZE} predictions to {output_path}")
@@ -0,0 +1,124 @@
+"""Process-wide LRU cache of diagnosis results and rendered PDF reports.
+
+The diagnosis form can only produce a few hundred thousand distinct inputs
+and the common ones come up again and again, from the same user pressing
+Diagnose twice or from different sessions. Entries are keyed by the model
+bundle (version plus load, so a swapped or reloaded model never serves old
+answers) and the input vector. Reports also carry the name printed on them.
+
+The cache is bounded by the bytes it holds: a report costs its PDF size, a
+diagnosis a fixed ``RESULT_BYTES``. Least recently used entries are evicted
+once ``MAX_BYTES`` is exceeded. Hits, misses and evictions are counted here
+and in ``metrics`` (``result_cache_*``).
+"""
+
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+
+import metrics
+
+MAX_BYTES = 64 * 1024 * 1024
+RESULT_BYTES = 512  # Rough size of a cached (label, probability, bias, contributions) tuple
+ENTRY_BYTES = 200  # Bookkeeping charged on top of every entry
+
+
+class ResultCache:
+    """Thread-safe LRU bounded by the total size of its values."""
+
+    def __init__(self, max_bytes=MAX_BYTES, name="result_cache"):
+        self.max_bytes = max_bytes
+        self.name = name
+        self._entries = OrderedDict()  # key -> (value, size)
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """Return the cached value, or None on a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+            else:
+                self._entries.move_to_end(key)
+                self.hits += 1
+        metrics.incr(f"{self.name}_misses" if entry is None else f"{self.name}_hits")
+        return None if entry is None else entry[0]
+
+    def put(self, key, value, size):
+        size += ENTRY_BYTES
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.bytes -= old[1]
+            self._entries[key] = (value, size)
+            self.bytes += size
+            evicted = 0
+            while self.bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.bytes -= evicted_size
+                evicted += 1
+            self.evictions += evicted
+            current_bytes = self.bytes
+        if evicted:
+            metrics.incr(f"{self.name}_evictions", evicted)
+        metrics.set_gauge(f"{self.name}_bytes", current_bytes)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else None,
+                "evictions": self.evictions,
+            }
+
+
+cache = ResultCache()
+
+
+def _row_key(row):
+    # Floats, so 3 and 3.0 share an entry but 3.7 never does
+    return tuple(float(value) for value in row)
+
+
+def diagnose(bundle, row):
+    """``bundle.explain(row)``, served from the cache when the same input was scored before."""
+    key = ("diagnosis", bundle.cache_key, _row_key(row))
+    result = cache.get(key)
+    if result is None:
+        result = bundle.explain(row)
+        cache.put(key, result, RESULT_BYTES)
+    return result
+
+
+def report(bundle, row, name, render):
+    """Return a Future of the report's PDF bytes; ``render()`` (returning a Future) runs on a miss."""
+    key = ("report", bundle.cache_key, _row_key(row), name)
+    pdf_bytes = cache.get(key)
+    if pdf_bytes is not None:
+        future = Future()
+        future.set_result(pdf_bytes)
+        return future
+
+    def store(done):
+        if not done.cancelled() and done.exception() is None:
+            cache.put(key, done.result(), len(done.result()))
+
+    future = render()
+    future.add_done_callback(store)
+    return future
@@ -0,0 +1,30 @@
+"""Names shared by the app, the model tooling and the services.
+
+The dataset's columns and the model's file names are defined here once and
+imported everywhere else. This module imports nothing, so any page can use
+it without loading pandas or the model stack.
+"""
+
+# Model inputs in the same order as asd_data_csv.csv (Outcome excluded)
+FEATURE_COLUMNS = [
+    "Social_Responsiveness_Scale",
+    "Age_Years",
+    "Speech Delay/Language Disorder",
+    "Learning disorder",
+    "Genetic_Disorders",
+    "Depression",
+    "Global developoental delay/intellectual disability",
+    "Social/Behavioural Issues",
+    "Anxiety_disorder",
+    "Sex",
+    "Jaundice",
+    "Family_member_with_ASD",
+]
+OUTCOME_COLUMN = "Outcome"
+
+DATASET_FILE = "asd_data_csv.csv"
+MODEL_FILE = "autism_random_forest.pkl"
+SCALER_FILE = "scaler.pkl"
+ARTIFACT_FILE = "autism_model.bin"  # Compiled forest, see model_artifact
+TABLE_FILE = "prediction_table.bin"  # Precomputed predictions, see prediction_table
+MODELS_DIR = "models"  # Versioned models, see model_registry
@@ -0,0 +1,54 @@
+"""Shared fixtures. The app's modules live at the repository root."""
+
+import os
+import pickle
+import shutil
+import sys
+
+import numpy as np
+import pytest
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+from schema import DATASET_FILE, MODEL_FILE, SCALER_FILE  # noqa: E402
+
+MODEL_FILES = [MODEL_FILE, SCALER_FILE, DATASET_FILE]
+
+
+@pytest.fixture
+def app_dir(tmp_path, monkeypatch):
+    """A scratch copy of the shipped pickles and dataset, used as the working directory."""
+    for name in MODEL_FILES:
+        shutil.copy(os.path.join(REPO_DIR, name), tmp_path / name)
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+def load_pipeline(directory):
+    with open(os.path.join(directory, MODEL_FILE), "rb") as f:
+        classifier = pickle.load(f)
+    with open(os.path.join(directory, SCALER_FILE), "rb") as f:
+        scaler = pickle.load(f)
+    return classifier, scaler
+
+
+def replace_model(directory, n_estimators=5, seed=1):
+    """Overwrite the classifier pickle in ``directory`` with a different, smaller forest."""
+    from sklearn.ensemble import RandomForestClassifier
+
+    data = np.loadtxt(os.path.join(REPO_DIR, DATASET_FILE), delimiter=",", skiprows=1)
+    _, scaler = load_pipeline(directory)
+    classifier = RandomForestClassifier(n_estimators=n_estimators, max_depth=3, random_state=seed)
+    classifier.fit(scaler.transform(data[:, :12]), data[:, 12].astype(int))
+    path = os.path.join(directory, MODEL_FILE)
+    with open(path, "wb") as f:
+        pickle.dump(classifier, f)
+    # Make the replacement visible to mtime checks even on coarse-grained filesystems
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    return classifier, scaler
+
+
+def pipeline_probability(classifier, scaler, row):
+    return float(classifier.predict_proba(scaler.transform([row]))[0, 1])
@@ -0,0 +1,116 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import analytics
+from analytics import COLUMNS, OUTCOME_AXIS, SHAPE
+from dataset import DatasetError
+from schema import OUTCOME_COLUMN
+
+
+@pytest.fixture
+def paths(tmp_path):
+    return str(tmp_path / "data.csv"), str(tmp_path / "data.cube")
+
+
+def random_rows(seed, n):
+    rng = np.random.default_rng(seed)
+    return np.column_stack([rng.integers(0, size, n) for size in SHAPE])
+
+
+def write_csv(path, rows, mode="w"):
+    with open(path, mode) as f:
+        if mode == "w":
+            f.write(",".join(COLUMNS) + "\n")
+        f.writelines(",".join(map(str, row)) + "\n" for row in rows)
+
+
+def assert_matches_groupby(cube, rows, by, filters=None):
+    frame = pd.DataFrame(rows, columns=COLUMNS)
+    for column, (low, high) in (filters or {}).items():
+        frame = frame[frame[column].between(low, high)]
+    expected = frame.groupby(by)[OUTCOME_COLUMN].agg(["count", "sum"])
+
+    values, counts, positives = cube.outcome_rates(by, filters)
+    seen = counts > 0
+    assert values[seen].tolist() == expected.index.tolist()
+    assert counts[seen].tolist() == expected["count"].tolist()
+    assert positives[seen].tolist() == expected["sum"].tolist()
+
+
+def test_appended_rows_match_a_pandas_groupby(paths):
+    csv_path, _ = paths
+    first, appended = random_rows(0, 500), random_rows(1, 300)
+    write_csv(csv_path, first)
+    cube = analytics.AnalyticsCube.empty()
+    assert cube.update_from_csv(csv_path)
+    write_csv(csv_path, appended, mode="a")
+    assert cube.update_from_csv(csv_path)
+
+    rows = np.vstack([first, appended])
+    assert cube.n_rows == len(rows)
+    assert cube.offset == os.path.getsize(csv_path)
+    for by in ("Age_Years", "Social_Responsiveness_Scale", "Sex"):
+        assert_matches_groupby(cube, rows, by)
+    assert_matches_groupby(cube, rows, "Age_Years", {"Age_Years": (3, 9), "Jaundice": (1, 1)})
+
+
+def test_rewritten_csv_triggers_a_rebuild(paths):
+    csv_path, cube_path = paths
+    write_csv(csv_path, random_rows(0, 200))
+    live = analytics.LiveCube(csv_path, cube_path)
+    stat = os.stat(csv_path)
+
+    # Same size and header, different rows before the counted offset
+    rewritten = random_rows(0, 200)
+    rewritten[:, OUTCOME_AXIS] = 1 - rewritten[:, OUTCOME_AXIS]
+    write_csv(csv_path, rewritten)
+    os.utime(csv_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert not live.cube.update_from_csv(csv_path)
+
+    cube = live.refresh()
+    assert cube.n_rows == 200
+    assert_matches_groupby(cube, rewritten, "Age_Years")
+
+
+def test_trailing_row_is_counted_once_its_newline_arrives(paths):
+    csv_path, cube_path = paths
+    rows = random_rows(0, 50)
+    write_csv(csv_path, rows[:49])
+    with open(csv_path, "a") as f:
+        f.write(",".join(map(str, rows[49])))
+    live = analytics.LiveCube(csv_path, cube_path)
+    assert live.cube.n_rows == 49
+
+    with open(csv_path, "a") as f:
+        f.write("\n")
+    cube = live.refresh()
+    assert cube.n_rows == 50
+    assert_matches_groupby(cube, rows, "Age_Years")
+
+
+def test_reload_continues_from_the_saved_offset(paths, monkeypatch):
+    csv_path, cube_path = paths
+    first, appended = random_rows(0, 100), random_rows(1, 40)
+    write_csv(csv_path, first)
+    saved = analytics.LiveCube(csv_path, cube_path).cube
+
+    write_csv(csv_path, appended, mode="a")
+    # A new process must pick up from asd_data.cube, not recount the CSV
+    monkeypatch.setattr(analytics, "build_cube", lambda *args: pytest.fail("cube was rebuilt"))
+    reloaded = analytics.LiveCube(csv_path, cube_path)
+    assert reloaded.cube.offset == os.path.getsize(csv_path) > saved.offset
+    assert_matches_groupby(reloaded.cube, np.vstack([first, appended]), "Age_Years")
+    assert analytics.AnalyticsCube.load(cube_path).offset == reloaded.cube.offset
+
+
+def test_rows_outside_the_cube_are_rejected(paths):
+    csv_path, _ = paths
+    rows = random_rows(0, 3)
+    rows[1, 1] = SHAPE[1]
+    write_csv(csv_path, rows)
+    with pytest.raises(DatasetError):
+        analytics.AnalyticsCube.empty().update_from_csv(csv_path)
+
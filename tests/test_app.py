@@ -0,0 +1,104 @@
+import os
+
+import pytest
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+
+import auth
+import database
+import diagnosis_history
+import email_outbox
+from conftest import REPO_DIR
+
+APP_SCRIPT = os.path.join(REPO_DIR, "autism_diagnosis_app.py")
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    """The app as a logged-in user, against a fresh naz.db in a scratch directory."""
+    monkeypatch.chdir(tmp_path)
+    # Pools and writers are keyed by the relative path 'naz.db'; start from none
+    monkeypatch.setattr(database, "_pools", {})
+    monkeypatch.setattr(diagnosis_history, "_writers", {})
+    monkeypatch.setattr(email_outbox, "_worker", None)
+    st.cache_resource.clear()
+    at = AppTest.from_file(APP_SCRIPT, default_timeout=60)
+    at.session_state["logged_in"] = True
+    at.session_state["username"] = "history-user"
+    yield at
+    # The app starts an outbox worker on this directory's database; stop it with the test
+    if email_outbox._worker is not None:
+        email_outbox._worker.stop(timeout=10)
+    st.cache_resource.clear()
+
+
+def add_diagnoses(count):
+    for i in range(count):
+        diagnosis_history.record("history-user", [i % 11, 3] + [0] * 10, i % 2, 0.5)
+    diagnosis_history.flush()
+
+
+def button(at, label):
+    return next(b for b in at.button if b.label == label)
+
+
+@pytest.mark.parametrize("count", [diagnosis_history.PAGE_SIZE, diagnosis_history.PAGE_SIZE * 2])
+def test_history_with_exact_multiple_of_page_size(app, count):
+    app.run()
+    add_diagnoses(count)
+    app.sidebar.selectbox[0].select("Diagnosis History").run()
+    pages = 1
+    while not button(app, "Older").disabled:
+        button(app, "Older").click().run()
+        pages += 1
+        assert not app.exception
+        assert len(app.dataframe[0].value) == diagnosis_history.PAGE_SIZE
+    assert pages == count // diagnosis_history.PAGE_SIZE
+    assert app.caption[0].value == f"Page {pages}"
+
+
+def test_history_pages_back_and_forth(app):
+    app.run()
+    add_diagnoses(diagnosis_history.PAGE_SIZE + 3)
+    app.sidebar.selectbox[0].select("Diagnosis History").run()
+    first = app.dataframe[0].value
+    button(app, "Older").click().run()
+    assert len(app.dataframe[0].value) == 3
+    assert button(app, "Older").disabled
+    button(app, "Newer").click().run()
+    assert app.dataframe[0].value.equals(first)
+
+
+def test_login_keeps_session_token_out_of_url(app):
+    app.session_state["logged_in"] = False
+    app.run()
+    database.add_user("token-user", auth.hash_password("correct horse"))
+    app.sidebar.selectbox[0].select("Login").run()
+    app.text_input[0].input("token-user")
+    app.text_input[1].input("correct horse")
+    button(app, "Login").click().run()
+    assert [s.value for s in app.success] == ["Logged In as token-user"]
+    assert "session" not in app.query_params
+    token = app.session_state["session_token"]
+    assert auth.verify_session(token) == "token-user"
+
+    app.run()
+    assert "session" not in app.query_params
+    app.sidebar.selectbox[0].select("Logout").run()
+    assert auth.verify_session(token) is None
+    assert not app.session_state["logged_in"]
+    assert "session_token" not in app.session_state
+
+
+@pytest.mark.parametrize("params", [{"metrics": "json"}, {"metrics": "prometheus"}, {"profile": "1"}])
+def test_debug_params_need_flag(app, monkeypatch, params):
+    monkeypatch.delenv("ASD_DEBUG_PARAMS", raising=False)
+    for key, value in params.items():
+        app.query_params[key] = value
+    app.run()
+    assert not app.json and not app.code and not app.expander
+    assert app.sidebar.selectbox[0].value == "Home"
+
+    monkeypatch.setenv("ASD_DEBUG_PARAMS", "1")
+    app.sidebar.selectbox[0].select("Diagnosis History").run()
+    assert app.json or app.code
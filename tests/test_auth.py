@@ -0,0 +1,80 @@
+import hashlib
+
+import pytest
+
+import auth
+import database
+
+
+@pytest.fixture
+def db_path(tmp_path, monkeypatch):
+    monkeypatch.setattr(auth, "_secrets", {})
+    monkeypatch.setattr(auth, "session_cache", auth.SessionCache())
+    return str(tmp_path / "auth.db")
+
+
+def at_time(monkeypatch, now):
+    monkeypatch.setattr(auth.time, "time", lambda: now)
+
+
+def test_session_round_trip_and_logout(db_path):
+    token = auth.create_session("alice", db_path)
+    assert auth.verify_session(token, db_path) == "alice"
+    auth.end_session(token, db_path)
+    assert auth.verify_session(token, db_path) is None
+
+
+@pytest.mark.parametrize("token", [None, "", "garbage", "a.b.c", "a.b"])
+def test_malformed_tokens_are_rejected(db_path, token):
+    assert auth.verify_session(token, db_path) is None
+
+
+def test_tampered_token_is_rejected(db_path):
+    token = auth.create_session("alice", db_path)
+    other = auth.create_session("mallory", db_path)
+    # Mallory's payload under Alice's signature, and the reverse
+    assert auth.verify_session(f"{other.split('.')[0]}.{token.split('.')[1]}", db_path) is None
+    assert auth.verify_session(f"{token.split('.')[0]}.{other.split('.')[1]}", db_path) is None
+
+
+def test_token_from_another_database_is_rejected(db_path, tmp_path):
+    token = auth.create_session("alice", str(tmp_path / "other.db"))
+    assert auth.verify_session(token, db_path) is None
+
+
+def test_token_expires(db_path, monkeypatch):
+    token = auth.create_session("alice", db_path)
+    now = auth.time.time()
+    at_time(monkeypatch, now + auth.SESSION_LIFETIME - 60)
+    assert auth.verify_session(token, db_path) == "alice"
+    at_time(monkeypatch, now + auth.SESSION_LIFETIME + 1)
+    assert auth.verify_session(token, db_path) is None
+
+
+def test_logout_elsewhere_is_seen_after_cache_ttl(db_path, monkeypatch):
+    token = auth.create_session("alice", db_path)
+    now = auth.time.time()
+    session_id = auth._parse(token, db_path)[1]
+    # Another process logged the session out; this one trusts its cache until the TTL is up
+    database.delete_session(session_id, db_path)
+    assert auth.verify_session(token, db_path) == "alice"
+    at_time(monkeypatch, now + auth.CACHE_TTL + 1)
+    assert auth.verify_session(token, db_path) is None
+
+
+def test_legacy_hash_is_upgraded_on_login(db_path):
+    legacy = hashlib.sha256(b"old password").hexdigest()
+    database.add_user("alice", legacy, db_path)
+
+    assert not auth.authenticate("alice", "wrong", db_path)
+    assert database.get_password_hash("alice", db_path) == legacy
+
+    assert auth.authenticate("alice", "old password", db_path)
+    upgraded = database.get_password_hash("alice", db_path)
+    assert upgraded.startswith("scrypt$") and not auth.needs_rehash(upgraded)
+    assert auth.authenticate("alice", "old password", db_path)
+    assert not auth.authenticate("alice", "wrong", db_path)
+
+
+def test_unknown_user_is_rejected(db_path):
+    assert not auth.authenticate("nobody", "anything", db_path)
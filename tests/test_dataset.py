@@ -0,0 +1,109 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import dataset
+from conftest import REPO_DIR
+from schema import DATASET_FILE
+
+HEADER = "Score,Flag,Outcome\n"
+
+
+@pytest.fixture
+def paths(tmp_path):
+    return str(tmp_path / "data.csv"), str(tmp_path / "data.cols")
+
+
+def write_csv(path, rows):
+    with open(path, "w") as f:
+        f.write(HEADER)
+        f.writelines(f"{','.join(map(str, row))}\n" for row in rows)
+
+
+def rows_of(data):
+    return sorted(map(tuple, data.to_frame(expand=True).to_numpy().tolist()))
+
+
+def test_duplicate_rows_collapse_with_their_counts(paths):
+    csv_path, cache_path = paths
+    write_csv(csv_path, [(3, 1, 0), (7, 0, 1), (3, 1, 0), (3, 1, 0), (7, 0, 1), (200, 1, 1)])
+    data = dataset.load_dataset(csv_path, cache_path)
+    assert data.n_rows == 6 and data.n_unique == 3
+    counts = {tuple(row[:-1]): row[-1] for row in data.to_frame().to_numpy().tolist()}
+    assert counts == {(3, 1, 0): 3, (7, 0, 1): 2, (200, 1, 1): 1}
+
+
+def test_chunked_build_matches_a_single_pass(paths):
+    csv_path, cache_path = paths
+    rows = [(i % 5, i % 2, i % 3 == 0) for i in range(100)]
+    write_csv(csv_path, [tuple(int(value) for value in row) for row in rows])
+    dataset.build_cache(csv_path, cache_path, chunk_rows=7)
+    chunked = rows_of(dataset.load_dataset(csv_path, cache_path))
+    dataset.build_cache(csv_path, cache_path)
+    assert chunked == rows_of(dataset.load_dataset(csv_path, cache_path))
+
+
+def test_expanded_frame_gives_back_the_csv_rows(tmp_path):
+    data = dataset.load_dataset(os.path.join(REPO_DIR, DATASET_FILE), str(tmp_path / "asd.cols"))
+    frame = pd.read_csv(os.path.join(REPO_DIR, DATASET_FILE))
+    expanded = data.to_frame(expand=True)
+    assert list(expanded.columns) == list(frame.columns)
+    assert data.n_rows == len(frame)
+    assert rows_of(data) == sorted(map(tuple, frame.to_numpy().tolist()))
+
+
+def test_cache_is_rebuilt_when_the_csv_grows(paths):
+    csv_path, cache_path = paths
+    write_csv(csv_path, [(1, 0, 0)])
+    assert dataset.load_dataset(csv_path, cache_path).n_rows == 1
+    with open(csv_path, "a") as f:
+        f.write("2,1,1\n")
+    assert rows_of(dataset.load_dataset(csv_path, cache_path)) == [(1, 0, 0), (2, 1, 1)]
+
+
+def test_cache_is_rebuilt_when_only_the_mtime_changes(paths):
+    csv_path, cache_path = paths
+    write_csv(csv_path, [(1, 0, 0)])
+    dataset.load_dataset(csv_path, cache_path)
+    stat = os.stat(csv_path)
+    # Same size, new contents and a later mtime
+    write_csv(csv_path, [(2, 0, 0)])
+    os.utime(csv_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert rows_of(dataset.load_dataset(csv_path, cache_path)) == [(2, 0, 0)]
+
+
+def test_unchanged_csv_reuses_the_cache(paths):
+    csv_path, cache_path = paths
+    write_csv(csv_path, [(1, 0, 0)])
+    dataset.load_dataset(csv_path, cache_path)
+    built = os.stat(cache_path).st_mtime_ns
+    dataset.load_dataset(csv_path, cache_path)
+    assert os.stat(cache_path).st_mtime_ns == built
+
+
+def test_corrupt_cache_is_rebuilt(paths):
+    csv_path, cache_path = paths
+    write_csv(csv_path, [(1, 0, 0)])
+    with open(cache_path, "wb") as f:
+        f.write(b"not a cache")
+    assert dataset.load_dataset(csv_path, cache_path).n_rows == 1
+
+
+@pytest.mark.parametrize("value", ["256", "-1", "1.5"])
+def test_values_outside_uint8_are_rejected(paths, value):
+    csv_path, cache_path = paths
+    with open(csv_path, "w") as f:
+        f.write(HEADER + f"{value},0,1\n")
+    with pytest.raises(dataset.DatasetError):
+        dataset.build_cache(csv_path, cache_path)
+
+
+def test_packed_flags_unpack_to_the_right_length(paths):
+    csv_path, cache_path = paths
+    write_csv(csv_path, [(i, i % 2, 0) for i in range(11)])
+    data = dataset.load_dataset(csv_path, cache_path)
+    assert data.n_unique == 11
+    assert np.array_equal(np.sort(data.column("Score")), np.arange(11))
+    assert data.column("Flag").sum() == 5
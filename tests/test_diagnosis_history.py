@@ -0,0 +1,69 @@
+import itertools
+
+import pytest
+
+import database
+import diagnosis_history
+
+ROW = [3, 2, 1, 1, 1, 1, 1, 1, 1, 1, 1, 0]
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "history.db")
+
+
+def record(db_path, username, times):
+    # Written directly rather than through the writer thread, to control created_at
+    with database.connection(db_path) as conn:
+        with conn:
+            conn.executemany(diagnosis_history._INSERT, [(username, t, *ROW, 1, 0.75) for t in times])
+
+
+def all_pages(db_path, username):
+    pages, cursor = [], None
+    while True:
+        page = diagnosis_history.fetch_page(username, cursor, path=db_path)
+        if not page:
+            return pages
+        pages.append(page)
+        cursor = diagnosis_history.next_cursor(page)
+
+
+def test_pages_cover_every_row_once_newest_first(db_path):
+    # Runs of equal timestamps straddle page boundaries, so the id tie-break matters
+    times = [float(i // 10) for i in range(diagnosis_history.PAGE_SIZE * 2 + 7)]
+    record(db_path, "alice", times)
+    record(db_path, "bob", [100.0] * 5)
+
+    pages = all_pages(db_path, "alice")
+    assert [len(page) for page in pages] == [diagnosis_history.PAGE_SIZE] * 2 + [7]
+    rows = list(itertools.chain.from_iterable(pages))
+    assert {row["username"] for row in rows} == {"alice"}
+    keys = [(row["created_at"], row["id"]) for row in rows]
+    assert keys == sorted(keys, reverse=True)
+    assert len(set(keys)) == len(times)
+
+
+def test_new_rows_do_not_shift_later_pages(db_path):
+    record(db_path, "alice", [float(i) for i in range(diagnosis_history.PAGE_SIZE * 2)])
+    first = diagnosis_history.fetch_page("alice", path=db_path)
+    expected = diagnosis_history.fetch_page("alice", diagnosis_history.next_cursor(first), path=db_path)
+
+    record(db_path, "alice", [1000.0, 1001.0, 1002.0])
+    assert diagnosis_history.fetch_page("alice", diagnosis_history.next_cursor(first), path=db_path) == expected
+
+
+def test_empty_history(db_path):
+    assert diagnosis_history.fetch_page("nobody", path=db_path) == []
+    assert diagnosis_history.next_cursor([]) is None
+
+
+def test_later_pages_use_the_index(db_path):
+    with database.connection(db_path) as conn:
+        plan = conn.execute(
+            f"EXPLAIN QUERY PLAN {diagnosis_history._SELECT} WHERE username = ? AND (created_at, id) < (?, ?) "
+            "ORDER BY created_at DESC, id DESC LIMIT ?",
+            ("alice", 1.0, 1, diagnosis_history.PAGE_SIZE),
+        ).fetchall()
+    assert "USING INDEX diagnoses_user_time" in plan[0][-1]
@@ -0,0 +1,92 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import drift_monitor
+import metrics
+from conftest import REPO_DIR
+from drift_monitor import GAUGE_INTERVAL, MODERATE_PSI, SIGNIFICANT_PSI
+from schema import DATASET_FILE, FEATURE_COLUMNS
+
+
+@pytest.fixture(scope="module")
+def rows():
+    return pd.read_csv(os.path.join(REPO_DIR, DATASET_FILE))[FEATURE_COLUMNS].to_numpy()
+
+
+@pytest.fixture
+def monitor(app_dir):
+    return drift_monitor.DriftMonitor.from_dataset(str(app_dir / DATASET_FILE))
+
+
+def sample(rows, n, seed=0):
+    return rows[np.random.default_rng(seed).integers(0, len(rows), n)]
+
+
+def older_children(rows):
+    return rows[rows[:, FEATURE_COLUMNS.index("Age_Years")] >= 12]
+
+
+def feed(monitor, rows):
+    for row in rows:
+        monitor.observe(row)
+
+
+def test_inputs_like_the_baseline_score_near_zero(monitor, rows):
+    feed(monitor, sample(rows, 2000))
+    scores = monitor.scores()
+    assert max(scores.values()) < MODERATE_PSI
+    assert {row["status"] for row in monitor.report()} == {"Stable"}
+
+
+def test_shifted_age_mix_is_significant_drift(monitor, rows):
+    feed(monitor, sample(older_children(rows), 1000))
+    assert monitor.scores()["Age_Years"] >= SIGNIFICANT_PSI
+    age = next(row for row in monitor.report() if row["feature"] == "Age_Years")
+    assert age["status"] == "Significant drift" and age["recent_mean"] > age["baseline_mean"]
+
+
+def test_nothing_is_scored_below_min_observations(monitor, rows):
+    feed(monitor, sample(older_children(rows), monitor.min_observations - 1))
+    assert set(monitor.scores().values()) == {None}
+    assert {row["status"] for row in monitor.report()} == {"Not enough data"}
+    monitor.observe(rows[0])
+    assert None not in monitor.scores().values()
+
+
+def test_recent_window_forgets_old_inputs(monitor, rows):
+    feed(monitor, sample(older_children(rows), 1000))
+    assert monitor.scores()["Age_Years"] >= SIGNIFICANT_PSI
+    # Enough baseline-like inputs for the shifted ones to decay away
+    feed(monitor, sample(rows, 3000, seed=1))
+    assert monitor.scores()["Age_Years"] < MODERATE_PSI
+    age = FEATURE_COLUMNS.index("Age_Years")
+    assert monitor.total[age].sum() == 4000
+    assert monitor.recent[age].sum() < 1 / (1 - monitor.decay)
+
+
+def test_gauges_are_pushed_every_gauge_interval(monitor, rows, monkeypatch):
+    pushed = []
+    monkeypatch.setattr(metrics, "set_gauge", lambda name, value: pushed.append((name, value)))
+    batch = sample(rows, 3 * GAUGE_INTERVAL)
+
+    feed(monitor, batch[:GAUGE_INTERVAL - 1])
+    assert pushed == []
+    monitor.observe(batch[GAUGE_INTERVAL - 1])
+    scores = monitor.scores()
+    assert dict(pushed) == {**{drift_monitor.gauge_name(column): round(psi, 6) for column, psi in scores.items()},
+                            "drift_psi_max": round(max(scores.values()), 6)}
+
+    feed(monitor, batch[GAUGE_INTERVAL:])
+    assert len(pushed) == 3 * (len(FEATURE_COLUMNS) + 1)
+
+
+def test_gauges_wait_for_min_observations(app_dir, rows, monkeypatch):
+    pushed = []
+    monkeypatch.setattr(metrics, "set_gauge", lambda name, value: pushed.append((name, value)))
+    monitor = drift_monitor.DriftMonitor.from_dataset(str(app_dir / DATASET_FILE),
+                                                      min_observations=GAUGE_INTERVAL + 1)
+    feed(monitor, sample(rows, 2 * GAUGE_INTERVAL))
+    assert len(pushed) == len(FEATURE_COLUMNS) + 1
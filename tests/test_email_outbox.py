@@ -0,0 +1,100 @@
+import smtplib
+import threading
+
+import pytest
+
+import database
+import email_outbox
+
+
+class FakeSMTP:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.sent = []
+        self._lock = threading.Lock()
+
+    def sendmail(self, sender, recipient, message):
+        if self.fail:
+            raise smtplib.SMTPServerDisconnected("down")
+        with self._lock:
+            self.sent.append(message)
+
+    def quit(self):
+        pass
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "outbox.db")
+
+
+def worker(db_path, server):
+    return email_outbox.OutboxWorker(None, None, path=db_path, smtp_factory=lambda *args: server)
+
+
+def rows(db_path):
+    with database.connection(db_path) as conn:
+        return conn.execute("SELECT id, status, attempts, next_attempt_at FROM email_outbox ORDER BY id").fetchall()
+
+
+def test_retry_delay_doubles_up_to_the_cap():
+    assert [email_outbox.retry_delay(n) for n in (1, 2, 3)] == [10.0, 20.0, 40.0]
+    assert email_outbox.retry_delay(30) == email_outbox.RETRY_MAX_DELAY
+
+
+def test_delivers_and_marks_sent(db_path):
+    server = FakeSMTP()
+    for i in range(3):
+        email_outbox.enqueue(f"subject {i}", "body", "a@example.com", "b@example.com", path=db_path)
+    assert worker(db_path, server).deliver_due()
+    assert len(server.sent) == 3
+    assert [row[1:3] for row in rows(db_path)] == [("sent", 1)] * 3
+    assert not worker(db_path, server).deliver_due()
+
+
+def test_failures_back_off_then_give_up(db_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(email_outbox.time, "time", lambda: now[0])
+    email_outbox.enqueue("subject", "body", "a@example.com", "b@example.com", path=db_path)
+    outbox = worker(db_path, FakeSMTP(fail=True))
+    for attempt in range(1, email_outbox.MAX_ATTEMPTS + 1):
+        assert outbox.deliver_due()
+        _, status, attempts, next_attempt_at = rows(db_path)[0]
+        assert attempts == attempt
+        assert next_attempt_at == now[0] + email_outbox.retry_delay(attempt)
+        # Not due again until the backoff has passed
+        assert not outbox.deliver_due()
+        now[0] = next_attempt_at
+    assert status == "failed"
+    assert not outbox.deliver_due()
+
+
+def test_claimed_batch_is_not_picked_up_by_another_worker(db_path, monkeypatch):
+    email_outbox.enqueue("subject", "body", "a@example.com", "b@example.com", path=db_path)
+    first = worker(db_path, FakeSMTP())
+    claimed = first._claim_due()
+    assert len(claimed) == 1
+    assert worker(db_path, FakeSMTP())._claim_due() == []
+    # A worker that died mid-batch gives its rows back when the lease runs out
+    later = email_outbox.time.time() + email_outbox.CLAIM_LEASE + 1
+    monkeypatch.setattr(email_outbox.time, "time", lambda: later)
+    assert len(worker(db_path, FakeSMTP())._claim_due()) == 1
+
+
+def test_concurrent_workers_send_each_message_once(db_path):
+    for i in range(100):
+        email_outbox.enqueue(f"subject {i}", "body", "a@example.com", "b@example.com", path=db_path)
+    server = FakeSMTP()
+    workers = [worker(db_path, server) for _ in range(4)]
+
+    def drain(outbox):
+        while outbox.deliver_due():
+            pass
+
+    threads = [threading.Thread(target=drain, args=(outbox,)) for outbox in workers]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(server.sent) == 100
+    assert all(row[1] == "sent" for row in rows(db_path))
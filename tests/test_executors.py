@@ -0,0 +1,44 @@
+import io
+import zipfile
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import executors
+import model_registry
+import pdf_report
+
+COLUMNS = [f"c{i}" for i in range(12)]
+
+
+@pytest.fixture
+def pool():
+    yield
+    executors.shutdown()
+
+
+def test_workers_are_not_forked_from_the_server(pool):
+    assert executors.cpu_pool()._mp_context.get_start_method() in ("forkserver", "spawn")
+
+
+def test_scoring_job_matches_the_bundle(app_dir, pool):
+    bundle = model_registry.ModelBundle("local", str(app_dir), dataset_file=str(app_dir / "asd_data_csv.csv"))
+    rows = np.loadtxt(app_dir / "asd_data_csv.csv", delimiter=",", skiprows=1)[:, :12]
+    rows = np.vstack([rows, [[12.5, 40] + [1] * 10]])  # One row outside the form's range
+    chunks = [pd.DataFrame(rows[i:i + 500], columns=COLUMNS) for i in range(0, len(rows), 500)]
+    job = executors.start_job(executors.score_csv_chunk,
+                              [("local", str(app_dir), chunk, i == 0) for i, chunk in enumerate(chunks)])
+    results = pd.read_csv(io.BytesIO(b"".join(job.results())))
+    assert job.done() and job.progress() == 1.0 and job.exception() is None
+    expected, _ = bundle.predict_many(rows)
+    assert results["Prediction"].tolist() == expected.tolist()
+
+
+def test_report_job_builds_one_pdf_per_row(pool):
+    reports = [(f"Row {i}", "Negative", [i % 11, 3] + [0] * 10) for i in range(7)]
+    job = executors.start_job(pdf_report.render_many, [(chunk,) for chunk in pdf_report.chunk_reports(reports)])
+    with zipfile.ZipFile(io.BytesIO(pdf_report.zip_reports(reports, job.results()))) as archive:
+        names = archive.namelist()
+        assert len(names) == len(reports)
+        assert all(archive.read(name).startswith(b"%PDF") for name in names)
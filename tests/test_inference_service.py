@@ -0,0 +1,161 @@
+import http.client
+import json
+import os
+import shutil
+import threading
+
+import numpy as np
+import pytest
+
+import inference_service
+import metrics
+import model_registry
+from conftest import MODEL_FILES, REPO_DIR
+from schema import DATASET_FILE, FEATURE_COLUMNS
+
+ROW = [3, 2, 1, 1, 1, 1, 1, 1, 1, 1, 1, 0]
+
+
+@pytest.fixture(scope="module")
+def server(tmp_path_factory):
+    # One server for the module: building the artifact and table for each test would dominate the run
+    app_dir = tmp_path_factory.mktemp("service")
+    for name in MODEL_FILES:
+        shutil.copy(os.path.join(REPO_DIR, name), app_dir / name)
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.chdir(app_dir)
+        registry = model_registry.ModelRegistry(str(app_dir / "models"), base_dir=str(app_dir),
+                                                dataset_file=str(app_dir / DATASET_FILE), poll_interval=3600)
+        # A longer wait than the default, so concurrent test requests reliably share batches
+        service = inference_service.InferenceService(registry, max_wait=0.05)
+        server = inference_service.make_server("127.0.0.1", 0, service)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        yield server
+        server.shutdown()
+        server.server_close()
+        registry.stop()
+
+
+def request(server, method, path, body=None, headers=None):
+    conn = http.client.HTTPConnection("127.0.0.1", server.server_port, timeout=30)
+    try:
+        conn.request(method, path, body=body, headers=headers or {})
+        response = conn.getresponse()
+        return response.status, json.loads(response.read())
+    finally:
+        conn.close()
+
+
+def predict(server, payload):
+    return request(server, "POST", "/predict", json.dumps(payload).encode("utf-8"))
+
+
+def counter(name):
+    return metrics.snapshot()["counters"].get(name, 0)
+
+
+def test_single_record_matches_the_model(server):
+    status, body = predict(server, {"record": ROW})
+    bundle = server.service.registry.active()
+    label, probability = bundle.predict(ROW)
+    assert status == 200
+    assert body == {"model_version": "local",
+                    "predictions": [{"label": label, "diagnosis": "Positive" if label == 1 else "Negative",
+                                     "probability": probability}]}
+
+
+def test_batched_records_keep_their_order(server):
+    rows = [ROW, [12] + ROW[1:], [10, 18] + [0] * 10, [3.5] + ROW[1:]]
+    status, body = predict(server, {"records": rows})
+    labels, probabilities = server.service.registry.active().predict_many(rows)
+    assert status == 200
+    assert [p["label"] for p in body["predictions"]] == labels.tolist()
+    assert [p["probability"] for p in body["predictions"]] == probabilities.tolist()
+
+
+def test_dict_records_match_lists(server):
+    record = dict(zip(FEATURE_COLUMNS, ROW))
+    assert predict(server, {"record": record}) == predict(server, {"record": ROW})
+
+
+def test_concurrent_callers_share_batches(server):
+    callers = 16
+    batches = counter("service_batches")
+    barrier = threading.Barrier(callers)
+    results = [None] * callers
+
+    def call(i):
+        row = [i % 11] + ROW[1:]
+        barrier.wait()
+        results[i] = (row, predict(server, {"record": row}))
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(callers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    bundle = server.service.registry.active()
+    for row, (status, body) in results:
+        assert status == 200
+        assert body["predictions"][0]["probability"] == bundle.predict(row)[1]
+    assert counter("service_batches") - batches < callers
+
+
+@pytest.mark.parametrize("body", [
+    b"not json",
+    b"\xff\xfe",
+    b"[1, 2]",
+    b'{"rows": []}',
+    b'{"records": []}',
+    b'{"record": [1, 2, 3]}',
+    b'{"record": {"Age_Years": 3}}',
+    json.dumps({"record": [True] + ROW[1:]}).encode(),
+    json.dumps({"record": ["3"] + ROW[1:]}).encode(),
+    b'{"record": [NaN, 2, 1, 1, 1, 1, 1, 1, 1, 1, 1, 0]}',
+    b'{"record": [1e400, 2, 1, 1, 1, 1, 1, 1, 1, 1, 1, 0]}',
+    json.dumps({"record": [10 ** 400] + ROW[1:]}).encode(),
+    json.dumps({"records": [ROW] * (inference_service.MAX_RECORDS_PER_REQUEST + 1)}).encode(),
+])
+def test_malformed_requests_get_400(server, body):
+    status, response = request(server, "POST", "/predict", body)
+    assert status == 400
+    assert response["error"]
+
+
+def test_empty_body_gets_400(server):
+    assert request(server, "POST", "/predict", b"")[0] == 400
+
+
+def test_oversized_body_gets_413_before_it_is_read(server):
+    conn = http.client.HTTPConnection("127.0.0.1", server.server_port, timeout=30)
+    try:
+        conn.putrequest("POST", "/predict")
+        conn.putheader("Content-Length", str(inference_service.MAX_BODY_BYTES + 1))
+        conn.endheaders()
+        assert conn.getresponse().status == 413
+    finally:
+        conn.close()
+
+
+def test_unknown_paths_get_404(server):
+    assert request(server, "GET", "/nope")[0] == 404
+    assert request(server, "POST", "/nope", b"{}")[0] == 404
+
+
+def test_health_reports_the_active_version(server):
+    status, body = request(server, "GET", "/health")
+    assert status == 200 and body["model_version"] == "local" and body["status"] == "ok"
+
+
+def test_scoring_failure_reaches_every_waiting_request():
+    def score(rows):
+        raise RuntimeError("model exploded")
+
+    batcher = inference_service.MicroBatcher(score, max_wait=0.05)
+    # Queued before the thread starts, so all three land in one batch
+    futures = [batcher.submit(np.array([ROW], dtype=np.float64)) for _ in range(3)]
+    batcher.start()
+    for future in futures:
+        with pytest.raises(RuntimeError, match="model exploded"):
+            future.result(timeout=10)
@@ -0,0 +1,85 @@
+import json
+
+import pytest
+
+import auth
+import database
+import manage_users
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "users.db")
+
+
+def write_jsonl(path, records):
+    path.write_text("".join((r if isinstance(r, str) else json.dumps(r)) + "\n" for r in records))
+    return str(path)
+
+
+def test_csv_import_with_plaintext_hash_and_duplicates(tmp_path, db_path):
+    legacy = auth.hashlib.sha256(b"legacy-pass").hexdigest()
+    (tmp_path / "users.csv").write_text(
+        "username,password,password_hash\n"
+        "alice,alice-pass,\n"
+        f"bob,,{legacy}\n"
+        "alice,other-pass,\n"
+        ",no-name,\n"
+        "carol,,\n"
+    )
+    imported, skipped = manage_users.import_users(str(tmp_path / "users.csv"), db_path, workers=1)
+    assert imported == 2
+    assert [(line, reason) for line, _, reason in skipped] == [
+        (5, "missing username"), (6, "missing password or password_hash"), (4, "username already exists")]
+    assert auth.authenticate("alice", "alice-pass", db_path)
+    assert auth.authenticate("bob", "legacy-pass", db_path)
+
+
+def test_jsonl_malformed_records_are_skipped(tmp_path, db_path):
+    path = write_jsonl(tmp_path / "users.jsonl", [
+        {"username": "dave", "password": "dave-pass"},
+        {"username": 123, "password": "x"},
+        {"username": "erin", "password": 1234},
+        {"username": "frank", "password_hash": ["x"]},
+        "[1, 2]",
+        "{not json",
+        '{"username": "gina", "password": "\\ud800"}',
+        {"username": "hank", "password_hash": "scrypt$1$8$1$00$00"},
+        {"username": "ivan", "password_hash": f"scrypt${2 ** 30}$8$1$00$00"},
+        {"username": "jane", "password_hash": "scrypt$16384$8$1$abc$00"},
+    ])
+    imported, skipped = manage_users.import_users(path, db_path, workers=1)
+    assert imported == 1
+    assert sorted(line for line, _, _ in skipped) == list(range(2, 11))
+    assert database.get_password_hash("dave", db_path) is not None
+
+
+def test_export_then_import_round_trip(tmp_path, db_path):
+    path = write_jsonl(tmp_path / "users.jsonl", [{"username": f"user{i}", "password": f"pass{i}"} for i in range(3)])
+    manage_users.import_users(path, db_path, batch_size=2, workers=1)
+    for fmt in manage_users.FORMATS:
+        export_path = str(tmp_path / f"export.{fmt}")
+        assert manage_users.export_users(export_path, db_path) == 3
+        copy_db = str(tmp_path / f"copy-{fmt}.db")
+        assert manage_users.import_users(export_path, copy_db) == (3, [])
+        assert auth.authenticate("user2", "pass2", copy_db)
+
+
+def test_unknown_format_is_an_error(tmp_path, db_path):
+    with pytest.raises(ValueError):
+        manage_users.import_users(str(tmp_path / "users.txt"), db_path)
+    assert manage_users.main(["--db", db_path, "import", str(tmp_path / "users.txt")]) == 1
+
+
+@pytest.mark.parametrize("value", [
+    "scrypt$1$8$1$00$00",
+    "scrypt$3$8$1$00$00",
+    f"scrypt${2 ** 30}$8$1$00$00",
+    "scrypt$16384$8$64$00$00",
+    "scrypt$16384$8$1$0$00",
+    "scrypt$16384$8$1$zz$00",
+    "ab" * 31,
+])
+def test_unusable_hashes_are_rejected(value):
+    assert not auth.is_password_hash(value)
+    assert not auth.verify_password("anything", value)
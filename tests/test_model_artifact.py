@@ -0,0 +1,97 @@
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+import model_artifact
+import model_registry
+import prediction_table
+from conftest import REPO_DIR, load_pipeline, pipeline_probability, replace_model
+from forest_engine import CompiledForest
+from schema import MODEL_FILE, TABLE_FILE
+
+ROW = [3, 2, 1, 1, 1, 1, 1, 1, 1, 1, 1, 0]
+
+
+def test_compiled_forest_matches_sklearn_bit_for_bit(app_dir):
+    classifier, scaler = load_pipeline(app_dir)
+    forest = CompiledForest.from_pipeline(classifier, scaler)
+    rows = np.loadtxt(app_dir / "asd_data_csv.csv", delimiter=",", skiprows=1)[:, :12]
+    expected = classifier.predict_proba(scaler.transform(rows))
+    assert np.array_equal(forest.predict_proba(rows), expected)
+
+
+def test_artifact_round_trip(app_dir):
+    classifier, scaler = load_pipeline(app_dir)
+    forest = CompiledForest.from_pipeline(classifier, scaler)
+    sources = model_artifact.source_digests(app_dir)
+    model_artifact.export_artifact(forest, app_dir / "model.bin", sources)
+    loaded = model_artifact.load_artifact(app_dir / "model.bin", sources=sources)
+    rows = np.array([ROW, [10, 18] + [0] * 10], dtype=float)
+    assert np.array_equal(loaded.predict_proba(rows), forest.predict_proba(rows))
+
+
+def test_artifact_rejects_corruption(app_dir):
+    forest = CompiledForest.from_pipeline(*load_pipeline(app_dir))
+    model_artifact.export_artifact(forest, app_dir / "model.bin")
+    data = bytearray((app_dir / "model.bin").read_bytes())
+    data[-1] ^= 0xFF
+    (app_dir / "model.bin").write_bytes(bytes(data))
+    with pytest.raises(model_artifact.ArtifactError):
+        model_artifact.load_artifact(app_dir / "model.bin")
+
+
+def test_artifact_rejects_other_pickles(app_dir):
+    forest = CompiledForest.from_pipeline(*load_pipeline(app_dir))
+    model_artifact.export_artifact(forest, app_dir / "model.bin", model_artifact.source_digests(app_dir))
+    replace_model(app_dir)
+    with pytest.raises(model_artifact.ArtifactError):
+        model_artifact.load_artifact(app_dir / "model.bin", sources=model_artifact.source_digests(app_dir))
+
+
+def test_bundle_ignores_artifact_and_table_of_replaced_pickles(app_dir):
+    old = model_registry.ModelBundle("local", str(app_dir), dataset_file=str(app_dir / "asd_data_csv.csv"))
+    old_probability = old.predict(ROW)[1]
+    assert (app_dir / "autism_model.bin").exists() and (app_dir / TABLE_FILE).exists()
+
+    new_pipeline = replace_model(app_dir)
+    bundle = model_registry.ModelBundle("local", str(app_dir), dataset_file=str(app_dir / "asd_data_csv.csv"))
+    probability = bundle.predict(ROW)[1]
+    assert probability == pipeline_probability(*new_pipeline, ROW)
+    assert probability != pytest.approx(old_probability)
+    labels, probabilities = bundle.predict_many([ROW, [12] + ROW[1:]])
+    assert probabilities[0] == probability
+    assert probabilities[1] == pipeline_probability(*new_pipeline, [12] + ROW[1:])
+
+
+def test_usable_artifact_serves_without_unpickling(app_dir):
+    model_registry.ModelBundle("local", str(app_dir), dataset_file=str(app_dir / "asd_data_csv.csv")).warm()
+    bundle = model_registry.ModelBundle("local", str(app_dir), dataset_file=str(app_dir / "asd_data_csv.csv"))
+    bundle.warm()
+    bundle.predict(ROW)
+    bundle.predict_many([ROW, [12] + ROW[1:]])
+    assert bundle._pipeline is None
+
+    # A fresh process, as a new server or pool worker would be, never imports sklearn
+    script = (
+        "import sys, model_registry\n"
+        "bundle = model_registry.ModelBundle('local', '.')\n"
+        f"bundle.predict({ROW}); bundle.predict_many([{[12] + ROW[1:]}])\n"
+        "print('sklearn' in sys.modules)\n"
+    )
+    result = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, check=True,
+                            env=dict(os.environ, PYTHONPATH=REPO_DIR))
+    assert result.stdout.strip() == "False"
+
+
+def test_table_from_other_pickles_is_rebuilt(app_dir):
+    forest = CompiledForest.from_pipeline(*load_pipeline(app_dir))
+    sources = model_artifact.source_digests(app_dir)
+    path = str(app_dir / TABLE_FILE)
+    prediction_table.build_table(forest, None, path, dict(sources, **{MODEL_FILE: "0" * 64}))
+    with pytest.raises(ValueError):
+        prediction_table.load_table(path, sources)
+    prediction_table.load_or_build_table(forest, None, path, sources)
+    assert prediction_table.load_table(path, sources)[prediction_table.pack_key(ROW)]["proba"] == forest.predict_proba([ROW])[0, 1]
@@ -0,0 +1,141 @@
+import json
+import os
+import shutil
+
+import pytest
+
+import metrics
+import model_registry
+from conftest import load_pipeline, pipeline_probability, replace_model
+
+ROW = [3, 2, 1, 1, 1, 1, 1, 1, 1, 1, 1, 0]
+
+
+def make_registry(app_dir):
+    return model_registry.ModelRegistry(str(app_dir / "models"), base_dir=str(app_dir),
+                                        dataset_file=str(app_dir / "asd_data_csv.csv"), poll_interval=3600)
+
+
+@pytest.fixture
+def registry(app_dir):
+    registry = make_registry(app_dir)
+    yield registry
+    registry.stop()
+
+
+def make_version(app_dir, name):
+    version_dir = app_dir / "models" / name
+    version_dir.mkdir(parents=True)
+    files = {}
+    for file_name in (model_registry.MODEL_FILE, model_registry.SCALER_FILE):
+        shutil.copy(app_dir / file_name, version_dir / file_name)
+        files[file_name] = model_registry.sha256_file(version_dir / file_name)
+    (version_dir / model_registry.MANIFEST_FILE).write_text(json.dumps({"version": name, "files": files}))
+    return version_dir
+
+
+def test_replaced_local_pickle_changes_predictions(app_dir, registry):
+    old_bundle = registry.active()
+    old_probability = old_bundle.predict(ROW)[1]
+    assert old_probability == pipeline_probability(*load_pipeline(app_dir), ROW)
+
+    new_pipeline = replace_model(app_dir)
+    assert registry.refresh()
+    bundle = registry.active()
+    assert bundle is not old_bundle
+    assert bundle.predict(ROW)[1] == pipeline_probability(*new_pipeline, ROW)
+    assert bundle.predict(ROW)[1] != pytest.approx(old_probability)
+    assert not registry.refresh()
+
+
+def test_activate_and_fall_back_to_local(app_dir, registry):
+    make_version(app_dir, "v1")
+    model_registry.write_pointer(str(app_dir / "models"), model_registry.ACTIVE_POINTER, "v1")
+    assert registry.refresh()
+    assert registry.active().version == "v1"
+    model_registry.write_pointer(str(app_dir / "models"), model_registry.ACTIVE_POINTER, None)
+    assert registry.refresh()
+    assert registry.active().version == "local"
+
+
+def test_pointer_to_tampered_version_is_refused(app_dir):
+    version_dir = make_version(app_dir, "v1")
+    with open(version_dir / model_registry.MODEL_FILE, "ab") as f:
+        f.write(b"tampered")
+    with pytest.raises(ValueError):
+        model_registry.write_pointer(str(app_dir / "models"), model_registry.ACTIVE_POINTER, "v1")
+    assert not os.path.exists(app_dir / "models" / model_registry.ACTIVE_POINTER)
+
+
+def point(app_dir, pointer, version):
+    model_registry.write_pointer(str(app_dir / "models"), pointer, version)
+
+
+def tamper(version_dir):
+    # Returns a function that undoes the damage
+    path = version_dir / model_registry.MODEL_FILE
+    original = path.read_bytes()
+    path.write_bytes(original + b"tampered")
+    return lambda: path.write_bytes(original)
+
+
+def counter(name):
+    return metrics.snapshot()["counters"].get(name, 0)
+
+
+def test_bad_shadow_at_startup_keeps_the_active_version(app_dir):
+    make_version(app_dir, "v1")
+    version_dir = make_version(app_dir, "v2")
+    point(app_dir, model_registry.ACTIVE_POINTER, "v1")
+    point(app_dir, model_registry.SHADOW_POINTER, "v2")
+    restore = tamper(version_dir)
+    failures = counter("shadow_load_failures")
+
+    registry = make_registry(app_dir)
+    try:
+        assert registry.active().version == "v1"
+        assert registry.shadow_stats() is None
+        assert counter("shadow_load_failures") == failures + 1
+
+        # The shadow pointer was not loaded, so it is retried and picked up once the version is whole
+        restore()
+        assert registry.refresh()
+        assert registry.shadow_stats()["version"] == "v2"
+        assert registry.active().version == "v1"
+    finally:
+        registry.stop()
+
+
+def test_bad_active_at_startup_is_retried(app_dir):
+    version_dir = make_version(app_dir, "v1")
+    point(app_dir, model_registry.ACTIVE_POINTER, "v1")
+    restore = tamper(version_dir)
+
+    registry = make_registry(app_dir)
+    try:
+        assert registry.active().version == "local"
+        assert not registry.refresh()
+        assert registry.active().version == "local"
+        restore()
+        assert registry.refresh()
+        assert registry.active().version == "v1"
+    finally:
+        registry.stop()
+
+
+def test_bad_shadow_in_refresh_swaps_the_active_version_once(app_dir, registry):
+    make_version(app_dir, "v1")
+    point(app_dir, model_registry.ACTIVE_POINTER, "v1")
+    point(app_dir, model_registry.SHADOW_POINTER, "v1")
+    make_version(app_dir, "v2")
+    point(app_dir, model_registry.ACTIVE_POINTER, "v2")
+    tamper(app_dir / "models" / "v1")
+    swaps = counter("model_swaps")
+
+    assert registry.refresh()
+    bundle = registry.active()
+    assert bundle.version == "v2" and registry.shadow_stats() is None
+    for _ in range(3):
+        assert not registry.refresh()
+    assert registry.active() is bundle
+    assert counter("model_swaps") == swaps + 1
@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+
+import model_registry
+import prediction_table
+import result_cache
+from conftest import load_pipeline, pipeline_probability
+
+ROW = [3, 2, 1, 1, 1, 1, 1, 1, 1, 1, 1, 0]
+
+
+def test_every_form_input_packs_to_its_own_key():
+    keys = np.arange(prediction_table.TABLE_SIZE)
+    rows = prediction_table.unpack_keys(keys)
+    packed, in_range = prediction_table.pack_keys(rows)
+    assert in_range.all() and np.array_equal(packed, keys)
+    for key in (0, 12345, prediction_table.TABLE_SIZE - 1):
+        assert prediction_table.pack_key(rows[key]) == key
+
+
+@pytest.mark.parametrize("row", [
+    [3.7] + ROW[1:],
+    ROW[:1] + [2.5] + ROW[2:],
+    ROW[:2] + [0.5] + ROW[3:],
+    [11] + ROW[1:],
+    ROW[:1] + [-1] + ROW[2:],
+    ROW[:2] + [2] + ROW[3:],
+    ROW[:-1],
+    [float("nan")] + ROW[1:],
+])
+def test_inputs_the_form_cannot_produce_are_not_in_the_table(row):
+    with pytest.raises(KeyError):
+        prediction_table.pack_key(row)
+    if len(row) == len(ROW):
+        assert not prediction_table.pack_keys([row])[1][0]
+
+
+def test_integral_floats_use_the_table():
+    assert prediction_table.pack_key([float(value) for value in ROW]) == prediction_table.pack_key(ROW)
+
+
+@pytest.fixture
+def bundle(app_dir):
+    return model_registry.ModelBundle("local", str(app_dir), dataset_file=str(app_dir / "asd_data_csv.csv"))
+
+
+def test_non_integral_input_is_scored_by_the_model(app_dir, bundle):
+    pipeline = load_pipeline(app_dir)
+    row = [3.7] + ROW[1:]
+    _, probability = bundle.predict(row)
+    assert probability == pipeline_probability(*pipeline, row)
+    assert bundle.explain(row)[1] == probability
+    assert bundle.predict_many([row])[1][0] == probability
+
+
+def test_result_cache_keeps_non_integral_inputs_apart(bundle):
+    result_cache.cache.clear()
+    assert result_cache.diagnose(bundle, [3.7] + ROW[1:])[1] == bundle.predict([3.7] + ROW[1:])[1]
+    assert result_cache.diagnose(bundle, ROW)[1] == bundle.predict(ROW)[1]
+    assert result_cache.diagnose(bundle, [float(value) for value in ROW]) == result_cache.diagnose(bundle, ROW)
+
+
+def test_table_lookups_match_the_model_exactly(app_dir, bundle):
+    classifier, scaler = load_pipeline(app_dir)
+    keys = np.random.default_rng(1).choice(prediction_table.TABLE_SIZE, size=2000, replace=False)
+    rows = prediction_table.unpack_keys(keys)
+    labels, probabilities = bundle.predict_many(rows)
+    proba = classifier.predict_proba(scaler.transform(rows))
+    assert np.array_equal(probabilities, proba[:, list(classifier.classes_).index(1)])
+    assert np.array_equal(labels, classifier.classes_.take(proba.argmax(axis=1)))
+    assert bundle.predict(rows[0]) == (int(labels[0]), float(probabilities[0]))
@@ -0,0 +1,109 @@
+import types
+from concurrent.futures import Future
+
+import pytest
+
+import model_registry
+import result_cache
+from conftest import pipeline_probability, replace_model
+from result_cache import ENTRY_BYTES, ResultCache
+
+ROW = [3, 2, 1, 1, 1, 1, 1, 1, 1, 1, 1, 0]
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    fresh = ResultCache(max_bytes=3 * (100 + ENTRY_BYTES), name="test_cache")
+    monkeypatch.setattr(result_cache, "cache", fresh)
+    return fresh
+
+
+def finished(value):
+    future = Future()
+    future.set_result(value)
+    return future
+
+
+def test_least_recently_used_entries_are_evicted_first(cache):
+    for key in "abc":
+        cache.put(key, key.upper(), 100)
+    assert cache.get("a") == "A"  # Now "b" is the oldest
+    cache.put("d", "D", 100)
+    assert cache.get("b") is None
+    assert [cache.get(key) for key in "acd"] == ["A", "C", "D"]
+    assert cache.bytes == 3 * (100 + ENTRY_BYTES) == cache.max_bytes
+
+
+def test_a_large_entry_evicts_as_many_as_it_needs(cache):
+    for key in "abc":
+        cache.put(key, key, 100)
+    cache.put("big", "BIG", 250)
+    assert [cache.get(key) for key in "abc"] == [None, None, "c"]
+    assert cache.stats()["evictions"] == 2
+
+
+def test_oversized_entries_are_never_stored(cache):
+    cache.put("a", "A", 100)
+    cache.put("huge", "HUGE", cache.max_bytes)
+    assert cache.get("huge") is None
+    assert cache.get("a") == "A"
+    assert cache.stats()["entries"] == 1 and cache.stats()["evictions"] == 0
+
+
+def test_stats_count_hits_misses_and_evictions(cache):
+    assert cache.stats()["hit_rate"] is None
+    for key in "abcd":
+        cache.put(key, key, 100)
+    cache.get("a")
+    cache.get("b")
+    cache.get("d")
+    assert cache.stats() == {"entries": 3, "bytes": 3 * (100 + ENTRY_BYTES), "max_bytes": cache.max_bytes,
+                             "hits": 2, "misses": 1, "hit_rate": 2 / 3, "evictions": 1}
+
+
+def test_reloaded_model_never_serves_old_results(app_dir, cache):
+    old = model_registry.ModelBundle("local", str(app_dir))
+    old_probability = result_cache.diagnose(old, ROW)[1]
+    assert result_cache.diagnose(old, ROW)[1] == old_probability
+    assert cache.stats()["hits"] == 1
+
+    # Same version name, different pickles: the new load has its own cache key
+    classifier, scaler = replace_model(app_dir)
+    new = model_registry.ModelBundle("local", str(app_dir))
+    assert new.cache_key != old.cache_key
+    new_probability = result_cache.diagnose(new, ROW)[1]
+    assert new_probability == pipeline_probability(classifier, scaler, ROW)
+    assert new_probability != old_probability
+    assert cache.stats()["hits"] == 1
+
+
+def test_report_is_rendered_once_per_key(cache):
+    bundle = types.SimpleNamespace(cache_key=("v1", 0))
+    renders = []
+
+    def render():
+        renders.append(1)
+        return finished(b"%PDF report")
+
+    assert result_cache.report(bundle, ROW, "Ali", render).result() == b"%PDF report"
+    assert result_cache.report(bundle, ROW, "Ali", render).result() == b"%PDF report"
+    result_cache.report(bundle, ROW, "Abu", render).result()
+    result_cache.report(types.SimpleNamespace(cache_key=("v1", 1)), ROW, "Ali", render).result()
+    assert len(renders) == 3
+
+
+def test_failed_or_cancelled_reports_are_not_cached(cache):
+    bundle = types.SimpleNamespace(cache_key=("v1", 0))
+    failed = Future()
+    failed.set_exception(RuntimeError("render failed"))
+    with pytest.raises(RuntimeError):
+        result_cache.report(bundle, ROW, "Ali", lambda: failed).result()
+
+    pending = Future()
+    result_cache.report(bundle, ROW, "Ali", lambda: pending)
+    pending.cancel()
+    assert cache.stats()["entries"] == 0
+
+    # The next request renders again, and that success is cached
+    assert result_cache.report(bundle, ROW, "Ali", lambda: finished(b"%PDF")).result() == b"%PDF"
+    assert result_cache.report(bundle, ROW, "Ali", lambda: pytest.fail("rendered twice")).result() == b"%PDF"
@@ -0,0 +1,295 @@
+"""Retrain the scaler and random forest from ``asd_data_csv.csv``.
+
+Reproduces how the shipped ``scaler.pkl`` and ``autism_random_forest.pkl``
+were made: a ``StandardScaler`` fitted on every row, a stratified 80/20
+train/test split (``random_state=42``) and a 100-tree forest with
+``random_state=42`` fitted on the training rows. With the default settings
+the retrained forest is tree-for-tree identical to the shipped one.
+
+Cross-validation folds and, with ``--search``, every hyperparameter
+candidate's folds run as independent jobs on a process pool, and the final
+fit grows its trees on all workers, so training time scales with cores.
+
+Each run writes a versioned directory::
+
+    models/<version>/scaler.pkl
+    models/<version>/autism_random_forest.pkl
+    models/<version>/autism_model.bin      compiled forest (see model_artifact)
+    models/<version>/manifest.json         parameters, metrics, timings, SHA-256 of each file
+
+``--activate`` points ``models/ACTIVE`` at the new version, and running
+app processes swap to it without a restart (see ``model_registry``);
+``--shadow`` instead scores it alongside the active model on live inputs.
+``--install`` copies the pickles and compiled forest into the app directory,
+which is what the app serves when no version is active::
+
+    python train.py --search --shadow
+"""
+
+import argparse
+import itertools
+import json
+import os
+import pickle
+import shutil
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import sklearn
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import accuracy_score, f1_score, precision_score, recall_score, roc_auc_score
+from sklearn.model_selection import StratifiedKFold, train_test_split
+from sklearn.preprocessing import StandardScaler
+
+import model_artifact
+import model_registry
+from forest_engine import CompiledForest
+from model_artifact import sha256_file
+from model_registry import MANIFEST_FILE, verify_version
+from schema import ARTIFACT_FILE, DATASET_FILE, MODEL_FILE, MODELS_DIR, OUTCOME_COLUMN, SCALER_FILE, TABLE_FILE
+
+RANDOM_STATE = 42
+TEST_SIZE = 0.2
+FOLDS = 5
+
+# Hyperparameters of the shipped model
+DEFAULT_PARAMS = {"n_estimators": 100, "max_depth": None, "max_features": "sqrt", "min_samples_leaf": 1}
+
+SEARCH_GRID = {
+    "n_estimators": [100, 200, 400],
+    "max_depth": [None, 10, 20],
+    "max_features": ["sqrt", "log2", 0.5],
+    "min_samples_leaf": [1, 2, 4],
+}
+
+# Training rows shared with each pool worker once, instead of once per job
+_worker_data = {}
+
+
+def _init_worker(X, y):
+    _worker_data["X"] = X
+    _worker_data["y"] = y
+
+
+def _run_fold(params, train_index, test_index):
+    # Fit one candidate on one fold inside a pool worker; returns (accuracy, seconds)
+    X, y = _worker_data["X"], _worker_data["y"]
+    start = time.perf_counter()
+    model = RandomForestClassifier(random_state=RANDOM_STATE, n_jobs=1, **params)
+    model.fit(X[train_index], y[train_index])
+    accuracy = accuracy_score(y[test_index], model.predict(X[test_index]))
+    return accuracy, time.perf_counter() - start
+
+
+def candidates(search):
+    """Hyperparameter sets to cross-validate."""
+    if not search:
+        return [dict(DEFAULT_PARAMS)]
+    names = list(SEARCH_GRID)
+    return [dict(zip(names, values)) for values in itertools.product(*(SEARCH_GRID[name] for name in names))]
+
+
+def cross_validate(X, y, param_sets, folds=FOLDS, workers=None):
+    """Score every parameter set with stratified k-fold CV, all folds in parallel.
+
+    Returns one ``{"params", "mean_accuracy", "std_accuracy", "fit_seconds"}``
+    dict per parameter set, best first.
+    """
+    splits = list(StratifiedKFold(n_splits=folds, shuffle=True, random_state=RANDOM_STATE).split(X, y))
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(X, y)) as executor:
+        futures = [
+            [executor.submit(_run_fold, params, train_index, test_index) for train_index, test_index in splits]
+            for params in param_sets
+        ]
+        results = []
+        for params, fold_futures in zip(param_sets, futures):
+            scores, seconds = zip(*(future.result() for future in fold_futures))
+            results.append({
+                "params": params,
+                "mean_accuracy": float(np.mean(scores)),
+                "std_accuracy": float(np.std(scores)),
+                "fit_seconds": float(np.sum(seconds)),
+            })
+    # Stable sort keeps the grid order (simplest candidates first) among ties
+    return sorted(results, key=lambda result: -result["mean_accuracy"])
+
+
+def evaluate(model, X, y):
+    predictions = model.predict(X)
+    positive = list(model.classes_).index(1)
+    return {
+        "accuracy": accuracy_score(y, predictions),
+        "precision": precision_score(y, predictions, zero_division=0),
+        "recall": recall_score(y, predictions, zero_division=0),
+        "f1": f1_score(y, predictions, zero_division=0),
+        "roc_auc": roc_auc_score(y, model.predict_proba(X)[:, positive]),
+    }
+
+
+def same_forest(a, b):
+    """True if two fitted forests have identical trees."""
+    if len(a.estimators_) != len(b.estimators_):
+        return False
+    for tree_a, tree_b in zip(a.estimators_, b.estimators_):
+        ta, tb = tree_a.tree_, tree_b.tree_
+        if not (np.array_equal(ta.feature, tb.feature) and np.array_equal(ta.threshold, tb.threshold)
+                and np.array_equal(ta.children_left, tb.children_left) and np.array_equal(ta.value, tb.value)):
+            return False
+    return True
+
+
+def _dump(obj, path):
+    with open(path, "wb") as f:
+        pickle.dump(obj, f)
+
+
+def write_version(classifier, scaler, forest, manifest, models_dir=MODELS_DIR):
+    """Write the artifacts and manifest into a new version directory and return its path."""
+    version = time.strftime("%Y%m%d-%H%M%S")
+    version_dir = os.path.join(models_dir, version)
+    suffix = 1
+    while os.path.exists(version_dir):
+        suffix += 1
+        version_dir = os.path.join(models_dir, f"{version}-{suffix}")
+    tmp_dir = f"{version_dir}.{os.getpid()}.{threading.get_ident()}.tmp"
+    os.makedirs(tmp_dir)
+
+    _dump(scaler, os.path.join(tmp_dir, SCALER_FILE))
+    _dump(classifier, os.path.join(tmp_dir, MODEL_FILE))
+    files = [SCALER_FILE, MODEL_FILE]
+    if forest is not None:
+        model_artifact.export_artifact(forest, os.path.join(tmp_dir, ARTIFACT_FILE),
+                                       model_artifact.source_digests(tmp_dir))
+        files.append(ARTIFACT_FILE)
+
+    manifest = dict(manifest, version=os.path.basename(version_dir),
+                    files={name: sha256_file(os.path.join(tmp_dir, name)) for name in files})
+    with open(os.path.join(tmp_dir, MANIFEST_FILE), "w") as f:
+        json.dump(manifest, f, indent=2, default=str)
+    os.rename(tmp_dir, version_dir)
+    return version_dir
+
+
+def install(version_dir, target_dir="."):
+    """Copy a verified version's artifacts to where the app loads them from."""
+    manifest = verify_version(version_dir)
+    for name in manifest["files"]:
+        tmp_path = os.path.join(target_dir, f"{name}.{os.getpid()}.tmp")
+        shutil.copyfile(os.path.join(version_dir, name), tmp_path)
+        os.replace(tmp_path, os.path.join(target_dir, name))
+    if ARTIFACT_FILE not in manifest["files"]:
+        # A stale compiled forest would shadow the new pickles
+        try:
+            os.remove(os.path.join(target_dir, ARTIFACT_FILE))
+        except FileNotFoundError:
+            pass
+    # The prediction table is rebuilt from the new model on next use
+    try:
+        os.remove(os.path.join(target_dir, TABLE_FILE))
+    except FileNotFoundError:
+        pass
+
+
+def train(data_path=DATASET_FILE, search=False, folds=FOLDS, workers=None):
+    """Fit and evaluate a model; returns (classifier, scaler, forest, manifest)."""
+    timings = {}
+    start = time.perf_counter()
+    data = pd.read_csv(data_path)
+    X = data.drop(columns=[OUTCOME_COLUMN])
+    y = data[OUTCOME_COLUMN]
+    timings["load"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    scaler = StandardScaler().fit(X)
+    X_scaled = pd.DataFrame(scaler.transform(X), columns=X.columns)
+    X_train, X_test, y_train, y_test = train_test_split(
+        X_scaled, y, test_size=TEST_SIZE, random_state=RANDOM_STATE, stratify=y
+    )
+    timings["scale_and_split"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    param_sets = candidates(search)
+    cv_results = cross_validate(X_train.to_numpy(), y_train.to_numpy(), param_sets, folds, workers)
+    best_params = cv_results[0]["params"]
+    timings["cross_validation"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    classifier = RandomForestClassifier(random_state=RANDOM_STATE, n_jobs=workers or -1, **best_params)
+    classifier.fit(X_train, y_train)
+    classifier.n_jobs = None  # Don't carry the training parallelism into the app
+    timings["final_fit"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    test_metrics = evaluate(classifier, X_test, y_test)
+    forest = CompiledForest.from_pipeline(classifier, scaler)
+    if not forest.matches_pipeline(classifier, scaler, X.to_numpy()):
+        forest = None
+    timings["evaluate_and_compile"] = time.perf_counter() - start
+
+    manifest = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "data": {"path": data_path, "sha256": sha256_file(data_path), "rows": len(data),
+                 "train_rows": len(X_train), "test_rows": len(X_test)},
+        "params": best_params,
+        "folds": folds,
+        "workers": workers or os.cpu_count(),
+        "cross_validation": cv_results,
+        "test_metrics": test_metrics,
+        "timings_seconds": timings,
+        "sklearn_version": sklearn.__version__,
+        "python_version": sys.version.split()[0],
+    }
+    return classifier, scaler, forest, manifest
+
+
+def print_report(manifest):
+    print(f"Trained on {manifest['data']['train_rows']} rows, tested on {manifest['data']['test_rows']}")
+    print(f"Parameters: {manifest['params']}")
+    cv = manifest["cross_validation"]
+    print(f"{len(cv)} candidate(s) x {manifest['folds']} folds on {manifest['workers']} worker(s)")
+    for result in cv[:5]:
+        print(f"  cv accuracy {result['mean_accuracy']:.4f} +/- {result['std_accuracy']:.4f}  {result['params']}")
+    print("Test set: " + ", ".join(f"{name} {value:.4f}" for name, value in manifest["test_metrics"].items()))
+    print("Timings: " + ", ".join(f"{name} {seconds:.2f}s" for name, seconds in manifest["timings_seconds"].items()))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Retrain the scaler and random forest.")
+    parser.add_argument("--data", default=DATASET_FILE, help="training CSV with an Outcome column")
+    parser.add_argument("--search", action="store_true", help="cross-validate the hyperparameter grid")
+    parser.add_argument("--folds", type=int, default=FOLDS, help="cross-validation folds")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--models-dir", default=MODELS_DIR, help="where versioned artifacts are written")
+    parser.add_argument("--install", action="store_true", help="copy the new artifacts into the app directory")
+    parser.add_argument("--activate", action="store_true", help="serve the new version in running apps")
+    parser.add_argument("--shadow", action="store_true", help="shadow-score the new version on live inputs")
+    args = parser.parse_args(argv)
+
+    classifier, scaler, forest, manifest = train(args.data, args.search, args.folds, args.workers)
+    if os.path.exists(MODEL_FILE):
+        with open(MODEL_FILE, "rb") as f:
+            manifest["matches_installed_model"] = same_forest(classifier, pickle.load(f))
+    version_dir = write_version(classifier, scaler, forest, manifest, args.models_dir)
+    print_report(manifest)
+    if "matches_installed_model" in manifest:
+        print(f"Identical to the installed {MODEL_FILE}: {manifest['matches_installed_model']}")
+    print(f"Wrote {version_dir}")
+    if args.install:
+        install(version_dir)
+        print(f"Installed {version_dir} into the app directory")
+    version = os.path.basename(version_dir)
+    if args.activate:
+        model_registry.write_pointer(args.models_dir, model_registry.ACTIVE_POINTER, version)
+        print(f"Activated {version}")
+    if args.shadow:
+        model_registry.write_pointer(args.models_dir, model_registry.SHADOW_POINTER, version)
+        print(f"Shadow-scoring {version}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())